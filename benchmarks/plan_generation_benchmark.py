@@ -0,0 +1,70 @@
+"""Benchmark the batched grid plan generator against the per-waypoint reference loop.
+
+Usage:
+    python -m benchmarks.plan_generation_benchmark [--sizes 10000 100000 1000000] [--repeat 3]
+"""
+
+import argparse
+import math
+import time
+import typing as T
+
+from src.data_model import Camera, DatasetSpec
+from src.plan_computation import (
+    _generate_photo_plan_on_grid_reference,
+    _tilted_image_footprint,
+    generate_photo_plan_on_grid,
+)
+
+CAMERA_X10 = Camera(
+    fx=4938.56, fy=4936.49, cx=4095.5, cy=3071.5,
+    sensor_size_x_mm=13.107, sensor_size_y_mm=9.830,
+    image_size_x_px=8192, image_size_y_px=6144
+)
+
+
+def dataset_spec_for_num_waypoints(
+    camera: Camera, num_waypoints: int, camera_angle: float = 0.0, camera_yaw: float = 0.0
+) -> DatasetSpec:
+    """Build a square-ish spec whose grid plan has approximately `num_waypoints` waypoints."""
+    spec = DatasetSpec(
+        overlap=0.7, sidelap=0.7, height=100.0,
+        scan_dimension_x=0.0, scan_dimension_y=0.0,
+        exposure_time_ms=2, camera_angle=camera_angle, camera_yaw=camera_yaw
+    )
+    footprint_x, footprint_y, _ = _tilted_image_footprint(camera, spec.height, spec.camera_angle, spec.camera_yaw)
+    n_side = max(1, round(math.sqrt(num_waypoints)))
+    # Half a cell short of n_side cells so the ceil in the planner lands exactly on n_side.
+    spec.scan_dimension_x = (n_side - 0.5) * footprint_x * (1.0 - spec.overlap)
+    spec.scan_dimension_y = (n_side - 0.5) * footprint_y * (1.0 - spec.sidelap)
+    return spec
+
+
+def time_call(fn: T.Callable[[], T.Any], repeat: int) -> float:
+    """Best wall-clock time of `repeat` calls, in seconds."""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'waypoints':>10} {'reference (s)':>14} {'batched (s)':>12} {'speedup':>8}")
+    for size in args.sizes:
+        spec = dataset_spec_for_num_waypoints(CAMERA_X10, size)
+        n = len(generate_photo_plan_on_grid(CAMERA_X10, spec))
+        # The reference loop is slow enough that a single run is representative.
+        reference_s = time_call(lambda: _generate_photo_plan_on_grid_reference(CAMERA_X10, spec), 1)
+        batched_s = time_call(lambda: generate_photo_plan_on_grid(CAMERA_X10, spec), args.repeat)
+        print(f"{n:>10} {reference_s:>14.4f} {batched_s:>12.4f} {reference_s / batched_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
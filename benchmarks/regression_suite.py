@@ -0,0 +1,241 @@
+"""Benchmark suite for the planning hot paths, with JSON baselines and regression checks.
+
+Every case is run at several sizes. Two numbers are recorded per case and size: the best wall-clock
+time of a few runs, and the peak memory allocated during one run (via tracemalloc, which also
+tracks NumPy buffers). The memory figure does not depend on the machine, and it exposes per-item
+allocations creeping into a batched loop even when timings are noisy.
+
+Usage:
+    python -m benchmarks.regression_suite --save benchmarks/baseline.json
+    python -m benchmarks.regression_suite --compare [baseline.json] [--threshold 0.25]
+
+With --compare the exit status is 1 if any case got slower or allocates more than the baseline by
+more than the threshold (a fraction, 0.25 = 25%). Without a path it compares against the committed
+`benchmarks/baseline.json`; its peak memory figures hold on any machine, its timings only on the
+machine it was recorded on, so re-record it with --save before comparing timings elsewhere.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+import typing as T
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from benchmarks.plan_generation_benchmark import CAMERA_X10, dataset_spec_for_num_waypoints, time_call
+from src import camera_utils, plan_io
+from src.plan_computation import _tilted_footprint_corners, _tilted_image_footprint, generate_photo_plan_on_grid
+
+DEFAULT_THRESHOLD = 0.25
+# Differences below these are noise, however large relative to the baseline.
+MIN_TIME_DELTA_S = 5e-4
+MIN_PEAK_BYTES_DELTA = 64 * 1024
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# A case maps a size to a zero-argument function running the code under test once, or to a context
+# manager yielding that function for cases holding resources (e.g. temporary files) while measured.
+Setup = T.Callable[[int], T.Union[T.Callable[[], T.Any], T.ContextManager[T.Callable[[], T.Any]]]]
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    setup: Setup
+    sizes: T.Sequence[int]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    size: int
+    time_s: float
+    peak_bytes: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+def _plan_generation(size: int) -> T.Callable[[], T.Any]:
+    spec = dataset_spec_for_num_waypoints(CAMERA_X10, size)
+    return lambda: generate_photo_plan_on_grid(CAMERA_X10, spec)
+
+
+def _oblique_plan_generation(size: int) -> T.Callable[[], T.Any]:
+    spec = dataset_spec_for_num_waypoints(CAMERA_X10, size, camera_angle=30.0, camera_yaw=45.0)
+    return lambda: generate_photo_plan_on_grid(CAMERA_X10, spec)
+
+
+def _tilted_footprint(size: int) -> T.Callable[[], T.Any]:
+    heights = np.linspace(50.0, 150.0, size).tolist()
+
+    def run() -> T.List[T.Any]:
+        # Start from empty caches so that every call does the reprojection of the corners.
+        _tilted_image_footprint.cache_clear()
+        _tilted_footprint_corners.cache_clear()
+        return [_tilted_image_footprint(CAMERA_X10, h, 20.0) for h in heights]
+
+    return run
+
+
+def _world_points(size: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-50.0, 50.0, size=(size, 3))
+    points[:, 2] = rng.uniform(50.0, 150.0, size=size)
+    return points
+
+
+def _projection(size: int) -> T.Callable[[], T.Any]:
+    points = _world_points(size)
+    out = np.empty((size, 2), dtype=np.float32)
+    return lambda: camera_utils.project_world_points_to_image(CAMERA_X10, points, out=out)
+
+
+def _reprojection(size: int) -> T.Callable[[], T.Any]:
+    points = _world_points(size)
+    image_points = camera_utils.project_world_points_to_image(CAMERA_X10, points, dtype=np.float64)
+    out = np.empty((size, 3), dtype=np.float32)
+    return lambda: camera_utils.reproject_image_points_to_world(CAMERA_X10, image_points, points[:, 2], out=out)
+
+
+def _serialization(size: int) -> T.Callable[[], T.Any]:
+    spec = dataset_spec_for_num_waypoints(CAMERA_X10, size)
+    plan = generate_photo_plan_on_grid(CAMERA_X10, spec)
+    return lambda: plan_io.plan_to_bytes(plan, CAMERA_X10, spec)
+
+
+def _deserialization(size: int) -> T.Callable[[], T.Any]:
+    spec = dataset_spec_for_num_waypoints(CAMERA_X10, size)
+    buffer = plan_io.plan_to_bytes(generate_photo_plan_on_grid(CAMERA_X10, spec), CAMERA_X10, spec)
+    return lambda: plan_io.plan_from_bytes(buffer)
+
+
+@contextlib.contextmanager
+def _save_and_load(size: int) -> T.Iterator[T.Callable[[], T.Any]]:
+    spec = dataset_spec_for_num_waypoints(CAMERA_X10, size)
+    plan = generate_photo_plan_on_grid(CAMERA_X10, spec)
+    with tempfile.TemporaryDirectory(prefix="plan_benchmark_") as directory:
+        path = os.path.join(directory, "plan.bin")
+
+        def run() -> None:
+            plan_io.save_plan(path, plan, CAMERA_X10, spec)
+            plan_io.load_plan(path, mmap=False)
+
+        yield run
+
+
+PLAN_SIZES = (10_000, 100_000, 1_000_000)
+POINT_SIZES = (100_000, 1_000_000)
+
+CASES = [
+    BenchmarkCase("generate_photo_plan_on_grid", _plan_generation, PLAN_SIZES),
+    BenchmarkCase("generate_photo_plan_on_grid_oblique", _oblique_plan_generation, PLAN_SIZES),
+    BenchmarkCase("tilted_image_footprint", _tilted_footprint, (1_000,)),
+    BenchmarkCase("project_world_points_to_image", _projection, POINT_SIZES),
+    BenchmarkCase("reproject_image_points_to_world", _reprojection, POINT_SIZES),
+    BenchmarkCase("plan_to_bytes", _serialization, PLAN_SIZES),
+    BenchmarkCase("plan_from_bytes", _deserialization, PLAN_SIZES),
+    BenchmarkCase("save_and_load_plan", _save_and_load, PLAN_SIZES),
+]
+
+
+def measure_peak_bytes(fn: T.Callable[[], T.Any]) -> int:
+    """Peak memory allocated while running `fn` once, excluding what was allocated before."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def _as_context(
+    setup: T.Union[T.Callable[[], T.Any], T.ContextManager[T.Callable[[], T.Any]]]
+) -> T.ContextManager[T.Callable[[], T.Any]]:
+    """The context manager of a `Setup` result; plain functions hold no resources."""
+    return setup if isinstance(setup, contextlib.AbstractContextManager) else contextlib.nullcontext(setup)
+
+
+def run_cases(
+    cases: T.Sequence[BenchmarkCase], repeat: int = 3, max_size: T.Optional[int] = None
+) -> T.List[BenchmarkResult]:
+    results = []
+    for case in cases:
+        for size in case.sizes:
+            if max_size is not None and size > max_size:
+                continue
+            with _as_context(case.setup(size)) as fn:
+                fn()  # warm up caches and lazy imports
+                results.append(BenchmarkResult(case.name, size, time_call(fn, repeat), measure_peak_bytes(fn)))
+    return results
+
+
+def save_results(path: str, results: T.Sequence[BenchmarkResult]) -> None:
+    with open(path, "w") as f:
+        json.dump({result.key: asdict(result) for result in results}, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> T.Dict[str, BenchmarkResult]:
+    with open(path) as f:
+        return {key: BenchmarkResult(**value) for key, value in json.load(f).items()}
+
+
+def find_regressions(
+    results: T.Sequence[BenchmarkResult], baseline: T.Dict[str, BenchmarkResult], threshold: float = DEFAULT_THRESHOLD
+) -> T.List[str]:
+    """Descriptions of the results that are slower or allocate more than the baseline by more than `threshold`."""
+    regressions = []
+    for result in results:
+        base = baseline.get(result.key)
+        if base is None:
+            continue
+        for metric, min_delta in (("time_s", MIN_TIME_DELTA_S), ("peak_bytes", MIN_PEAK_BYTES_DELTA)):
+            old, new = getattr(base, metric), getattr(result, metric)
+            if new > old * (1.0 + threshold) and new - old > min_delta:
+                change = new / max(old, 1e-12) - 1.0
+                regressions.append(f"{result.key} {metric}: {old:.6g} -> {new:.6g} ({change:+.0%})")
+    return regressions
+
+
+def main(argv: T.Optional[T.Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument(
+        "--compare", nargs="?", const=DEFAULT_BASELINE, help="compare against the baseline in this JSON file"
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-size", type=int, help="skip sizes above this")
+    parser.add_argument("--cases", nargs="+", help="run only the cases with these names")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if not args.cases or case.name in args.cases]
+    results = run_cases(cases, args.repeat, args.max_size)
+
+    print(f"{'case':<48} {'time (s)':>10} {'ns/item':>9} {'peak MiB':>9}")
+    for result in results:
+        print(
+            f"{result.key:<48} {result.time_s:>10.4f} {1e9 * result.time_s / result.size:>9.1f}"
+            f" {result.peak_bytes / 2 ** 20:>9.2f}"
+        )
+
+    if args.save:
+        save_results(args.save, results)
+    if args.compare:
+        regressions = find_regressions(results, load_results(args.compare), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,18 @@
 """Utility functions for the camera model.
+
+Cameras with non-zero Brown-Conrady coefficients (k1, k2, k3, p1, p2) are handled by mapping between
+observed (distorted) pixels and ideal pinhole pixels with `distort_image_points` and
+`undistort_image_points`; every other computation is the pinhole model on ideal pixels. Cameras
+without distortion take the plain pinhole path unchanged.
 """
 
+import math
+from typing import Optional, Tuple, Union
+
 import numpy as np
+from numpy.typing import DTypeLike
 
+from src import instrumentation
 from src.data_model import Camera
 
 
@@ -36,6 +46,8 @@ def project_world_point_to_image(camera: Camera, world_point: np.ndarray) -> np.
     y = camera.fy * (Y / Z)
     u = x + camera.cx
     v = y + camera.cy
+    if has_distortion(camera):
+        u, v = distort_image_points(camera, np.array([[u, v]], dtype=np.float64))[0]
     return np.array([u, v], dtype=np.float32)
 
 
@@ -52,11 +64,12 @@ def compute_image_footprint_on_surface(
         [footprint_x, footprint_y] in meters as a 2-element array.
     """
     # Reproject image corners (0,0) and (image_size_x_px, image_size_y_px) at Z = distance_from_surface
-    X0 = (0 - camera.cx) * distance_from_surface / camera.fx
-    Y0 = (0 - camera.cy) * distance_from_surface / camera.fy
+    (u0, v0), (u1, v1) = _ideal_image_corners(camera)
+    X0 = (u0 - camera.cx) * distance_from_surface / camera.fx
+    Y0 = (v0 - camera.cy) * distance_from_surface / camera.fy
 
-    X1 = (camera.image_size_x_px - camera.cx) * distance_from_surface / camera.fx
-    Y1 = (camera.image_size_y_px - camera.cy) * distance_from_surface / camera.fy
+    X1 = (u1 - camera.cx) * distance_from_surface / camera.fx
+    Y1 = (v1 - camera.cy) * distance_from_surface / camera.fy
 
     footprint_x = abs(X1 - X0)
     footprint_y = abs(Y1 - Y0)
@@ -94,7 +107,303 @@ def reproject_image_point_to_world(camera: Camera, image_point: np.ndarray, dept
         np.ndarray of shape (3,) representing (X, Y, Z).
     """
     u, v = image_point
+    if has_distortion(camera):
+        u, v = undistort_image_points(camera, np.array([[u, v]], dtype=np.float64))[0]
     X = (u - camera.cx) * depth / camera.fx
     Y = (v - camera.cy) * depth / camera.fy
     Z = depth
-    return np.array([X, Y, Z], dtype=np.float32)
\ No newline at end of file
+    return np.array([X, Y, Z], dtype=np.float32)
+
+
+def _prepare_output(out: Optional[np.ndarray], shape: Tuple[int, ...], dtype: DTypeLike) -> np.ndarray:
+    """Validate a caller-provided output buffer, or allocate one."""
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+    return out
+
+
+@instrumentation.timed("camera_utils.project_world_points_to_image")
+def project_world_points_to_image(
+    camera: Camera,
+    world_points: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    dtype: DTypeLike = np.float32,
+) -> np.ndarray:
+    """Project a batch of 3D world points into the image coordinates.
+
+    Args:
+        camera: the camera model
+        world_points: (N, 3) array of 3D world points
+        out: optional preallocated (N, 2) output array; `dtype` is ignored when given.
+        dtype: dtype of the returned array (float32 matches `project_world_point_to_image`).
+
+    Returns:
+        (N, 2) array of [u, v] pixel coordinates.
+    """
+    world_points = np.asarray(world_points)
+    if world_points.ndim != 2 or world_points.shape[1] != 3:
+        raise ValueError(f"world_points must have shape (N, 3), got {world_points.shape}")
+    out = _prepare_output(out, (world_points.shape[0], 2), dtype)
+    instrumentation.count("camera_utils.points_projected", world_points.shape[0])
+
+    Z = world_points[:, 2]
+    u, v = out[:, 0], out[:, 1]
+    np.divide(world_points[:, 0], Z, out=u)
+    np.multiply(u, camera.fx, out=u)
+    np.add(u, camera.cx, out=u)
+    np.divide(world_points[:, 1], Z, out=v)
+    np.multiply(v, camera.fy, out=v)
+    np.add(v, camera.cy, out=v)
+    if has_distortion(camera):
+        out[:] = distort_image_points(camera, out)
+    return out
+
+
+@instrumentation.timed("camera_utils.reproject_image_points_to_world")
+def reproject_image_points_to_world(
+    camera: Camera,
+    image_points: np.ndarray,
+    depth: Union[float, np.ndarray],
+    out: Optional[np.ndarray] = None,
+    dtype: DTypeLike = np.float32,
+) -> np.ndarray:
+    """Reproject a batch of 2D image points (u, v) to 3D world points (X, Y, Z) given their depth (Z).
+
+    Args:
+        camera: Camera object with intrinsic parameters.
+        image_points: (N, 2) array of (u, v).
+        depth: a single depth shared by all points, or an (N,) array of depths.
+        out: optional preallocated (N, 3) output array; `dtype` is ignored when given.
+        dtype: dtype of the returned array (float32 matches `reproject_image_point_to_world`).
+
+    Returns:
+        (N, 3) array of (X, Y, Z).
+    """
+    image_points = np.asarray(image_points)
+    if image_points.ndim != 2 or image_points.shape[1] != 2:
+        raise ValueError(f"image_points must have shape (N, 2), got {image_points.shape}")
+    out = _prepare_output(out, (image_points.shape[0], 3), dtype)
+    instrumentation.count("camera_utils.points_reprojected", image_points.shape[0])
+    if has_distortion(camera):
+        # Imported here: geometry_cache builds its caches from this module.
+        from src.geometry_cache import cached_undistortion_map
+
+        image_points = undistort_image_points(camera, image_points, undistortion_map=cached_undistortion_map(camera))
+
+    X, Y, Z = out[:, 0], out[:, 1], out[:, 2]
+    Z[:] = depth
+    np.subtract(image_points[:, 0], camera.cx, out=X)
+    np.multiply(X, Z, out=X)
+    np.divide(X, camera.fx, out=X)
+    np.subtract(image_points[:, 1], camera.cy, out=Y)
+    np.multiply(Y, Z, out=Y)
+    np.divide(Y, camera.fy, out=Y)
+    return out
+
+
+@instrumentation.timed("camera_utils.compute_image_footprints_on_surface")
+def compute_image_footprints_on_surface(
+    camera: Camera,
+    distances_from_surface: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    dtype: DTypeLike = np.float32,
+) -> np.ndarray:
+    """Compute the image footprint for a batch of distances from the surface.
+
+    Args:
+        camera: the camera model.
+        distances_from_surface: (N,) array of distances from the surface (in m).
+        out: optional preallocated (N, 2) output array; `dtype` is ignored when given.
+        dtype: dtype of the returned array (float32 matches `compute_image_footprint_on_surface`).
+
+    Returns:
+        (N, 2) array of [footprint_x, footprint_y] in meters.
+    """
+    distances_from_surface = np.asarray(distances_from_surface)
+    if distances_from_surface.ndim != 1:
+        raise ValueError(
+            f"distances_from_surface must have shape (N,), got {distances_from_surface.shape}"
+        )
+    out = _prepare_output(out, (distances_from_surface.shape[0], 2), dtype)
+
+    # The footprint is linear in the distance: the image spans image_size / f at unit distance.
+    (u0, v0), (u1, v1) = _ideal_image_corners(camera)
+    np.multiply(distances_from_surface, abs((u1 - u0) / camera.fx), out=out[:, 0])
+    np.multiply(distances_from_surface, abs((v1 - v0) / camera.fy), out=out[:, 1])
+    return out
+
+
+DISTORTION_COEFFICIENTS = ("k1", "k2", "k3", "p1", "p2")
+
+
+def has_distortion(camera: Camera) -> bool:
+    """Whether any Brown-Conrady coefficient of the camera is non-zero."""
+    return any(getattr(camera, name, 0.0) != 0.0 for name in DISTORTION_COEFFICIENTS)
+
+
+def _ideal_image_corners(camera: Camera) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """Ideal pinhole pixel coordinates of the image corners (0, 0) and (image_size_x_px, image_size_y_px)."""
+    corners = ((0.0, 0.0), (float(camera.image_size_x_px), float(camera.image_size_y_px)))
+    if not has_distortion(camera):
+        return corners
+    ideal = undistort_image_points(camera, np.array(corners, dtype=np.float64))
+    return (float(ideal[0, 0]), float(ideal[0, 1])), (float(ideal[1, 0]), float(ideal[1, 1]))
+
+
+def distort_normalized_points(camera: Camera, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Apply the Brown-Conrady model to normalized image coordinates (x, y) = (X / Z, Y / Z).
+
+    Args:
+        camera: the camera model.
+        x, y: arrays of undistorted normalized coordinates.
+
+    Returns:
+        The distorted normalized coordinates (x_d, y_d).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    r2 = x * x + y * y
+    radial = 1.0 + r2 * (camera.k1 + r2 * (camera.k2 + r2 * camera.k3))
+    xy = x * y
+    x_d = x * radial + 2.0 * camera.p1 * xy + camera.p2 * (r2 + 2.0 * x * x)
+    y_d = y * radial + camera.p1 * (r2 + 2.0 * y * y) + 2.0 * camera.p2 * xy
+    return x_d, y_d
+
+
+def undistort_normalized_points(
+    camera: Camera,
+    x_d: np.ndarray,
+    y_d: np.ndarray,
+    iterations: int = 20,
+    initial_guess: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Invert `distort_normalized_points` by fixed-point iteration.
+
+    Args:
+        camera: the camera model.
+        x_d, y_d: arrays of distorted normalized coordinates.
+        iterations: number of fixed-point iterations.
+        initial_guess: starting undistorted coordinates; defaults to the distorted ones.
+
+    Returns:
+        The undistorted normalized coordinates (x, y).
+    """
+    x_d = np.asarray(x_d, dtype=np.float64)
+    y_d = np.asarray(y_d, dtype=np.float64)
+    x, y = (x_d, y_d) if initial_guess is None else initial_guess
+    for _ in range(iterations):
+        r2 = x * x + y * y
+        radial = 1.0 + r2 * (camera.k1 + r2 * (camera.k2 + r2 * camera.k3))
+        xy = x * y
+        dx = 2.0 * camera.p1 * xy + camera.p2 * (r2 + 2.0 * x * x)
+        dy = camera.p1 * (r2 + 2.0 * y * y) + 2.0 * camera.p2 * xy
+        x = (x_d - dx) / radial
+        y = (y_d - dy) / radial
+    return x, y
+
+
+def distort_image_points(camera: Camera, image_points: np.ndarray) -> np.ndarray:
+    """Map ideal pinhole pixel coordinates to the observed (distorted) pixel coordinates.
+
+    Args:
+        camera: the camera model.
+        image_points: (N, 2) array of ideal (u, v).
+
+    Returns:
+        (N, 2) float64 array of distorted (u, v).
+    """
+    image_points = np.asarray(image_points, dtype=np.float64)
+    x_d, y_d = distort_normalized_points(
+        camera, (image_points[:, 0] - camera.cx) / camera.fx, (image_points[:, 1] - camera.cy) / camera.fy
+    )
+    return np.stack([x_d * camera.fx + camera.cx, y_d * camera.fy + camera.cy], axis=1)
+
+
+def _newton_undistort_step(
+    camera: Camera, x: np.ndarray, y: np.ndarray, x_d: np.ndarray, y_d: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """One Newton step of solving distort(x, y) = (x_d, y_d) for (x, y); the 2x2 Jacobian is analytic."""
+    r2 = x * x + y * y
+    radial = 1.0 + r2 * (camera.k1 + r2 * (camera.k2 + r2 * camera.k3))
+    d_radial = camera.k1 + r2 * (2.0 * camera.k2 + 3.0 * r2 * camera.k3)
+    xy = x * y
+    ex = x_d - (x * radial + 2.0 * camera.p1 * xy + camera.p2 * (r2 + 2.0 * x * x))
+    ey = y_d - (y * radial + camera.p1 * (r2 + 2.0 * y * y) + 2.0 * camera.p2 * xy)
+    j_xx = radial + 2.0 * x * x * d_radial + 2.0 * camera.p1 * y + 6.0 * camera.p2 * x
+    j_yy = radial + 2.0 * y * y * d_radial + 6.0 * camera.p1 * y + 2.0 * camera.p2 * x
+    j_xy = 2.0 * xy * d_radial + 2.0 * camera.p1 * x + 2.0 * camera.p2 * y
+    det = j_xx * j_yy - j_xy * j_xy
+    return x + (j_yy * ex - j_xy * ey) / det, y + (j_xx * ey - j_xy * ex) / det
+
+
+def compute_undistortion_map(camera: Camera, step_px: float = 16.0, iterations: int = 50) -> np.ndarray:
+    """Tabulate the undistorted normalized coordinates on a regular lattice of pixels.
+
+    Node (i, j) of the lattice is the pixel (j * step_px, i * step_px); the lattice covers the whole
+    image. `undistort_image_points` interpolates it to start from a guess close enough for a single
+    Newton step.
+
+    Args:
+        camera: the camera model.
+        step_px: lattice spacing in pixels.
+        iterations: fixed-point iterations used for every node.
+
+    Returns:
+        (rows, cols) complex array holding x + 1j * y, the undistorted normalized coordinates at the
+        lattice nodes (complex so that both are gathered with one lookup).
+    """
+    u = np.arange(math.ceil(camera.image_size_x_px / step_px) + 1) * step_px
+    v = np.arange(math.ceil(camera.image_size_y_px / step_px) + 1) * step_px
+    uu, vv = np.meshgrid(u, v)
+    x, y = undistort_normalized_points(camera, (uu - camera.cx) / camera.fx, (vv - camera.cy) / camera.fy, iterations)
+    return x + 1j * y
+
+
+@instrumentation.timed("camera_utils.undistort_image_points")
+def undistort_image_points(
+    camera: Camera,
+    image_points: np.ndarray,
+    iterations: int = 20,
+    undistortion_map: Optional[np.ndarray] = None,
+    map_step_px: float = 16.0,
+) -> np.ndarray:
+    """Map observed (distorted) pixel coordinates to ideal pinhole pixel coordinates.
+
+    Args:
+        camera: the camera model.
+        image_points: (N, 2) array of distorted (u, v).
+        iterations: fixed-point iterations when no `undistortion_map` is given.
+        undistortion_map: optional table from `compute_undistortion_map` (e.g. the cached one from
+            `geometry_cache.cached_undistortion_map`). Its bilinear interpolation is refined with one
+            Newton step instead of iterating, which is both faster and more accurate.
+        map_step_px: lattice spacing the map was computed with.
+
+    Returns:
+        (N, 2) float64 array of ideal (u, v).
+    """
+    image_points = np.asarray(image_points, dtype=np.float64)
+    if image_points.ndim != 2 or image_points.shape[1] != 2:
+        raise ValueError(f"image_points must have shape (N, 2), got {image_points.shape}")
+    x_d = (image_points[:, 0] - camera.cx) / camera.fx
+    y_d = (image_points[:, 1] - camera.cy) / camera.fy
+
+    if undistortion_map is None:
+        x, y = undistort_normalized_points(camera, x_d, y_d, iterations)
+    else:
+        rows, cols = undistortion_map.shape
+        # Bilinear interpolation in the cell containing the point. Points outside the map are clamped to
+        # its border, so their guess is the map value at the nearest edge and only the Newton step refines it.
+        col = np.clip(image_points[:, 0] / map_step_px, 0.0, cols - 1.0)
+        row = np.clip(image_points[:, 1] / map_step_px, 0.0, rows - 1.0)
+        col0 = np.minimum(col.astype(np.int64), max(cols - 2, 0))
+        row0 = np.minimum(row.astype(np.int64), max(rows - 2, 0))
+        fx, fy = col - col0, row - row0
+        flat = undistortion_map.ravel()
+        index = row0 * cols + col0
+        top = flat.take(index) * (1 - fx) + flat.take(index + 1) * fx
+        bottom = flat.take(index + cols) * (1 - fx) + flat.take(index + cols + 1) * fx
+        guess = top * (1 - fy) + bottom * fy
+        x, y = _newton_undistort_step(camera, guess.real, guess.imag, x_d, y_d)
+    return np.stack([x * camera.fx + camera.cx, y * camera.fy + camera.cy], axis=1)
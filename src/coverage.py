@@ -0,0 +1,291 @@
+"""Verify that a photo plan achieves the coverage, overlap and sidelap requested in the dataset spec.
+
+Each waypoint's ground footprint (the quadrilateral from `_tilted_footprint_corners` for its camera pose) is rasterized
+onto a regular grid of cells. Every footprint is converted into one column span per raster row it
+crosses and the spans are accumulated with a difference array, so the cost is linear in the number
+of (footprint, row) pairs plus the number of cells -- there is no pairwise comparison of images.
+"""
+
+import math
+import typing as T
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.multi_drone import detect_row_starts, row_axis
+from src.plan_computation import _tilted_footprint_corners
+
+
+@dataclass
+class RasterGrid:
+    """Regular grid of square cells; cell (row, col) is centred at origin + (col + 0.5, row + 0.5) * cell_size_m."""
+    origin_x_m: float
+    origin_y_m: float
+    cell_size_m: float
+    num_rows: int
+    num_cols: int
+
+    @classmethod
+    def covering(cls, x_min: float, y_min: float, x_max: float, y_max: float, cell_size_m: float) -> "RasterGrid":
+        """Smallest grid anchored at (x_min, y_min) that covers the given bounds."""
+        num_cols = max(1, math.ceil((x_max - x_min) / cell_size_m))
+        num_rows = max(1, math.ceil((y_max - y_min) / cell_size_m))
+        return cls(x_min, y_min, cell_size_m, num_rows, num_cols)
+
+    def cell_centers(self) -> T.Tuple[np.ndarray, np.ndarray]:
+        """x coordinates of the column centres and y coordinates of the row centres."""
+        xs = self.origin_x_m + (np.arange(self.num_cols) + 0.5) * self.cell_size_m
+        ys = self.origin_y_m + (np.arange(self.num_rows) + 0.5) * self.cell_size_m
+        return xs, ys
+
+
+@dataclass
+class CoverageReport:
+    """Result of `verify_plan_coverage`."""
+    grid: RasterGrid
+    multiplicity: np.ndarray  # (num_rows, num_cols) number of images covering each cell
+    num_gap_cells: int         # cells inside the scan area not covered by any image
+    gap_fraction: float        # num_gap_cells / number of cells in the scan area
+    min_multiplicity: int
+    mean_multiplicity: float
+    achieved_overlap: float    # smallest overlap between consecutive images of a row (NaN if none)
+    achieved_sidelap: float    # smallest overlap between adjacent rows (NaN if a single row)
+    meets_spec: bool
+
+    @property
+    def gap_mask(self) -> np.ndarray:
+        return self.multiplicity == 0
+
+
+def plan_footprint_quads(camera: Camera, plan: WaypointArray) -> np.ndarray:
+    """
+    Ground footprint of every waypoint as an (N, 4, 2) array of quadrilateral corners.
+
+    The footprint for a camera at height h is the unit-height footprint of its gimbal pose
+    (pitch_deg, roll_deg, gimbal_yaw_deg) scaled by h, so the corners are reprojected once per
+    distinct pose -- once for a grid plan -- and broadcast over the plan. The height of each
+    waypoint is taken relative to its look-at point (ground level 0 when the look-at is unset).
+    """
+    if not len(plan):
+        return np.empty((0, 4, 2))
+    pose = np.stack([plan.pitch_deg, plan.gimbal_yaw_deg, plan.roll_deg], axis=1)
+    if (pose == pose[0]).all():
+        # Grid plans: skip sorting the poses.
+        poses, pose_index = pose[:1], np.zeros(len(pose), dtype=np.int64)
+    else:
+        poses, pose_index = np.unique(pose, axis=0, return_inverse=True)
+    unit_corners = np.stack([_tilted_footprint_corners(camera, 1.0, *map(float, pose))[:, :2] for pose in poses])
+    heights = plan.z_m - np.nan_to_num(plan.look_at_z_m, nan=0.0)
+
+    quads = unit_corners.reshape(-1, 4, 2)[pose_index.reshape(-1)] * heights[:, None, None]
+    quads[:, :, 0] += plan.x_m[:, None]
+    quads[:, :, 1] += plan.y_m[:, None]
+    return quads
+
+
+def _footprint_row_spans(
+    quads: np.ndarray, grid: RasterGrid
+) -> T.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cells of `grid` whose centre lies in each convex quadrilateral, as row spans: (quad index, row,
+    first column, last column) per non-empty span.
+    """
+    cs = grid.cell_size_m
+    # Raster rows whose centre lies within each footprint's y extent.
+    y_min = quads[:, :, 1].min(axis=1)
+    y_max = quads[:, :, 1].max(axis=1)
+    row_lo = np.maximum(np.ceil((y_min - grid.origin_y_m) / cs - 0.5), 0).astype(np.int64)
+    row_hi = np.minimum(np.floor((y_max - grid.origin_y_m) / cs - 0.5), grid.num_rows - 1).astype(np.int64)
+    num_rows = np.maximum(row_hi - row_lo + 1, 0)
+
+    # Per-edge line parameters, shape (n, 4): x = edge_x + (y - edge_y) * edge_inv_slope.
+    p = quads
+    q = np.roll(quads, -1, axis=1)
+    edge_y_lo = np.minimum(p[:, :, 1], q[:, :, 1])
+    edge_y_hi = np.maximum(p[:, :, 1], q[:, :, 1])
+    # Horizontal edges never cross a row centre strictly; their endpoints are covered by the
+    # neighbouring edges.
+    edge_y_hi = np.where(edge_y_hi > edge_y_lo, edge_y_hi, -np.inf)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        edge_inv_slope = (q[:, :, 0] - p[:, :, 0]) / (q[:, :, 1] - p[:, :, 1])
+    edge_inv_slope = np.nan_to_num(edge_inv_slope, nan=0.0, posinf=0.0, neginf=0.0)
+    edge_x = p[:, :, 0]
+    edge_y = p[:, :, 1]
+
+    # Expand to one entry per (footprint, row) pair.
+    fp = np.repeat(np.arange(quads.shape[0]), num_rows)
+    first = np.cumsum(num_rows) - num_rows
+    row = row_lo[fp] + np.arange(fp.shape[0]) - np.repeat(first, num_rows)
+    y = (grid.origin_y_m + (row + 0.5) * cs)[:, None]
+
+    # Intersect the horizontal line through the row centre with each edge of the quad.
+    x = edge_x[fp] + (y - edge_y[fp]) * edge_inv_slope[fp]
+    crosses = (edge_y_lo[fp] <= y) & (y <= edge_y_hi[fp])
+    x_lo = np.where(crosses, x, np.inf).min(axis=1)
+    x_hi = np.where(crosses, x, -np.inf).max(axis=1)
+
+    # Columns whose centre lies within [x_lo, x_hi].
+    with np.errstate(invalid="ignore"):
+        col_lo = np.ceil((x_lo - grid.origin_x_m) / cs - 0.5)
+        col_hi = np.floor((x_hi - grid.origin_x_m) / cs - 0.5)
+    col_lo = np.clip(col_lo, 0, grid.num_cols)
+    col_hi = np.clip(col_hi, -1, grid.num_cols - 1)
+    valid = np.isfinite(x_lo) & (col_lo <= col_hi)
+    return fp[valid], row[valid], col_lo[valid].astype(np.int64), col_hi[valid].astype(np.int64)
+
+
+def footprint_cells(quads: np.ndarray, grid: RasterGrid) -> T.Tuple[np.ndarray, np.ndarray]:
+    """
+    (quad index, flat cell index) of every cell of `grid` whose centre lies in each convex
+    quadrilateral, the cells `rasterize_footprints` counts for it.
+    """
+    fp, row, col_lo, col_hi = _footprint_row_spans(quads, grid)
+    length = col_hi - col_lo + 1
+    first = np.cumsum(length) - length
+    offset = np.arange(length.sum()) - np.repeat(first, length)
+    return np.repeat(fp, length), np.repeat(row * grid.num_cols + col_lo, length) + offset
+
+
+def rasterize_footprints(quads: np.ndarray, grid: RasterGrid, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Count, for every cell of `grid`, how many convex quadrilaterals contain its centre.
+
+    Args:
+        quads: (N, 4, 2) array of convex quadrilateral corners, in order around the boundary.
+        grid: raster grid to accumulate into.
+        chunk_size: number of footprints processed per batch; bounds the temporary memory.
+
+    Returns:
+        (num_rows, num_cols) int32 array of multiplicities.
+    """
+    # One extra column so that span ends can be written unconditionally.
+    size = grid.num_rows * (grid.num_cols + 1)
+    diff = np.zeros(size, dtype=np.int64)
+    pending_starts: T.List[np.ndarray] = []
+    pending_ends: T.List[np.ndarray] = []
+    num_pending = 0
+
+    def flush() -> None:
+        nonlocal num_pending
+        if num_pending:
+            diff[:] += np.bincount(np.concatenate(pending_starts), minlength=size)
+            diff[:] -= np.bincount(np.concatenate(pending_ends), minlength=size)
+        pending_starts.clear()
+        pending_ends.clear()
+        num_pending = 0
+
+    for start in range(0, quads.shape[0], chunk_size):
+        _, row, col_lo, col_hi = _footprint_row_spans(quads[start:start + chunk_size], grid)
+        base = row * (grid.num_cols + 1)
+        pending_starts.append(base + col_lo)
+        pending_ends.append(base + col_hi + 1)
+        num_pending += pending_starts[-1].shape[0]
+        # Accumulate into the full-size difference array only occasionally.
+        if num_pending >= size:
+            flush()
+    flush()
+
+    multiplicity = np.cumsum(diff.reshape(grid.num_rows, grid.num_cols + 1), axis=1, dtype=np.int32)
+    return multiplicity[:, :grid.num_cols]
+
+
+def _achieved_overlaps(plan: WaypointArray, quads: np.ndarray) -> T.Tuple[float, float]:
+    """
+    Smallest overlap between neighbouring images along a row and between adjacent rows.
+
+    Rows are segmented along the flight path (`detect_row_starts`), so rotated, clipped and
+    terrain-following plans are handled. Positions and footprints are measured in the frame of the
+    `row_axis`; sorting by (row, along-row coordinate) puts along-row neighbours next to each other,
+    so no spatial search is needed.
+    """
+    axis = row_axis(plan)
+    c, s = math.cos(axis), math.sin(axis)
+    along, across = c * plan.x_m + s * plan.y_m, c * plan.y_m - s * plan.x_m
+    quad_along = c * quads[:, :, 0] + s * quads[:, :, 1]
+    quad_across = c * quads[:, :, 1] - s * quads[:, :, 0]
+    widths = quad_along.max(axis=1) - quad_along.min(axis=1)
+    heights = quad_across.max(axis=1) - quad_across.min(axis=1)
+
+    row_starts = detect_row_starts(plan)
+    num_rows = row_starts.shape[0]
+    row_id = np.repeat(np.arange(num_rows), np.diff(np.append(row_starts, len(plan))))
+    order = np.lexsort((along, row_id))
+    same_row = row_id[order][1:] == row_id[order][:-1]
+
+    achieved_overlap = math.nan
+    if same_row.any():
+        dx = np.diff(along[order])[same_row]
+        width = np.minimum(widths[order][1:], widths[order][:-1])[same_row]
+        achieved_overlap = float(np.min(1.0 - dx / width))
+
+    achieved_sidelap = math.nan
+    if num_rows > 1:
+        row_size = np.bincount(row_id, minlength=num_rows)
+        row_across = np.bincount(row_id, weights=across, minlength=num_rows) / row_size
+        row_height = np.full(num_rows, np.inf)
+        np.minimum.at(row_height, row_id, heights)
+        row_order = np.argsort(row_across)
+        dy = np.diff(row_across[row_order])
+        height = np.minimum(row_height[row_order][1:], row_height[row_order][:-1])
+        achieved_sidelap = float(np.min(1.0 - dy / height))
+
+    return achieved_overlap, achieved_sidelap
+
+
+def verify_plan_coverage(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    plan: WaypointArray,
+    cell_size_m: T.Optional[float] = None,
+    tolerance: float = 1e-6,
+) -> CoverageReport:
+    """
+    Check that a plan covers the scan area of `dataset_spec` and achieves its overlap and sidelap.
+
+    Args:
+        camera: the camera model.
+        dataset_spec: specification the plan was generated for; the scan area is the rectangle of
+            size scan_dimension_x x scan_dimension_y centred at the origin.
+        plan: plan to verify, e.g. from `generate_photo_plan_on_grid`.
+        cell_size_m: raster resolution. Defaults to 1/10th of the smaller footprint side.
+        tolerance: slack allowed on the overlap/sidelap comparison.
+
+    Returns:
+        A `CoverageReport` with the per-cell multiplicity over the scan area.
+    """
+    quads = plan_footprint_quads(camera, plan)
+    if cell_size_m is None:
+        extent = quads.max(axis=1) - quads.min(axis=1)
+        cell_size_m = float(extent.min()) / 10.0 if len(plan) else 1.0
+        cell_size_m = max(cell_size_m, 1e-3)
+
+    half_x = dataset_spec.scan_dimension_x / 2.0
+    half_y = dataset_spec.scan_dimension_y / 2.0
+    grid = RasterGrid.covering(-half_x, -half_y, half_x, half_y, cell_size_m)
+    multiplicity = rasterize_footprints(quads, grid)
+
+    # Only cells whose centre is inside the scan area count towards gaps.
+    xs, ys = grid.cell_centers()
+    inside = (np.abs(ys)[:, None] <= half_y) & (np.abs(xs)[None, :] <= half_x)
+    covered = multiplicity[inside]
+    num_gap_cells = int(np.count_nonzero(covered == 0))
+
+    achieved_overlap, achieved_sidelap = _achieved_overlaps(plan, quads) if len(plan) else (math.nan, math.nan)
+    meets_spec = num_gap_cells == 0
+    if not math.isnan(achieved_overlap):
+        meets_spec &= achieved_overlap >= dataset_spec.overlap - tolerance
+    if not math.isnan(achieved_sidelap):
+        meets_spec &= achieved_sidelap >= dataset_spec.sidelap - tolerance
+
+    return CoverageReport(
+        grid=grid,
+        multiplicity=multiplicity,
+        num_gap_cells=num_gap_cells,
+        gap_fraction=num_gap_cells / max(1, covered.shape[0]),
+        min_multiplicity=int(covered.min()) if covered.shape[0] else 0,
+        mean_multiplicity=float(covered.mean()) if covered.shape[0] else 0.0,
+        achieved_overlap=achieved_overlap,
+        achieved_sidelap=achieved_sidelap,
+        meets_spec=bool(meets_spec),
+    )
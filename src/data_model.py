@@ -1,8 +1,12 @@
 """Data models for the camera and user specification."""
 
 
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
+import math
+from dataclasses import dataclass, fields
+from typing import ClassVar, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
 
 @dataclass
 class Camera:
@@ -14,6 +18,39 @@ class Camera:
     sensor_size_y_mm: float  # sensor height in mm
     image_size_x_px: int     # image width in pixels
     image_size_y_px: int     # image height in pixels
+    k1: float = 0.0          # Brown-Conrady radial distortion coefficients
+    k2: float = 0.0
+    k3: float = 0.0
+    p1: float = 0.0          # Brown-Conrady tangential distortion coefficients
+    p2: float = 0.0
+
+    def frozen(self) -> "FrozenCamera":
+        """Immutable, hashable copy of this camera (e.g. for use as a cache key)."""
+        return FrozenCamera(**{f.name: getattr(self, f.name) for f in fields(self)})
+
+@dataclass(frozen=True)
+class FrozenCamera:
+    """Immutable, hashable variant of `Camera`; the fields mirror `Camera`."""
+    fx: float
+    fy: float
+    cx: float
+    cy: float
+    sensor_size_x_mm: float
+    sensor_size_y_mm: float
+    image_size_x_px: int
+    image_size_y_px: int
+    k1: float = 0.0
+    k2: float = 0.0
+    k3: float = 0.0
+    p1: float = 0.0
+    p2: float = 0.0
+
+    def frozen(self) -> "FrozenCamera":
+        return self
+
+    def thaw(self) -> Camera:
+        """Mutable copy of this camera."""
+        return Camera(**{f.name: getattr(self, f.name) for f in fields(self)})
 
 @dataclass
 class DatasetSpec:
@@ -24,6 +61,32 @@ class DatasetSpec:
     scan_dimension_y: float       # Vertical size of scan area (meters)
     exposure_time_ms: float
     camera_angle: float = 0.0     # Angle from nadir (in degrees), default is 0 (nadir) 
+    camera_yaw: float = 0.0       # Rotation of the camera about the vertical axis (degrees, counter-clockwise)
+    camera_roll: float = 0.0      # Rotation of the camera about its optical axis (degrees)
+
+    def frozen(self) -> "FrozenDatasetSpec":
+        """Immutable, hashable copy of this spec (e.g. for use as a cache key)."""
+        return FrozenDatasetSpec(**{f.name: getattr(self, f.name) for f in fields(self)})
+
+@dataclass(frozen=True)
+class FrozenDatasetSpec:
+    """Immutable, hashable variant of `DatasetSpec`; the fields mirror `DatasetSpec`."""
+    overlap: float
+    sidelap: float
+    height: float
+    scan_dimension_x: float
+    scan_dimension_y: float
+    exposure_time_ms: float
+    camera_angle: float = 0.0
+    camera_yaw: float = 0.0
+    camera_roll: float = 0.0
+
+    def frozen(self) -> "FrozenDatasetSpec":
+        return self
+
+    def thaw(self) -> DatasetSpec:
+        """Mutable copy of this spec."""
+        return DatasetSpec(**{f.name: getattr(self, f.name) for f in fields(self)})
 
 @dataclass
 class Waypoint:
@@ -31,10 +94,16 @@ class Waypoint:
     Waypoint for the flight plan.
 
     x_m, y_m: planar coordinates in meters (local frame, origin = scan center)
-    z_m: altitude above ground in meters
+    z_m: altitude in meters. Its datum depends on the producer and is recorded as the
+        `altitude_reference` of a `WaypointArray`: height above the flat ground (z = 0) of the scan
+        area for grid plans ("relative"), an elevation in the DEM's vertical datum after
+        `apply_terrain_following` ("absolute"). look_at_z_m uses the same datum.
     speed_m_s: desired speed while capturing at this waypoint (m/s)
-    yaw_deg: optional yaw for the drone in degrees
+    yaw_deg: direction of the look-at point seen from the waypoint, atan2(dy, dx) in degrees (counter-clockwise
+        from +X; 0 when looking straight down)
     look_at_x_m, look_at_y_m, look_at_z_m: optional point the camera should look at (useful for non-nadir)
+    pitch_deg, roll_deg, gimbal_yaw_deg: gimbal pose in degrees -- pitch from nadir, roll about the optical axis
+        and yaw about the vertical axis (counter-clockwise, 0 = tilting towards +Y); see `camera_rotation`
     """
     x_m: float
     y_m: float
@@ -44,3 +113,121 @@ class Waypoint:
     look_at_x_m: Optional[float] = None
     look_at_y_m: Optional[float] = None
     look_at_z_m: Optional[float] = None
+    pitch_deg: float = 0.0
+    roll_deg: float = 0.0
+    gimbal_yaw_deg: float = 0.0
+
+
+# Datums of z_m: height above the flat ground of the local frame, or an absolute elevation.
+ALTITUDE_REFERENCES = ("relative", "absolute")
+
+
+@dataclass(eq=False)
+class WaypointArray:
+    """
+    Structure-of-arrays flight plan: one 1-D float64 column per `Waypoint` attribute.
+
+    Indexing with an integer returns a `Waypoint`; slices, boolean masks and index arrays return a
+    new `WaypointArray`. Iteration yields `Waypoint` objects lazily, so large plans never have to be
+    materialized as Python objects. Missing look-at coordinates are stored as NaN; the gimbal pose
+    columns (pitch, roll, gimbal yaw) default to zeros (nadir) when omitted. `altitude_reference`
+    records the datum of the z_m and look_at_z_m columns (see `Waypoint.z_m`).
+
+    Columns are not necessarily contiguous: those of a plan loaded with `plan_io` are strided views
+    into the file's records, and slices with a step are strided views too. Use `np.ascontiguousarray`
+    where an algorithm needs contiguous memory.
+    """
+    x_m: np.ndarray
+    y_m: np.ndarray
+    z_m: np.ndarray
+    speed_m_s: np.ndarray
+    yaw_deg: np.ndarray
+    look_at_x_m: np.ndarray
+    look_at_y_m: np.ndarray
+    look_at_z_m: np.ndarray
+    pitch_deg: Optional[np.ndarray] = None
+    roll_deg: Optional[np.ndarray] = None
+    gimbal_yaw_deg: Optional[np.ndarray] = None
+    altitude_reference: str = "relative"  # one of ALTITUDE_REFERENCES
+
+    COLUMNS: ClassVar[Tuple[str, ...]] = (
+        "x_m", "y_m", "z_m", "speed_m_s", "yaw_deg", "look_at_x_m", "look_at_y_m", "look_at_z_m",
+        "pitch_deg", "roll_deg", "gimbal_yaw_deg",
+    )
+
+    def __post_init__(self) -> None:
+        if self.altitude_reference not in ALTITUDE_REFERENCES:
+            raise ValueError(
+                f"altitude_reference must be one of {ALTITUDE_REFERENCES}, got {self.altitude_reference!r}"
+            )
+        n = None
+        for name in self.COLUMNS:
+            value = getattr(self, name)
+            if value is None:
+                value = np.zeros(len(self.x_m))
+            column = np.asarray(value, dtype=np.float64)
+            if column.ndim != 1:
+                raise ValueError(f"Column {name} must be 1-D, got shape {column.shape}")
+            if n is None:
+                n = column.shape[0]
+            elif column.shape[0] != n:
+                raise ValueError(f"Column {name} has {column.shape[0]} entries, expected {n}")
+            setattr(self, name, column)
+
+    @classmethod
+    def empty(cls, n: int) -> "WaypointArray":
+        """Allocate an uninitialized plan with `n` waypoints."""
+        return cls(*(np.empty(n, dtype=np.float64) for _ in cls.COLUMNS))
+
+    @classmethod
+    def from_waypoints(cls, waypoints: Sequence[Waypoint]) -> "WaypointArray":
+        """Pack a sequence of `Waypoint` objects into columns."""
+        columns = [
+            np.fromiter(
+                (np.nan if getattr(wp, name) is None else getattr(wp, name) for wp in waypoints),
+                dtype=np.float64,
+                count=len(waypoints),
+            )
+            for name in cls.COLUMNS
+        ]
+        return cls(*columns)
+
+    @classmethod
+    def concatenate(cls, plans: Sequence["WaypointArray"]) -> "WaypointArray":
+        """Join several plans end to end; they must share one altitude reference."""
+        if len(plans) == 0:
+            return cls.empty(0)
+        references = {p.altitude_reference for p in plans}
+        if len(references) > 1:
+            raise ValueError(f"Cannot join plans with different altitude references {sorted(references)}")
+        return cls(
+            *(np.concatenate([getattr(p, name) for p in plans]) for name in cls.COLUMNS),
+            altitude_reference=plans[0].altitude_reference,
+        )
+
+    def __len__(self) -> int:
+        return self.x_m.shape[0]
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray]) -> Union[Waypoint, "WaypointArray"]:
+        if isinstance(index, (int, np.integer)):
+            return self._waypoint_at(int(index))
+        return WaypointArray(
+            *(getattr(self, name)[index] for name in self.COLUMNS), altitude_reference=self.altitude_reference
+        )
+
+    def __iter__(self) -> Iterator[Waypoint]:
+        for i in range(len(self)):
+            yield self._waypoint_at(i)
+
+    def _waypoint_at(self, index: int) -> Waypoint:
+        values = [float(getattr(self, name)[index]) for name in self.COLUMNS]
+        look_at = [None if math.isnan(v) else v for v in values[5:8]]
+        return Waypoint(*values[:5], *look_at, *values[8:])
+
+    def to_list(self) -> List[Waypoint]:
+        """Materialize the plan as a list of `Waypoint` objects."""
+        return list(self)
+
+    def positions(self) -> np.ndarray:
+        """Waypoint positions as an (N, 3) array."""
+        return np.stack([self.x_m, self.y_m, self.z_m], axis=1)
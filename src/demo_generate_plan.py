@@ -1,7 +1,12 @@
-import pprint
+import argparse
+from src import instrumentation
 from src.data_model import Camera, DatasetSpec
 from src.plan_computation import generate_photo_plan_on_grid
 
+parser = argparse.ArgumentParser(description="Generate a photo plan for the X10 camera.")
+parser.add_argument("--profile", action="store_true", help="print the time spent in every planning stage")
+args = parser.parse_args()
+
 camera_x10 = Camera(
     fx=4938.56, fy=4936.49, cx=4095.5, cy=3071.5,
     sensor_size_x_mm=13.107, sensor_size_y_mm=9.830,
@@ -14,9 +19,14 @@ dataset_spec = DatasetSpec(
     exposure_time_ms=2, camera_angle=0.0
 )
 
-plan = generate_photo_plan_on_grid(camera_x10, dataset_spec)
+profile = instrumentation.HistogramSink()
+with instrumentation.instrumented(*([profile] if args.profile else [])):
+    plan = generate_photo_plan_on_grid(camera_x10, dataset_spec)
 print(f"Computed plan with {len(plan)} waypoints")
 for i, wp in enumerate(plan[:20]):
     print(f"Idx {i}: {wp}")
 if len(plan) > 20:
-    print("...")
\ No newline at end of file
+    print("...")
+if args.profile:
+    print()
+    print(profile.format_table())
@@ -0,0 +1,37 @@
+import os
+import time
+
+import numpy as np
+
+from src.data_model import Camera, DatasetSpec
+from src.parameter_sweep import sweep_dataset_specs
+
+camera_x10 = Camera(
+    fx=4938.56, fy=4936.49, cx=4095.5, cy=3071.5,
+    sensor_size_x_mm=13.107, sensor_size_y_mm=9.830,
+    image_size_x_px=8192, image_size_y_px=6144
+)
+
+dataset_spec = DatasetSpec(
+    overlap=0.7, sidelap=0.7, height=100.0,
+    scan_dimension_x=5000.0, scan_dimension_y=5000.0,
+    exposure_time_ms=2, camera_angle=0.0
+)
+
+variations = {
+    "height": np.linspace(40.0, 150.0, 12),
+    "overlap": [0.6, 0.7, 0.8, 0.9],
+    "sidelap": [0.6, 0.7, 0.8],
+    "camera_angle": [0.0, 15.0, 30.0],
+}
+
+if __name__ == "__main__":
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        table = sweep_dataset_specs(camera_x10, dataset_spec, variations, max_workers=workers, chunksize=4)
+        print(f"{workers:>2} workers: {len(table['height'])} specs in {time.perf_counter() - start:.2f}s")
+        workers *= 2
+
+    best = int(np.argmin(table["duration_s"]))
+    print("Fastest plan:", {name: column[best].item() for name, column in table.items()})
@@ -0,0 +1,100 @@
+"""Bounded LRU caches for camera geometry that is recomputed for the same inputs.
+
+Footprints, GSD, tilt matrices and grid layouts depend only on the (camera, height, angle, spec)
+they are computed from. `geometry_cache` memoizes such functions: `Camera` and `DatasetSpec`
+arguments are converted to their frozen, hashable variants to form the cache key, and every cache
+is registered so that hit/miss statistics can be read with `cache_stats`.
+
+Cached NumPy results are shared between callers and are therefore returned read-only.
+"""
+
+import functools
+import typing as T
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.camera_utils import (
+    compute_ground_sampling_distance,
+    compute_image_footprint_on_surface,
+    compute_undistortion_map,
+)
+
+DEFAULT_MAXSIZE = 1024
+
+_F = T.TypeVar("_F", bound=T.Callable[..., T.Any])
+_CACHES: T.Dict[str, T.Any] = {}
+
+
+@dataclass
+class CacheStats:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _freeze(value: T.Any) -> T.Any:
+    frozen = getattr(value, "frozen", None)
+    return frozen() if callable(frozen) else value
+
+
+def _read_only(value: T.Any) -> T.Any:
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for item in value:
+            _read_only(item)
+    return value
+
+
+def geometry_cache(name: str, maxsize: int = DEFAULT_MAXSIZE) -> T.Callable[[_F], _F]:
+    """Decorator memoizing a geometry function in a bounded LRU cache registered under `name`.
+
+    Args:
+        name: key of the cache in `cache_stats()`; must be unique.
+        maxsize: maximum number of entries kept.
+    """
+    def decorator(fn: _F) -> _F:
+        if name in _CACHES:
+            raise ValueError(f"A geometry cache named {name!r} is already registered")
+
+        @functools.lru_cache(maxsize=maxsize)
+        def cached(*args: T.Any, **kwargs: T.Any) -> T.Any:
+            return _read_only(fn(*args, **kwargs))
+
+        @functools.wraps(fn)
+        def wrapper(*args: T.Any, **kwargs: T.Any) -> T.Any:
+            return cached(*map(_freeze, args), **{k: _freeze(v) for k, v in kwargs.items()})
+
+        wrapper.cache_info = cached.cache_info  # type: ignore[attr-defined]
+        wrapper.cache_clear = cached.cache_clear  # type: ignore[attr-defined]
+        _CACHES[name] = cached
+        return T.cast(_F, wrapper)
+
+    return decorator
+
+
+def cache_stats() -> T.Dict[str, CacheStats]:
+    """Hit/miss statistics of every registered geometry cache."""
+    stats = {}
+    for name, cached in _CACHES.items():
+        info = cached.cache_info()
+        stats[name] = CacheStats(info.hits, info.misses, info.currsize, info.maxsize)
+    return stats
+
+
+def clear_caches() -> None:
+    """Empty every registered geometry cache and reset its statistics."""
+    for cached in _CACHES.values():
+        cached.cache_clear()
+
+
+cached_image_footprint_on_surface = geometry_cache("image_footprint")(compute_image_footprint_on_surface)
+cached_ground_sampling_distance = geometry_cache("ground_sampling_distance")(compute_ground_sampling_distance)
+cached_undistortion_map = geometry_cache("undistortion_map", maxsize=16)(compute_undistortion_map)
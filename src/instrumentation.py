@@ -0,0 +1,235 @@
+"""Optional stage timers and counters for the planning code.
+
+Planning functions wrap their stages in `stage(name)` and report quantities with `count(name, n)`.
+Both do nothing unless a sink is installed, which costs one global check per call, so the hooks can
+stay in the hot paths. Install sinks for a block of code with `instrumented`:
+
+    sink = HistogramSink()
+    with instrumented(sink):
+        generate_photo_plan_on_grid(camera, dataset_spec)
+    print(sink.format_table())
+
+Sinks receive every timing and counter as it is recorded: `LoggingSink` logs them, `HistogramSink`
+keeps them in memory for a per-stage breakdown and `PrometheusSink` aggregates them into the
+Prometheus text exposition format. Sinks are process-wide; worker processes (e.g. of the parameter
+sweep) are not instrumented.
+"""
+
+import bisect
+import contextlib
+import functools
+import logging
+import math
+import threading
+import time
+import typing as T
+from collections import defaultdict
+from dataclasses import dataclass
+
+_F = T.TypeVar("_F", bound=T.Callable[..., T.Any])
+
+# Upper bounds (seconds) of the Prometheus histogram buckets.
+DEFAULT_BUCKETS_S = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+
+class Sink(T.Protocol):
+    def record_time(self, name: str, seconds: float) -> None:
+        ...
+
+    def record_count(self, name: str, value: float) -> None:
+        ...
+
+
+_SINKS: T.List[Sink] = []
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start = 0
+
+    def __enter__(self) -> "_Stage":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: T.Any) -> None:
+        seconds = (time.perf_counter_ns() - self.start) * 1e-9
+        for sink in _SINKS:
+            sink.record_time(self.name, seconds)
+
+
+def enabled() -> bool:
+    """Whether any sink is installed; use it to skip computing expensive counters."""
+    return bool(_SINKS)
+
+
+def stage(name: str) -> T.ContextManager[T.Any]:
+    """Context manager timing the enclosed block as stage `name`."""
+    return _Stage(name) if _SINKS else _NULL_STAGE
+
+
+def count(name: str, value: float = 1) -> None:
+    """Add `value` to counter `name`."""
+    for sink in _SINKS:
+        sink.record_count(name, value)
+
+
+def timed(name: str) -> T.Callable[[_F], _F]:
+    """Decorator timing every call of a function as stage `name`."""
+    def decorator(fn: _F) -> _F:
+        @functools.wraps(fn)
+        def wrapper(*args: T.Any, **kwargs: T.Any) -> T.Any:
+            if not _SINKS:
+                return fn(*args, **kwargs)
+            with _Stage(name):
+                return fn(*args, **kwargs)
+
+        return T.cast(_F, wrapper)
+
+    return decorator
+
+
+def add_sink(sink: Sink) -> None:
+    _SINKS.append(sink)
+
+
+def remove_sink(sink: Sink) -> None:
+    _SINKS.remove(sink)
+
+
+@contextlib.contextmanager
+def instrumented(*sinks: Sink) -> T.Iterator[None]:
+    """Install `sinks` for the duration of the block."""
+    for sink in sinks:
+        add_sink(sink)
+    try:
+        yield
+    finally:
+        for sink in sinks:
+            remove_sink(sink)
+
+
+class LoggingSink:
+    """Logs every timing and counter."""
+
+    def __init__(self, logger: T.Optional[logging.Logger] = None, level: int = logging.DEBUG) -> None:
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def record_time(self, name: str, seconds: float) -> None:
+        self.logger.log(self.level, "stage %s took %.3f ms", name, seconds * 1e3)
+
+    def record_count(self, name: str, value: float) -> None:
+        self.logger.log(self.level, "counter %s += %g", name, value)
+
+
+@dataclass
+class StageSummary:
+    calls: int
+    total_s: float
+    mean_s: float
+    p50_s: float
+    p95_s: float
+    max_s: float
+
+
+def _percentile(sorted_values: T.Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted, non-empty sequence."""
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class HistogramSink:
+    """Keeps every timing in memory, for per-stage percentiles and a printable breakdown."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.timings: T.Dict[str, T.List[float]] = defaultdict(list)
+        self.counters: T.Dict[str, float] = defaultdict(float)
+
+    def record_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[name].append(seconds)
+
+    def record_count(self, name: str, value: float) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self) -> T.Dict[str, StageSummary]:
+        """Per-stage statistics, in the order the stages were first recorded."""
+        with self._lock:
+            timings = {name: sorted(values) for name, values in self.timings.items()}
+        return {
+            name: StageSummary(
+                calls=len(values),
+                total_s=sum(values),
+                mean_s=sum(values) / len(values),
+                p50_s=_percentile(values, 0.5),
+                p95_s=_percentile(values, 0.95),
+                max_s=values[-1],
+            )
+            for name, values in timings.items()
+        }
+
+    def format_table(self) -> str:
+        """Per-stage breakdown followed by the counters, as a text table."""
+        lines = [f"{'stage':<48} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9}"]
+        for name, s in self.summary().items():
+            lines.append(f"{name:<48} {s.calls:>7} {s.total_s * 1e3:>10.3f} {s.mean_s * 1e3:>9.3f} {s.p95_s * 1e3:>9.3f}")
+        with self._lock:
+            counters = dict(self.counters)
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':<48} {'value':>10}")
+            lines.extend(f"{name:<48} {value:>10g}" for name, value in counters.items())
+        return "\n".join(lines)
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+class PrometheusSink:
+    """Aggregates timings into histograms and counters for the Prometheus text exposition format."""
+
+    def __init__(self, prefix: str = "drone_planning", buckets_s: T.Sequence[float] = DEFAULT_BUCKETS_S) -> None:
+        self.prefix = prefix
+        self.buckets_s = tuple(sorted(buckets_s))
+        self._lock = threading.Lock()
+        # per stage: per-bucket (non-cumulative) counts with a final +Inf bucket, sum of seconds
+        self._histograms: T.Dict[str, T.Tuple[T.List[int], T.List[float]]] = {}
+        self._counters: T.Dict[str, float] = defaultdict(float)
+
+    def record_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            buckets, total = self._histograms.setdefault(name, ([0] * (len(self.buckets_s) + 1), [0.0]))
+            buckets[bisect.bisect_left(self.buckets_s, seconds)] += 1
+            total[0] += seconds
+
+    def record_count(self, name: str, value: float) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format (version 0.0.4)."""
+        stage_metric = f"{self.prefix}_stage_duration_seconds"
+        lines = [f"# HELP {stage_metric} Duration of planning stages.", f"# TYPE {stage_metric} histogram"]
+        with self._lock:
+            histograms = {name: (list(b), t[0]) for name, (b, t) in self._histograms.items()}
+            counters = dict(self._counters)
+        for name, (buckets, total) in histograms.items():
+            cumulative = 0
+            for bound, n in zip((*self.buckets_s, math.inf), buckets):
+                cumulative += n
+                le = "+Inf" if math.isinf(bound) else f"{bound:g}"
+                lines.append(f'{stage_metric}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{stage_metric}_sum{{stage="{name}"}} {total:.9g}')
+            lines.append(f'{stage_metric}_count{{stage="{name}"}} {cumulative}')
+        for name, value in counters.items():
+            metric = f"{self.prefix}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
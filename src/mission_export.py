@@ -0,0 +1,314 @@
+"""Export plans to autopilot and GIS formats: QGroundControl WPL, KML, GeoJSON and CSV.
+
+Plans live in a local metric frame (x east, y north, z up, origin = scan center). They are placed on
+the WGS84 ellipsoid with a `GeodeticOrigin` using an exact, vectorized ENU -> ECEF -> geodetic
+conversion. Every writer accepts either a `WaypointArray` or an iterable of chunks (e.g. from
+`iter_photo_plan_on_grid`), converts and formats one chunk at a time and writes through a large
+buffer, so memory use does not depend on the plan size.
+
+Altitudes follow one convention in all writers, selected by the `altitude_reference` recorded in
+the plan (`WaypointArray.altitude_reference`):
+
+- "relative": z_m is the height above the origin altitude, as in flat-ground plans from
+  `generate_photo_plan_on_grid`; the absolute height is `GeodeticOrigin.altitude_m + z_m`.
+- "absolute": z_m is an elevation in the vertical datum of `GeodeticOrigin.altitude_m`, as in
+  terrain-following plans from `apply_terrain_following` with a DEM in that datum; it is written
+  unchanged.
+
+x and y are placed on the ellipsoid at the origin altitude and the height is applied along the local
+vertical, so the Earth's curvature does not change the altitude of waypoints far from the origin.
+The writers' `altitude_reference` argument, when given, must match the plan's: it guards against
+exporting terrain-following elevations as heights above the origin.
+
+The CSV, GeoJSON and KML (`absolute` altitude mode) outputs always carry the absolute height of the
+waypoint. The WPL mission uses MAV_FRAME_GLOBAL_RELATIVE_ALT with z_m for relative plans, the home
+item being the origin, and MAV_FRAME_GLOBAL with the absolute height otherwise.
+"""
+
+import math
+import typing as T
+from dataclasses import dataclass
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from src.data_model import ALTITUDE_REFERENCES, WaypointArray
+
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
+WGS84_B = WGS84_A * (1.0 - WGS84_F)
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+WGS84_EP2 = WGS84_E2 / (1.0 - WGS84_E2)
+
+DEFAULT_CHUNK_SIZE = 65536
+_BUFFER_SIZE = 1 << 20
+
+# MAVLink constants used in WPL files
+_MAV_FRAME_GLOBAL = 0
+_MAV_FRAME_GLOBAL_RELATIVE_ALT = 3
+_MAV_CMD_NAV_WAYPOINT = 16
+_MAV_CMD_DO_CHANGE_SPEED = 178
+_MAV_CMD_DO_DIGICAM_CONTROL = 203
+
+PlanSource = T.Union[WaypointArray, T.Iterable[WaypointArray]]
+_LOOK_AT_COLUMNS = ("look_at_x_m", "look_at_y_m", "look_at_z_m")  # NaN when the look-at point is unset
+
+
+@dataclass
+class GeodeticOrigin:
+    """WGS84 position of the local frame origin (the scan center)."""
+    latitude_deg: float
+    longitude_deg: float
+    altitude_m: float = 0.0  # ellipsoidal height of the origin
+
+
+def local_to_geodetic(
+    origin: GeodeticOrigin, x_m: np.ndarray, y_m: np.ndarray, z_m: np.ndarray
+) -> T.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert local east/north/up coordinates to WGS84 latitude, longitude (degrees) and ellipsoidal
+    height (meters). Uses Bowring's formula for the ECEF -> geodetic step (sub-millimetre accurate
+    near the Earth's surface).
+    """
+    lat0, lon0 = math.radians(origin.latitude_deg), math.radians(origin.longitude_deg)
+    sin_lat, cos_lat = math.sin(lat0), math.cos(lat0)
+    sin_lon, cos_lon = math.sin(lon0), math.cos(lon0)
+    n0 = WGS84_A / math.sqrt(1.0 - WGS84_E2 * sin_lat * sin_lat)
+    x0 = (n0 + origin.altitude_m) * cos_lat * cos_lon
+    y0 = (n0 + origin.altitude_m) * cos_lat * sin_lon
+    z0 = (n0 * (1.0 - WGS84_E2) + origin.altitude_m) * sin_lat
+
+    # ENU -> ECEF
+    X = x0 - sin_lon * x_m - sin_lat * cos_lon * y_m + cos_lat * cos_lon * z_m
+    Y = y0 + cos_lon * x_m - sin_lat * sin_lon * y_m + cos_lat * sin_lon * z_m
+    Z = z0 + cos_lat * y_m + sin_lat * z_m
+
+    # ECEF -> geodetic (Bowring)
+    p = np.hypot(X, Y)
+    theta = np.arctan2(Z * WGS84_A, p * WGS84_B)
+    lat = np.arctan2(
+        Z + WGS84_EP2 * WGS84_B * np.sin(theta) ** 3,
+        p - WGS84_E2 * WGS84_A * np.cos(theta) ** 3,
+    )
+    lon = np.arctan2(Y, X)
+    sin_lat_p = np.sin(lat)
+    n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sin_lat_p * sin_lat_p)
+    height = p / np.cos(lat) - n
+    return np.degrees(lat), np.degrees(lon), height
+
+
+def _chunks(plan: PlanSource, chunk_size: int) -> T.Iterator[WaypointArray]:
+    if isinstance(plan, WaypointArray):
+        for start in range(0, len(plan), chunk_size):
+            yield plan[start:start + chunk_size]
+    else:
+        yield from plan
+
+
+def _check_altitude_reference(altitude_reference: T.Optional[str]) -> None:
+    if altitude_reference is not None and altitude_reference not in ALTITUDE_REFERENCES:
+        raise ValueError(f"altitude_reference must be one of {ALTITUDE_REFERENCES}, got {altitude_reference!r}")
+
+
+def _chunk_altitude_reference(chunk: WaypointArray, altitude_reference: T.Optional[str]) -> str:
+    """The altitude reference of `chunk`, which must match `altitude_reference` if one is given."""
+    if altitude_reference is not None and altitude_reference != chunk.altitude_reference:
+        raise ValueError(f"Cannot export a plan of {chunk.altitude_reference} altitudes as {altitude_reference}")
+    return chunk.altitude_reference
+
+
+def _chunk_to_geodetic(
+    origin: GeodeticOrigin, chunk: WaypointArray, altitude_reference: str
+) -> T.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Latitude, longitude and absolute height of the waypoints of `chunk` (see the module docstring).
+
+    Only x/y go through the ENU conversion: converting z_m as local up as well would add the drop of
+    the ellipsoid below the tangent plane, about d^2 / 2R (some 2 m at 5 km from the origin).
+    """
+    lat, lon, _ = local_to_geodetic(origin, chunk.x_m, chunk.y_m, np.zeros(len(chunk)))
+    height = origin.altitude_m + chunk.z_m if altitude_reference == "relative" else chunk.z_m
+    return lat, lon, height
+
+
+def _csv_column(values: np.ndarray, optional: bool) -> T.List[str]:
+    """CSV fields of a plan column; missing (NaN) values of optional columns are empty fields."""
+    if optional:
+        return ["" if math.isnan(v) else "%.3f" % v for v in values.tolist()]
+    return ["%.3f" % v for v in values.tolist()]
+
+
+def _json_number(value: float, fmt: str) -> str:
+    """`fmt % value`, or `null` for values JSON numbers cannot represent (NaN, infinities)."""
+    return fmt % value if math.isfinite(value) else "null"
+
+
+def _heading_deg(yaw_deg: np.ndarray) -> np.ndarray:
+    """Plan yaw (counter-clockwise from east) to compass heading (clockwise from north)."""
+    return (90.0 - yaw_deg) % 360.0
+
+
+def write_qgc_wpl(
+    path: str,
+    plan: PlanSource,
+    origin: GeodeticOrigin,
+    trigger_camera: bool = True,
+    acceptance_radius_m: float = 1.0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    altitude_reference: T.Optional[str] = None,
+) -> int:
+    """
+    Write a QGroundControl WPL 110 mission: a home item at the origin, then for every waypoint a
+    NAV_WAYPOINT at its altitude (see the module docstring) and heading, a DO_CHANGE_SPEED whenever
+    the capture speed changes and, with `trigger_camera`, a DO_DIGICAM_CONTROL shot.
+
+    Returns:
+        The number of mission items written.
+    """
+    _check_altitude_reference(altitude_reference)
+    seq = 0
+    last_speed = math.nan
+    with open(path, "w", buffering=_BUFFER_SIZE, newline="\n") as f:
+        f.write("QGC WPL 110\n")
+        f.write(
+            f"0\t1\t{_MAV_FRAME_GLOBAL}\t{_MAV_CMD_NAV_WAYPOINT}\t0\t0\t0\t0\t"
+            f"{origin.latitude_deg:.8f}\t{origin.longitude_deg:.8f}\t{origin.altitude_m:.3f}\t1\n"
+        )
+        seq = 1
+        for chunk in _chunks(plan, chunk_size):
+            reference = _chunk_altitude_reference(chunk, altitude_reference)
+            frame = _MAV_FRAME_GLOBAL_RELATIVE_ALT if reference == "relative" else _MAV_FRAME_GLOBAL
+            lat, lon, height = _chunk_to_geodetic(origin, chunk, reference)
+            altitude = chunk.z_m if reference == "relative" else height
+            heading = _heading_deg(chunk.yaw_deg)
+            lines = []
+            for la, lo, alt, hdg, speed in zip(
+                lat.tolist(), lon.tolist(), altitude.tolist(), heading.tolist(), chunk.speed_m_s.tolist()
+            ):
+                if speed != last_speed:
+                    lines.append(
+                        f"{seq}\t0\t{_MAV_FRAME_GLOBAL_RELATIVE_ALT}\t{_MAV_CMD_DO_CHANGE_SPEED}\t"
+                        f"1\t{speed:.3f}\t-1\t0\t0\t0\t0\t1"
+                    )
+                    seq += 1
+                    last_speed = speed
+                lines.append(
+                    f"{seq}\t0\t{frame}\t{_MAV_CMD_NAV_WAYPOINT}\t"
+                    f"0\t{acceptance_radius_m:g}\t0\t{hdg:.2f}\t{la:.8f}\t{lo:.8f}\t{alt:.3f}\t1"
+                )
+                seq += 1
+                if trigger_camera:
+                    lines.append(
+                        f"{seq}\t0\t{_MAV_FRAME_GLOBAL_RELATIVE_ALT}\t{_MAV_CMD_DO_DIGICAM_CONTROL}\t"
+                        f"0\t0\t0\t0\t1\t0\t0\t1"
+                    )
+                    seq += 1
+            if lines:
+                f.write("\n".join(lines))
+                f.write("\n")
+    return seq
+
+
+def write_csv(
+    path: str,
+    plan: PlanSource,
+    origin: GeodeticOrigin,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    altitude_reference: T.Optional[str] = None,
+) -> int:
+    """
+    Write one row per waypoint with its WGS84 position (absolute height) followed by the local plan
+    columns; an unset look-at point gives empty fields.
+
+    Returns:
+        The number of waypoints written.
+    """
+    _check_altitude_reference(altitude_reference)
+    columns = ["index", "latitude_deg", "longitude_deg", "altitude_m", *WaypointArray.COLUMNS]
+    count = 0
+    with open(path, "w", buffering=_BUFFER_SIZE, newline="\n") as f:
+        f.write(",".join(columns) + "\n")
+        for chunk in _chunks(plan, chunk_size):
+            lat, lon, alt = _chunk_to_geodetic(origin, chunk, _chunk_altitude_reference(chunk, altitude_reference))
+            position = (
+                "%d,%.8f,%.8f,%.3f" % row
+                for row in zip(range(count, count + len(chunk)), lat.tolist(), lon.tolist(), alt.tolist())
+            )
+            fields = [_csv_column(getattr(chunk, name), name in _LOOK_AT_COLUMNS) for name in WaypointArray.COLUMNS]
+            if len(chunk):
+                f.write("\n".join(",".join(row) for row in zip(position, *fields)))
+                f.write("\n")
+            count += len(chunk)
+    return count
+
+
+def write_kml(
+    path: str,
+    plan: PlanSource,
+    origin: GeodeticOrigin,
+    name: str = "Photo plan",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    altitude_reference: T.Optional[str] = None,
+) -> int:
+    """
+    Write the flight path as a KML LineString at absolute altitudes.
+
+    Returns:
+        The number of waypoints written.
+    """
+    _check_altitude_reference(altitude_reference)
+    count = 0
+    with open(path, "w", buffering=_BUFFER_SIZE, newline="\n") as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n'
+            f"<Placemark>\n<name>{escape(name)}</name>\n<LineString>\n"
+            "<altitudeMode>absolute</altitudeMode>\n<coordinates>\n"
+        )
+        for chunk in _chunks(plan, chunk_size):
+            lat, lon, alt = _chunk_to_geodetic(origin, chunk, _chunk_altitude_reference(chunk, altitude_reference))
+            if len(chunk):
+                f.write("\n".join(
+                    "%.8f,%.8f,%.3f" % row for row in zip(lon.tolist(), lat.tolist(), alt.tolist())
+                ))
+                f.write("\n")
+            count += len(chunk)
+        f.write("</coordinates>\n</LineString>\n</Placemark>\n</Document>\n</kml>\n")
+    return count
+
+
+def write_geojson(
+    path: str,
+    plan: PlanSource,
+    origin: GeodeticOrigin,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    altitude_reference: T.Optional[str] = None,
+) -> int:
+    """
+    Write a GeoJSON FeatureCollection with one Point feature per waypoint ([lon, lat, absolute
+    height]) carrying its index, capture speed and heading; speeds and headings that are not finite
+    numbers are written as `null`.
+
+    Returns:
+        The number of waypoints written.
+    """
+    fmt = (
+        '{"type":"Feature","geometry":{"type":"Point","coordinates":[%.8f,%.8f,%.3f]},'
+        '"properties":{"index":%d,"speed_m_s":%s,"heading_deg":%s}}'
+    )
+    _check_altitude_reference(altitude_reference)
+    count = 0
+    with open(path, "w", buffering=_BUFFER_SIZE, newline="\n") as f:
+        f.write('{"type":"FeatureCollection","features":[\n')
+        for chunk in _chunks(plan, chunk_size):
+            lat, lon, alt = _chunk_to_geodetic(origin, chunk, _chunk_altitude_reference(chunk, altitude_reference))
+            rows = zip(
+                lon.tolist(), lat.tolist(), alt.tolist(), range(count, count + len(chunk)),
+                (_json_number(v, "%.3f") for v in chunk.speed_m_s.tolist()),
+                (_json_number(v, "%.2f") for v in _heading_deg(chunk.yaw_deg).tolist()),
+            )
+            if len(chunk):
+                f.write((",\n" if count else "") + ",\n".join(fmt % row for row in rows))
+            count += len(chunk)
+        f.write("\n]}\n")
+    return count
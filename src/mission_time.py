@@ -0,0 +1,217 @@
+"""Mission duration and energy estimates for a photo plan under a simple kinematic model.
+
+Between two waypoints the drone follows a trapezoidal (or triangular) speed profile: it accelerates
+at the maximum acceleration up to the maximum speed and decelerates in time to reach the speed
+allowed at the next waypoint. At a waypoint the speed is
+- the capture speed of the waypoint (fly-through capture), or
+- zero for stop-and-shoot capture, at the first and last waypoints, and wherever the flight direction
+  changes (e.g. the row turns of a serpentine), where the drone also has to yaw at its turn rate.
+
+Energy uses P(v) = hover_power + drag_coefficient * v^2 with v the mean speed over the segment.
+"""
+
+import math
+import typing as T
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.data_model import WaypointArray
+
+
+@dataclass
+class KinematicModel:
+    max_speed_m_s: float = 16.0
+    max_acceleration_m_s2: float = 3.5
+    turn_rate_deg_s: float = 90.0             # yaw rate while turning in place at a direction change
+    stop_and_shoot: bool = False              # stop at every waypoint instead of capturing on the fly
+    capture_time_s: float = 0.0               # hover time per image in stop-and-shoot mode
+    turn_threshold_deg: float = 1.0           # direction changes above this stop the drone
+
+
+@dataclass
+class BatteryModel:
+    capacity_wh: float = 100.0
+    hover_power_w: float = 250.0
+    drag_power_coefficient: float = 0.5       # extra power per (m/s)^2 of speed, in W s^2 / m^2
+    reserve_fraction: float = 0.2             # fraction of the capacity kept in reserve
+
+    @property
+    def usable_wh(self) -> float:
+        return self.capacity_wh * (1.0 - self.reserve_fraction)
+
+    def power_w(self, speed_m_s: np.ndarray) -> np.ndarray:
+        return self.hover_power_w + self.drag_power_coefficient * np.square(speed_m_s)
+
+
+@dataclass
+class Sortie:
+    """Waypoints [start, stop) of the plan flown on one battery, including transits to/from launch."""
+    start: int
+    stop: int
+    time_s: float
+    energy_wh: float
+
+
+@dataclass
+class MissionEstimate:
+    segment_time_s: np.ndarray      # (N - 1,) flight time from waypoint i to i + 1
+    dwell_time_s: np.ndarray        # (N,) time spent at waypoint i (turning, stop-and-shoot capture)
+    segment_energy_wh: np.ndarray   # (N - 1,)
+    dwell_energy_wh: np.ndarray     # (N,)
+    sorties: T.List[Sortie] = field(default_factory=list)
+
+    @property
+    def flight_time_s(self) -> float:
+        """Time to fly the plan in one go, without transits or battery swaps."""
+        return float(self.segment_time_s.sum() + self.dwell_time_s.sum())
+
+    @property
+    def total_time_s(self) -> float:
+        """Sum of the sortie times, including transits to and from the launch point."""
+        return float(sum(s.time_s for s in self.sorties))
+
+    @property
+    def total_energy_wh(self) -> float:
+        return float(sum(s.energy_wh for s in self.sorties))
+
+
+def segment_times(
+    distance_m: np.ndarray,
+    entry_speed_m_s: np.ndarray,
+    exit_speed_m_s: np.ndarray,
+    max_speed_m_s: float,
+    max_acceleration_m_s2: float,
+) -> np.ndarray:
+    """
+    Minimum time to cover each distance starting at the entry speed and ending at the exit speed,
+    with bounded speed and acceleration (trapezoidal or triangular speed profile).
+
+    If the exit speed cannot be reached within the distance, the segment is flown at constant
+    acceleration between the two speeds.
+    """
+    d = np.asarray(distance_m, dtype=np.float64)
+    v0 = np.minimum(entry_speed_m_s, max_speed_m_s)
+    v1 = np.minimum(exit_speed_m_s, max_speed_m_s)
+    a = max_acceleration_m_s2
+
+    peak = np.minimum(np.sqrt(a * d + 0.5 * (v0 * v0 + v1 * v1)), max_speed_m_s)
+    ramp_distance = (2.0 * peak * peak - v0 * v0 - v1 * v1) / (2.0 * a)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (2.0 * peak - v0 - v1) / a + np.maximum(d - ramp_distance, 0.0) / peak
+        constant_accel = 2.0 * d / (v0 + v1)
+    infeasible = peak < np.maximum(v0, v1)
+    t = np.where(infeasible, constant_accel, t)
+    return np.where(d > 0.0, t, 0.0)
+
+
+def _split_into_sorties(
+    plan: WaypointArray,
+    estimate: MissionEstimate,
+    kinematics: KinematicModel,
+    battery: BatteryModel,
+    launch_xy: T.Optional[T.Tuple[float, float]],
+) -> T.List[Sortie]:
+    """Greedily cut the plan into consecutive sorties that fit the usable battery energy."""
+    n = len(plan)
+    if launch_xy is None:
+        transit_m = np.zeros(n)
+    else:
+        transit_m = np.hypot(plan.x_m - launch_xy[0], plan.y_m - launch_xy[1])
+    cruise = kinematics.max_speed_m_s
+    transit_time_s = transit_m / cruise
+    transit_wh = transit_time_s * float(battery.power_w(np.float64(cruise))) / 3600.0
+
+    # Energy of waypoints [s, e] is dwell[s..e] + segments[s..e-1]; use prefix sums for both.
+    dwell_prefix = np.concatenate([[0.0], np.cumsum(estimate.dwell_energy_wh)])
+    seg_prefix = np.concatenate([[0.0], np.cumsum(estimate.segment_energy_wh)])
+    dwell_time_prefix = np.concatenate([[0.0], np.cumsum(estimate.dwell_time_s)])
+    seg_time_prefix = np.concatenate([[0.0], np.cumsum(estimate.segment_time_s)])
+
+    # Cumulative energy from the start of the plan through waypoint e; nondecreasing in e.
+    through = dwell_prefix[1:] + seg_prefix[:n]
+
+    budget = battery.usable_wh
+    sorties = []
+    start = 0
+    while start < n:
+        # Last waypoint reachable ignoring the return transit, then the exact check below it.
+        base = dwell_prefix[start] + seg_prefix[start] - transit_wh[start]
+        limit = int(np.searchsorted(through, budget + base, side="right"))
+        end_candidates = np.arange(start, max(limit, start + 1))
+        energy = (
+            transit_wh[start]
+            + dwell_prefix[end_candidates + 1] - dwell_prefix[start]
+            + seg_prefix[end_candidates] - seg_prefix[start]
+            + transit_wh[end_candidates]
+        )
+        feasible = np.nonzero(energy <= budget)[0]
+        if feasible.shape[0] == 0:
+            raise ValueError(f"Waypoint {start} cannot be reached and returned from on one battery")
+        end = int(end_candidates[feasible[-1]])
+        time_s = (
+            transit_time_s[start]
+            + dwell_time_prefix[end + 1] - dwell_time_prefix[start]
+            + seg_time_prefix[end] - seg_time_prefix[start]
+            + transit_time_s[end]
+        )
+        sorties.append(Sortie(start, end + 1, float(time_s), float(energy[feasible[-1]])))
+        start = end + 1
+    return sorties
+
+
+def estimate_mission(
+    plan: WaypointArray,
+    kinematics: T.Optional[KinematicModel] = None,
+    battery: T.Optional[BatteryModel] = None,
+    launch_xy: T.Optional[T.Tuple[float, float]] = None,
+) -> MissionEstimate:
+    """
+    Estimate the flight time and energy of a plan and split it into battery-feasible sorties.
+
+    Args:
+        plan: the plan, e.g. from `generate_photo_plan_on_grid`.
+        kinematics: speed, acceleration and turn limits. Defaults to `KinematicModel()`.
+        battery: battery and power model. Defaults to `BatteryModel()`.
+        launch_xy: launch/landing point. Each sortie flies there and back at maximum speed; when
+            None the transits are ignored.
+
+    Returns:
+        A `MissionEstimate` with per-segment and per-waypoint times/energies and the sorties.
+    """
+    kinematics = kinematics or KinematicModel()
+    battery = battery or BatteryModel()
+    n = len(plan)
+
+    delta = np.diff(plan.positions(), axis=0)
+    distance = np.linalg.norm(delta, axis=1)
+    heading = np.arctan2(delta[:, 1], delta[:, 0])
+
+    # Direction change at each interior waypoint, wrapped to [0, pi].
+    turn = np.zeros(n)
+    if n > 2:
+        turn[1:-1] = np.abs((np.diff(heading) + math.pi) % (2.0 * math.pi) - math.pi)
+    stops = turn > math.radians(kinematics.turn_threshold_deg)
+    if n:
+        stops[0] = stops[-1] = True
+    if kinematics.stop_and_shoot:
+        stops[:] = True
+
+    waypoint_speed = np.where(stops, 0.0, np.minimum(plan.speed_m_s, kinematics.max_speed_m_s))
+    segment_time_s = segment_times(
+        distance, waypoint_speed[:-1], waypoint_speed[1:], kinematics.max_speed_m_s,
+        kinematics.max_acceleration_m_s2,
+    )
+    dwell_time_s = turn / math.radians(kinematics.turn_rate_deg_s)
+    if kinematics.stop_and_shoot:
+        dwell_time_s += kinematics.capture_time_s
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_speed = np.where(segment_time_s > 0.0, distance / segment_time_s, 0.0)
+    segment_energy_wh = segment_time_s * battery.power_w(mean_speed) / 3600.0
+    dwell_energy_wh = dwell_time_s * battery.hover_power_w / 3600.0
+
+    estimate = MissionEstimate(segment_time_s, dwell_time_s, segment_energy_wh, dwell_energy_wh)
+    if n:
+        estimate.sorties = _split_into_sorties(plan, estimate, kinematics, battery, launch_xy)
+    return estimate
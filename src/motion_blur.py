@@ -0,0 +1,322 @@
+"""Motion-blur limited capture speed for every waypoint of a plan, for any camera pose and terrain.
+
+`compute_speed_during_photo_capture` bounds the speed by the nadir GSD at the nominal height. With a
+tilted camera the near edge of the image sees the ground much closer than the look-at point, and
+over terrain the distance to the ground changes from waypoint to waypoint. Here the displacement of
+the camera during the exposure is projected through the full pose into a lattice of pixels spanning
+the image (same pose and distortion model as the footprint): a camera displacement D moves the
+image of a ground point at camera-frame position (X, Y, Z) by
+
+    du = fx / Z * (dX - X / Z * dZ),  dv = fy / Z * (dY - Y / Z * dZ),  with (dX, dY, dZ) = -R^T D.
+
+The pixel that moves the most (the binding pixel) sets the speed. On flat ground every ground point
+scales with the height, so the image motion per meter of displacement is computed and cached at unit
+height per camera pose and divided by the height of each waypoint above its look-at point. Waypoints
+that share a pose and a direction of travel share one evaluation of the lattice, so a grid plan costs
+a few lattice evaluations plus O(N) array arithmetic.
+
+Without a DEM the ground seen from each waypoint is approximated by the horizontal plane through its
+look-at point. Over sloped terrain this misjudges the distance to the near edge of the image, which
+is often the binding pixel. Given a DEM, every lattice ray of every waypoint is intersected with the
+terrain (`terrain._terrain_crossings`), and the motion of each pixel is scaled by its actual depth.
+This costs O(N * samples_per_axis^2) ray marching.
+
+For a nadir camera over flat ground, the `"any"` direction model gives exactly the speed of
+`compute_speed_during_photo_capture`.
+"""
+
+import typing as T
+from dataclasses import dataclass
+
+import numpy as np
+
+from src import instrumentation
+from src.camera_utils import has_distortion, undistort_image_points
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.geometry_cache import cached_undistortion_map, geometry_cache
+from src.plan_computation import _camera_rotation, _footprint_lattice
+from src.terrain import ElevationModel, _terrain_crossings
+
+DEFAULT_SAMPLES_PER_AXIS = 9
+DIRECTIONS = ("travel", "any")
+
+# Directions of travel are grouped on a lattice of this many radians of heading and climb angle.
+_ANGLE_QUANTUM_RAD = 1e-6
+_CHUNK_SIZE = 65536
+# Terrain ray marching: step and bisection tolerance, as in `apply_terrain_following`.
+_TERRAIN_STEP = 0.25
+_TERRAIN_TOLERANCE_M = 1e-3
+
+
+@geometry_cache("unit_blur_jacobians")
+def _unit_blur_jacobians(
+    camera: Camera,
+    samples_per_axis: int,
+    camera_angle_deg: float = 0.0,
+    camera_yaw_deg: float = 0.0,
+    camera_roll_deg: float = 0.0,
+) -> T.Tuple[np.ndarray, np.ndarray]:
+    """
+    (uv, jacobians) of the lattice for a camera at unit height above flat ground: the (K, 2) lattice
+    pixels and the (K, 2, 3) image motion in pixels per meter of camera displacement in the world
+    frame. Pixels whose ray misses the ground do not move.
+    """
+    R = _camera_rotation(camera_angle_deg, camera_yaw_deg, camera_roll_deg)
+    u = np.linspace(0.0, float(camera.image_size_x_px), samples_per_axis)
+    v = np.linspace(0.0, float(camera.image_size_y_px), samples_per_axis)
+    uu, vv = np.meshgrid(u, v)
+    uv = np.stack([uu.ravel(), vv.ravel()], axis=1)
+    ideal = uv
+    if has_distortion(camera):
+        ideal = undistort_image_points(camera, uv, undistortion_map=cached_undistortion_map(camera))
+
+    # Normalized rays; the ground point is t * (x, y, 1) in the camera frame, so Z = t.
+    x = (ideal[:, 0] - camera.cx) / camera.fx
+    y = (ideal[:, 1] - camera.cy) / camera.fy
+    d_world_z = R[2, 0] * x + R[2, 1] * y + R[2, 2]
+    d_world_z = np.where(np.abs(d_world_z) < 1e-8, 1e-8, d_world_z)
+    t = -1.0 / d_world_z
+    # Same test as the GSD map: the ground point must lie in front of the camera.
+    in_front = t < 0.0
+
+    projection = np.zeros((uv.shape[0], 2, 3))
+    projection[:, 0, 0] = camera.fx
+    projection[:, 0, 2] = -camera.fx * x
+    projection[:, 1, 1] = camera.fy
+    projection[:, 1, 2] = -camera.fy * y
+    projection *= np.where(in_front, 1.0 / t, 0.0)[:, None, None]
+    # d(X, Y, Z) = -R^T D
+    return uv, -projection @ R.T
+
+
+@dataclass
+class SpeedProfile:
+    """Result of `compute_speed_profile`."""
+    speed_m_s: np.ndarray     # (N,) highest speed keeping the blur of every pixel within the budget
+    binding_u_px: np.ndarray  # (N,) pixel whose blur sets the speed
+    binding_v_px: np.ndarray
+    blur_px: np.ndarray       # (N,) blur of the binding pixel at the speed of the plan
+
+
+def _travel_directions(plan: WaypointArray) -> T.Tuple[np.ndarray, np.ndarray]:
+    """
+    Unit direction of travel at every waypoint -- towards the next waypoint, from the previous one
+    for the last -- and whether it is defined (False for hovers and single-waypoint plans).
+    """
+    n = len(plan)
+    if n < 2:
+        return np.zeros((n, 3)), np.zeros(n, dtype=bool)
+    segments = np.diff(np.stack([plan.x_m, plan.y_m, plan.z_m], axis=1), axis=0)
+    segments = np.concatenate([segments, segments[-1:]])
+    lengths = np.linalg.norm(segments, axis=1)
+    defined = lengths > 0.0
+    directions = np.zeros_like(segments)
+    directions[defined] = segments[defined] / lengths[defined, None]
+    return directions, defined
+
+
+def _direction_keys(directions: np.ndarray) -> np.ndarray:
+    """One int64 per direction identifying its heading and climb angles rounded to `_ANGLE_QUANTUM_RAD`."""
+    heading = np.round(np.arctan2(directions[:, 1], directions[:, 0]) / _ANGLE_QUANTUM_RAD).astype(np.int64)
+    climb = np.round(np.arcsin(np.clip(directions[:, 2], -1.0, 1.0)) / _ANGLE_QUANTUM_RAD).astype(np.int64)
+    return (heading << 32) + (climb & 0xFFFFFFFF)
+
+
+def _max_motion_along(jacobians: np.ndarray, directions: np.ndarray) -> T.Tuple[np.ndarray, np.ndarray]:
+    """Largest image motion over the lattice, and the pixel where it occurs, per unit direction."""
+    motion = np.empty(directions.shape[0])
+    binding = np.empty(directions.shape[0], dtype=np.int64)
+    for start in range(0, directions.shape[0], _CHUNK_SIZE):
+        chunk = directions[start:start + _CHUNK_SIZE]
+        norms = np.linalg.norm(np.einsum("kij,mj->mki", jacobians, chunk), axis=2)
+        binding[start:start + chunk.shape[0]] = norms.argmax(axis=1)
+        motion[start:start + chunk.shape[0]] = norms.max(axis=1)
+    return motion, binding
+
+
+def _horizontal_motion(jacobians: np.ndarray) -> np.ndarray:
+    """Largest image motion of every lattice pixel over all horizontal directions."""
+    a, b = jacobians[:, 0, 0], jacobians[:, 0, 1]
+    c, d = jacobians[:, 1, 0], jacobians[:, 1, 1]
+    # Largest singular value of the horizontal 2 x 2 block.
+    s = a * a + b * b + c * c + d * d
+    det = a * d - b * c
+    return np.sqrt(0.5 * (s + np.sqrt(np.maximum(s * s - 4.0 * det * det, 0.0))))
+
+
+def _max_motion_any_horizontal(jacobians: np.ndarray) -> T.Tuple[float, int]:
+    """Largest image motion over the lattice and all horizontal directions, and the pixel where it occurs."""
+    sigma = _horizontal_motion(jacobians)
+    k = int(sigma.argmax())
+    return float(sigma[k]), k
+
+
+def _max_motion_over_terrain(
+    jacobians: np.ndarray,
+    ground_offsets: np.ndarray,
+    positions: np.ndarray,
+    heights: np.ndarray,
+    directions: np.ndarray,
+    along_travel: np.ndarray,
+    dem: ElevationModel,
+    max_range: float,
+) -> T.Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest image motion over the lattice, and the pixel where it occurs, per waypoint of one pose,
+    with the depth of every pixel taken from its ray's first crossing with the terrain.
+
+    `ground_offsets` are the (K, 3) lattice rays from the camera to the ground at unit height. A ray
+    scaled by the height of its waypoint reaches the plane of the look-at point at t = 1 and the
+    terrain at t, so the depth and the image motion of that pixel scale by t and 1 / t. Rays that do
+    not reach the terrain within `max_range`, or that leave the DEM, see nothing and do not move.
+    """
+    num_pixels = ground_offsets.shape[0]
+    any_direction = _horizontal_motion(jacobians)
+    motion = np.empty(positions.shape[0])
+    binding = np.empty(positions.shape[0], dtype=np.int64)
+    chunk_size = max(1, _CHUNK_SIZE // num_pixels)
+    for start in range(0, positions.shape[0], chunk_size):
+        stop = min(start + chunk_size, positions.shape[0])
+        origin = np.repeat(positions[start:stop], num_pixels, axis=0)
+        direction = (heights[start:stop, None, None] * ground_offsets).reshape(-1, 3)
+        t, found = _terrain_crossings(dem, origin, direction, max_range, _TERRAIN_STEP, _TERRAIN_TOLERANCE_M)
+        # A camera on or under the terrain (t = 0) blurs without bound.
+        scale = np.where(found, 1.0 / np.maximum(t, 1e-12), 0.0).reshape(stop - start, num_pixels)
+
+        pixel_motion = np.broadcast_to(any_direction, scale.shape).copy()
+        travel = along_travel[start:stop]
+        if travel.any():
+            moved = np.einsum("kij,mj->mki", jacobians, directions[start:stop][travel])
+            pixel_motion[travel] = np.linalg.norm(moved, axis=2)
+        pixel_motion *= scale
+        binding[start:stop] = pixel_motion.argmax(axis=1)
+        motion[start:stop] = pixel_motion.max(axis=1)
+    return motion, binding
+
+
+@instrumentation.timed("motion_blur.compute_speed_profile")
+def compute_speed_profile(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    plan: WaypointArray,
+    allowed_movement_px: float = 1,
+    samples_per_axis: int = DEFAULT_SAMPLES_PER_AXIS,
+    direction: str = "travel",
+    dem: T.Optional[ElevationModel] = None,
+    max_range: float = 10.0,
+) -> SpeedProfile:
+    """
+    Motion-blur limited capture speed of every waypoint of `plan`.
+
+    Args:
+        camera: the camera model.
+        dataset_spec: the dataset specification; only the exposure time is used.
+        plan: the plan, e.g. from `generate_photo_plan_on_grid` or `apply_terrain_following`. The
+            camera pose of each waypoint is taken from its pose columns and its height from its look-at
+            point (ground level 0 when the look-at is unset), as for `plan_footprint_quads`.
+        allowed_movement_px: blur budget: the largest motion of any pixel during the exposure.
+        samples_per_axis: pixel lattice resolution.
+        direction: "travel" -- the drone moves towards the next waypoint (including climbs over
+            terrain); waypoints without a direction of travel use "any" -- or "any" -- the worst
+            horizontal direction, which does not depend on the order of the plan.
+        dem: terrain the lattice rays are intersected with. Without it the ground of each waypoint is
+            the horizontal plane through its look-at point.
+        max_range: with a DEM, rays not reaching the terrain within this many times their distance to
+            that plane see nothing.
+
+    Returns:
+        A `SpeedProfile`; the speed is infinite where no pixel sees the ground.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+    n = len(plan)
+    exposure_time_s = dataset_spec.exposure_time_ms / 1000.0
+    heights = plan.z_m - np.nan_to_num(plan.look_at_z_m, nan=0.0)
+
+    if direction == "travel":
+        directions, along_travel = _travel_directions(plan)
+    else:
+        directions, along_travel = np.zeros((n, 3)), np.zeros(n, dtype=bool)
+
+    pose = np.stack([plan.pitch_deg, plan.gimbal_yaw_deg, plan.roll_deg], axis=1)
+    if n == 0 or (pose == pose[0]).all():
+        # Grid plans: skip sorting the poses.
+        poses, pose_index = pose[:1], np.zeros(n, dtype=np.int64)
+    else:
+        poses, pose_index = np.unique(pose, axis=0, return_inverse=True)
+        pose_index = pose_index.reshape(-1)
+
+    unit_motion = np.empty(n)  # pixels of blur per meter of displacement at unit height
+    binding = np.empty(n, dtype=np.int64)
+    uv = np.zeros((0, 2))
+    for p, camera_pose in enumerate(poses):
+        uv, jacobians = _unit_blur_jacobians(camera, samples_per_axis, *map(float, camera_pose))
+        members = np.flatnonzero(pose_index == p) if len(poses) > 1 else np.arange(n)
+
+        if dem is not None:
+            lattice = _footprint_lattice(camera, 1.0, samples_per_axis, *map(float, camera_pose))
+            ground_offsets = lattice - (0.0, 0.0, 1.0)
+            positions = np.stack([plan.x_m[members], plan.y_m[members], plan.z_m[members]], axis=1)
+            unit_motion[members], binding[members] = _max_motion_over_terrain(
+                jacobians, ground_offsets, positions, heights[members], directions[members], along_travel[members],
+                dem, max_range,
+            )
+            continue
+
+        travel = members[along_travel[members]]
+        if travel.shape[0]:
+            _, first, inverse = np.unique(_direction_keys(directions[travel]), return_index=True, return_inverse=True)
+            motion, pixel = _max_motion_along(jacobians, directions[travel[first]])
+            unit_motion[travel] = motion[inverse.reshape(-1)]
+            binding[travel] = pixel[inverse.reshape(-1)]
+
+        other = members[~along_travel[members]]
+        if other.shape[0]:
+            motion, pixel = _max_motion_any_horizontal(jacobians)
+            unit_motion[other] = motion
+            binding[other] = pixel
+
+    # The image motion is inversely proportional to the height.
+    with np.errstate(divide="ignore"):
+        speed = allowed_movement_px * heights / (exposure_time_s * unit_motion)
+        blur = plan.speed_m_s * exposure_time_s * unit_motion / heights
+    return SpeedProfile(
+        speed_m_s=speed,
+        binding_u_px=uv[binding, 0] if n else np.zeros(0),
+        binding_v_px=uv[binding, 1] if n else np.zeros(0),
+        blur_px=blur,
+    )
+
+
+def apply_speed_profile(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    plan: WaypointArray,
+    allowed_movement_px: float = 1,
+    max_speed_m_s: T.Optional[float] = None,
+    samples_per_axis: int = DEFAULT_SAMPLES_PER_AXIS,
+    direction: str = "travel",
+    dem: T.Optional[ElevationModel] = None,
+) -> WaypointArray:
+    """
+    Copy of `plan` with the speed of every waypoint set from `compute_speed_profile`, capped at
+    `max_speed_m_s` if given.
+
+    Raises:
+        ValueError: if no pixel of a waypoint sees the ground (an infinite speed) and no
+            `max_speed_m_s` caps it.
+    """
+    speed = compute_speed_profile(
+        camera, dataset_spec, plan, allowed_movement_px, samples_per_axis, direction, dem=dem
+    ).speed_m_s
+    if max_speed_m_s is not None:
+        speed = np.minimum(speed, max_speed_m_s)
+    elif not np.isfinite(speed).all():
+        unbounded = np.flatnonzero(~np.isfinite(speed))
+        raise ValueError(
+            f"No pixel sees the ground at {unbounded.shape[0]} waypoints (first: {unbounded[0]}); "
+            "give max_speed_m_s to cap their speed"
+        )
+    result = plan[np.arange(len(plan))]
+    result.speed_m_s[:] = speed
+    return result
@@ -0,0 +1,202 @@
+"""Split a survey plan into sub-missions flown by several drones in parallel.
+
+The plan is cut between rows only, into K contiguous bands of rows. Every band keeps the positions of
+the original grid, so the sidelap between the last row of one band and the first row of the next is
+the planned one. Bands are balanced by estimated time rather than by waypoint count: the time of a
+band is its flight time under the `mission_time` kinematic model plus the transits from the launch
+point to its first waypoint and back from its last one.
+
+With prefix sums over the flight time of the whole plan, the time of a band of rows [a, b) is
+`entry[a] + exit[b]`. The smallest achievable longest band time is found by bisection; each test is a
+greedy pass that, for every band, looks up the furthest reachable row with `np.searchsorted`. After
+the single `estimate_mission` pass, the cost only depends on the number of rows.
+"""
+
+import typing as T
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.mission_time import KinematicModel, estimate_mission
+from src.plan_computation import _compute_grid_layout, generate_photo_plan_on_grid
+
+# Bisection stops when the bracket on the longest band time is this small relative to its upper end.
+_RELATIVE_TOLERANCE = 1e-9
+_MAX_BISECTIONS = 200
+
+
+@dataclass
+class SubMission:
+    """Rows of the plan flown by one drone."""
+    plan: WaypointArray     # waypoints in flight order
+    start: int              # waypoints [start, stop) of the partitioned plan
+    stop: int
+    reversed: bool          # flown from stop - 1 back to start, so that it begins nearer the launch point
+    flight_time_s: float    # `estimate_mission` flight time of the sub-mission
+    transit_time_s: float   # launch point -> first waypoint and last waypoint -> launch point
+
+    @property
+    def time_s(self) -> float:
+        return self.flight_time_s + self.transit_time_s
+
+
+@dataclass
+class MultiDronePlan:
+    """Result of `partition_plan`."""
+    missions: T.List[SubMission]
+
+    @property
+    def makespan_s(self) -> float:
+        """Time until the last drone is back."""
+        return max((mission.time_s for mission in self.missions), default=0.0)
+
+
+def _segment_headings(plan: WaypointArray) -> T.Tuple[np.ndarray, np.ndarray]:
+    dx, dy = np.diff(plan.x_m), np.diff(plan.y_m)
+    return np.arctan2(dy, dx), np.hypot(dx, dy)
+
+
+def row_axis(plan: WaypointArray) -> float:
+    """
+    Direction of the rows of a serpentine-like plan, in radians from the X axis: the length-weighted
+    axial mean of the segment directions (0 for plans with fewer than two waypoints).
+    """
+    if len(plan) < 2:
+        return 0.0
+    heading, length = _segment_headings(plan)
+    # Angles are doubled so that opposite directions (alternating rows) add up instead of cancelling.
+    return float(0.5 * np.arctan2((length * np.sin(2.0 * heading)).sum(), (length * np.cos(2.0 * heading)).sum()))
+
+
+def detect_row_starts(plan: WaypointArray, angle_tolerance_deg: float = 1.0) -> np.ndarray:
+    """
+    Indices of the first waypoint of every row of a serpentine-like plan.
+
+    A segment that is not parallel to the `row_axis` (within `angle_tolerance_deg`) connects two rows.
+    """
+    n = len(plan)
+    if n < 2:
+        return np.zeros(min(n, 1), dtype=np.int64)
+    heading, length = _segment_headings(plan)
+    axis = row_axis(plan)
+    along = np.abs(np.cos(heading - axis))
+    transition = (along < np.cos(np.radians(angle_tolerance_deg))) & (length > 0.0)
+    return np.concatenate([[0], np.flatnonzero(transition) + 1]).astype(np.int64)
+
+
+def _band_ends(entry: np.ndarray, exit_: np.ndarray, through: np.ndarray, num_bands: int, limit: float) -> T.Optional[T.List[int]]:
+    """
+    Greedy split of the rows into exactly `num_bands` bands of time at most `limit`, each band taking as
+    many rows as possible. Returns the end row of every band, or None if it does not fit.
+
+    `entry[a] + exit_[b]` is the time of rows [a, b); `through[b] <= exit_[b]` is nondecreasing.
+    """
+    num_rows = entry.shape[0]
+    ends = []
+    a = 0
+    for band in range(num_bands):
+        remaining = num_bands - band - 1
+        budget = limit - entry[a]
+        # Bands ending after `hi` cannot fit; rows must be left for the remaining bands.
+        hi = min(int(np.searchsorted(through, budget, side="right")) - 1, num_rows - remaining)
+        if remaining == 0:
+            if hi < num_rows or exit_[num_rows] > budget:
+                return None
+            ends.append(num_rows)
+            break
+        candidates = np.flatnonzero(exit_[a + 1:hi + 1] <= budget)
+        if candidates.shape[0] == 0:
+            return None
+        a = a + 1 + int(candidates[-1])
+        ends.append(a)
+    return ends
+
+
+def partition_plan(
+    plan: WaypointArray,
+    num_drones: int,
+    launch_xy: T.Tuple[float, float] = (0.0, 0.0),
+    kinematics: T.Optional[KinematicModel] = None,
+    row_starts: T.Optional[np.ndarray] = None,
+) -> MultiDronePlan:
+    """
+    Split a plan into `num_drones` contiguous bands of rows with balanced flight plus transit time.
+
+    Args:
+        plan: the plan, e.g. from `generate_photo_plan_on_grid`.
+        num_drones: number of sub-missions.
+        launch_xy: launch/landing point shared by all drones.
+        kinematics: speed, acceleration and turn limits. Defaults to `KinematicModel()`; transits are
+            flown in a straight line at its maximum speed.
+        row_starts: index of the first waypoint of every row. Defaults to `detect_row_starts(plan)`.
+
+    Returns:
+        A `MultiDronePlan` with one sub-mission per drone, in row order.
+    """
+    if num_drones < 1:
+        raise ValueError(f"num_drones must be positive, got {num_drones}")
+    kinematics = kinematics or KinematicModel()
+    n = len(plan)
+    row_starts = detect_row_starts(plan) if row_starts is None else np.asarray(row_starts, dtype=np.int64)
+    num_rows = row_starts.shape[0]
+    if num_rows < num_drones:
+        raise ValueError(f"The plan has {num_rows} rows, cannot split it between {num_drones} drones")
+
+    estimate = estimate_mission(plan, kinematics)
+    dwell_prefix = np.concatenate([[0.0], np.cumsum(estimate.dwell_time_s)])
+    segment_prefix = np.concatenate([[0.0], np.cumsum(estimate.segment_time_s)])
+    transit_s = np.hypot(plan.x_m - launch_xy[0], plan.y_m - launch_xy[1]) / kinematics.max_speed_m_s
+
+    # Flight time of waypoints [s, e] is dwell_prefix[e + 1] - dwell_prefix[s] + segment_prefix[e] -
+    # segment_prefix[s], so a band of rows [a, b) costs entry[a] + exit_[b].
+    first = row_starts
+    last = np.concatenate([row_starts[1:], [n]]) - 1
+    entry = transit_s[first] - dwell_prefix[first] - segment_prefix[first]
+    through = np.concatenate([[-np.inf], dwell_prefix[last + 1] + segment_prefix[last]])
+    exit_ = np.concatenate([[np.inf], through[1:] + transit_s[last]])
+
+    # Any band fits in `hi`: entry[a] is at most one transit.
+    lo, hi = 0.0, float(through[-1] + 2.0 * transit_s.max())
+    ends = _band_ends(entry, exit_, through, num_drones, hi)
+    for _ in range(_MAX_BISECTIONS):
+        if hi - lo <= _RELATIVE_TOLERANCE * hi:
+            break
+        mid = 0.5 * (lo + hi)
+        candidate = _band_ends(entry, exit_, through, num_drones, mid)
+        if candidate is None:
+            lo = mid
+        else:
+            hi, ends = mid, candidate
+    assert ends is not None
+
+    missions = []
+    for a, b in zip([0, *ends[:-1]], ends):
+        start, stop = int(first[a]), int(last[b - 1]) + 1
+        reverse = bool(transit_s[stop - 1] < transit_s[start])
+        band = plan[start:stop]
+        if reverse:
+            band = band[::-1]
+        missions.append(SubMission(
+            plan=band,
+            start=start,
+            stop=stop,
+            reversed=reverse,
+            flight_time_s=estimate_mission(band, kinematics).flight_time_s,
+            transit_time_s=float(transit_s[start] + transit_s[stop - 1]),
+        ))
+    return MultiDronePlan(missions)
+
+
+def generate_multi_drone_plan(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    num_drones: int,
+    launch_xy: T.Tuple[float, float] = (0.0, 0.0),
+    kinematics: T.Optional[KinematicModel] = None,
+) -> MultiDronePlan:
+    """Grid plan of `dataset_spec` split between `num_drones` drones along the grid rows."""
+    layout = _compute_grid_layout(camera, dataset_spec)
+    plan = generate_photo_plan_on_grid(camera, dataset_spec)
+    row_starts = np.arange(layout.n_y, dtype=np.int64) * layout.n_x
+    return partition_plan(plan, num_drones, launch_xy, kinematics, row_starts)
@@ -0,0 +1,260 @@
+"""Multi-pass oblique capture plans, e.g. the 5-direction "Maltese cross" used for 3D reconstruction.
+
+Every pass is a grid plan flown with the camera pose of that pass. Oblique grids are shifted against
+their viewing direction so that their look-at points, rather than the drone positions, cover the scan
+area. Passes with the same pitch share the cached footprint reprojection (`_tilted_footprint_corners`
+and `_footprint_lattice` rotate the unyawed footprint), since the yaw only rotates the footprint; the
+grid layout is computed per pass. Oblique captures whose footprint mostly falls outside the scan
+area are dropped, and the passes are ordered and oriented to minimize the transit between them.
+
+Optionally, oblique captures that add little are deduplicated across passes using footprint
+coverage: the footprints kept from earlier passes viewing from a similar direction are rasterized
+over the scan area (`coverage.rasterize_footprints`), and a capture is dropped when they already
+cover most of its on-site footprint (`coverage.footprint_cells`). Captures are never compared with
+their own pass, whose overlap is the requested one, nor with passes viewing from other directions,
+which image other faces of the site.
+"""
+
+import itertools
+import typing as T
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from src.coverage import RasterGrid, footprint_cells, plan_footprint_quads, rasterize_footprints
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.plan_computation import (
+    _camera_rotation,
+    _compute_grid_layout,
+    _footprint_lattice,
+    generate_photo_plan_on_grid,
+)
+
+DEFAULT_OBLIQUE_YAWS_DEG = (0.0, 90.0, 180.0, 270.0)
+
+# Up to this many passes every order and direction is tried; beyond it passes are chained greedily.
+_MAX_EXHAUSTIVE_PASSES = 6
+# Resolution of the deduplication raster, in cells per grid spacing of the nadir plan.
+_CELLS_PER_SPACING = 8
+
+
+@dataclass
+class CapturePass:
+    camera_angle: float       # Pitch of the camera from nadir (degrees)
+    camera_yaw: float = 0.0   # Yaw of the camera (degrees, counter-clockwise)
+
+
+@dataclass
+class MultiPassPlan:
+    """Result of `generate_multi_pass_plan`."""
+    plan: WaypointArray        # all passes, concatenated in flight order
+    pass_index: np.ndarray     # (N,) index into `passes` of the pass each waypoint belongs to
+    passes: T.List[CapturePass]
+    pass_order: T.List[int]    # indices into `passes` in the order they are flown
+    reversed: T.List[bool]     # per flown pass, whether its serpentine is traversed backwards
+    transit_m: float           # horizontal distance flown between passes (and from the launch point)
+
+
+def maltese_cross_passes(
+    oblique_angle_deg: float = 45.0,
+    yaws_deg: T.Sequence[float] = DEFAULT_OBLIQUE_YAWS_DEG,
+    include_nadir: bool = True,
+) -> T.List[CapturePass]:
+    """A nadir pass followed by one oblique pass per viewing direction."""
+    passes = [CapturePass(0.0)] if include_nadir else []
+    passes.extend(CapturePass(oblique_angle_deg, yaw) for yaw in yaws_deg)
+    return passes
+
+
+def generate_pass_plan(camera: Camera, dataset_spec: DatasetSpec, capture_pass: CapturePass) -> WaypointArray:
+    """
+    Grid plan of one pass, translated so that the look-at points of the grid cover the scan area of
+    `dataset_spec`.
+    """
+    pass_spec = replace(dataset_spec, camera_angle=capture_pass.camera_angle, camera_yaw=capture_pass.camera_yaw)
+    plan = generate_photo_plan_on_grid(camera, pass_spec)
+    offset = _compute_grid_layout(camera, pass_spec).look_at_offset
+    plan.x_m -= offset[0]
+    plan.y_m -= offset[1]
+    plan.look_at_x_m -= offset[0]
+    plan.look_at_y_m -= offset[1]
+    return plan
+
+
+def site_fraction(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    plan: WaypointArray,
+    samples_per_axis: int = 8,
+    chunk_size: int = 16384,
+) -> np.ndarray:
+    """
+    Fraction of each waypoint's footprint that lies on the scan area of `dataset_spec`.
+
+    The footprint is sampled with a lattice of pixels whose unit-height ground points are computed
+    once per distinct camera pose, then scaled by the height above the look-at point and translated.
+    """
+    half_x = dataset_spec.scan_dimension_x / 2.0
+    half_y = dataset_spec.scan_dimension_y / 2.0
+    poses, pose_index = np.unique(
+        np.stack([plan.pitch_deg, plan.gimbal_yaw_deg, plan.roll_deg], axis=1), axis=0, return_inverse=True
+    )
+    pose_index = pose_index.reshape(-1)
+    lattices = np.stack(
+        [_footprint_lattice(camera, 1.0, samples_per_axis, *map(float, pose))[:, :2] for pose in poses]
+    ).reshape(len(poses), -1, 2)
+    heights = plan.z_m - np.nan_to_num(plan.look_at_z_m, nan=0.0)
+
+    fraction = np.empty(len(plan))
+    for start in range(0, len(plan), chunk_size):
+        stop = min(start + chunk_size, len(plan))
+        points = lattices[pose_index[start:stop]] * heights[start:stop, None, None]
+        x = points[:, :, 0] + plan.x_m[start:stop, None]
+        y = points[:, :, 1] + plan.y_m[start:stop, None]
+        inside = (np.abs(x) <= half_x) & (np.abs(y) <= half_y)
+        fraction[start:stop] = inside.mean(axis=1)
+    return fraction
+
+
+def _view_direction(capture_pass: CapturePass) -> np.ndarray:
+    """Unit vector of the optical axis of a pass in the world frame."""
+    return _camera_rotation(capture_pass.camera_angle, capture_pass.camera_yaw)[:, 2]
+
+
+def covered_fraction(quads: np.ndarray, grid: RasterGrid, covered: np.ndarray) -> np.ndarray:
+    """
+    Fraction of the cells of each footprint (see `footprint_cells`) that are marked in `covered`, a
+    (num_rows, num_cols) mask over `grid`. Footprints containing no cell of the grid give 0.
+    """
+    quad_index, cells = footprint_cells(quads, grid)
+    total = np.bincount(quad_index, minlength=quads.shape[0])
+    hits = np.bincount(quad_index[covered.ravel()[cells]], minlength=quads.shape[0])
+    return hits / np.maximum(total, 1)
+
+
+def _order_passes(
+    starts: np.ndarray, ends: np.ndarray, launch_xy: T.Tuple[float, float]
+) -> T.Tuple[T.List[int], T.List[bool], float]:
+    """
+    Order and direction of the passes minimizing the transit from the launch point through all passes.
+
+    `starts` and `ends` are (P, 2) first and last waypoint positions of the passes flown forwards.
+    """
+    num_passes = starts.shape[0]
+    # entry[p, r] / exit[p, r]: where pass p begins and ends when flown forwards (r=0) or reversed (r=1)
+    entry = np.stack([starts, ends], axis=1)
+    exit_ = np.stack([ends, starts], axis=1)
+    launch = np.asarray(launch_xy, dtype=np.float64)
+
+    def transit(order: T.Sequence[int], directions: T.Sequence[int]) -> float:
+        position, total = launch, 0.0
+        for p, r in zip(order, directions):
+            total += float(np.hypot(*(entry[p, r] - position)))
+            position = exit_[p, r]
+        return total
+
+    if num_passes <= _MAX_EXHAUSTIVE_PASSES:
+        best = min(
+            (
+                (transit(order, directions), order, directions)
+                for order in itertools.permutations(range(num_passes))
+                for directions in itertools.product((0, 1), repeat=num_passes)
+            ),
+            key=lambda candidate: candidate[0],
+        )
+        return list(best[1]), [bool(r) for r in best[2]], best[0]
+
+    # Greedy: always fly to the nearest unvisited pass entry.
+    remaining = set(range(num_passes))
+    order, directions, position = [], [], launch
+    while remaining:
+        candidates = [(float(np.hypot(*(entry[p, r] - position))), p, r) for p in sorted(remaining) for r in (0, 1)]
+        _, p, r = min(candidates)
+        order.append(p)
+        directions.append(r)
+        position = exit_[p, r]
+        remaining.remove(p)
+    return order, [bool(r) for r in directions], transit(order, directions)
+
+
+def generate_multi_pass_plan(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    passes: T.Optional[T.Sequence[CapturePass]] = None,
+    min_on_site_fraction: float = 0.1,
+    samples_per_axis: int = 8,
+    launch_xy: T.Optional[T.Tuple[float, float]] = None,
+    max_covered_fraction: T.Optional[float] = None,
+    similar_view_deg: float = 20.0,
+) -> MultiPassPlan:
+    """
+    Plan several capture passes over the scan area of `dataset_spec` and merge them into one flight.
+
+    Args:
+        camera: the camera model.
+        dataset_spec: the dataset specification; overlap, sidelap and height apply to every pass, and
+            its camera_angle/camera_yaw are replaced by those of each pass.
+        passes: camera poses of the passes. Defaults to `maltese_cross_passes()`.
+        min_on_site_fraction: oblique captures whose footprint has less than this fraction on the
+            scan area (see `site_fraction`), i.e. that mostly image the surroundings, are dropped.
+        samples_per_axis: pixel lattice resolution used to measure the footprint fraction.
+        launch_xy: take-off point; the transit from it to the first pass is minimized too. Defaults to
+            the origin.
+        max_covered_fraction: if given, an oblique capture is dropped when at least this fraction of
+            its footprint on the scan area is already covered by the captures kept from earlier
+            passes (in the order of `passes`) whose optical axes are within `similar_view_deg`
+            degrees of its own. None keeps every capture.
+        similar_view_deg: largest angle between the viewing directions of passes that are
+            deduplicated against each other.
+
+    Returns:
+        A `MultiPassPlan` with the merged plan and, per waypoint, the pass it belongs to.
+    """
+    passes = maltese_cross_passes() if passes is None else list(passes)
+    if not passes:
+        raise ValueError("At least one capture pass is required")
+
+    if max_covered_fraction is not None:
+        layout = _compute_grid_layout(camera, replace(dataset_spec, camera_angle=0.0, camera_yaw=0.0))
+        half_x, half_y = dataset_spec.scan_dimension_x / 2.0, dataset_spec.scan_dimension_y / 2.0
+        cell_size_m = min(layout.spacing_x, layout.spacing_y) / _CELLS_PER_SPACING
+        grid = RasterGrid.covering(-half_x, -half_y, half_x, half_y, cell_size_m)
+        min_cos = np.cos(np.radians(similar_view_deg))
+
+    pass_plans = []
+    pass_quads = []
+    for p, capture_pass in enumerate(passes):
+        plan = generate_pass_plan(camera, dataset_spec, capture_pass)
+        if capture_pass.camera_angle != 0.0 and len(plan):
+            plan = plan[site_fraction(camera, dataset_spec, plan, samples_per_axis) >= min_on_site_fraction]
+        if max_covered_fraction is not None:
+            quads = plan_footprint_quads(camera, plan)
+            view = _view_direction(capture_pass)
+            similar = [
+                q for q, earlier in zip(pass_quads, passes[:p]) if np.dot(view, _view_direction(earlier)) >= min_cos
+            ]
+            if capture_pass.camera_angle != 0.0 and len(plan) and similar:
+                covered = rasterize_footprints(np.concatenate(similar), grid) > 0
+                keep = covered_fraction(quads, grid, covered) < max_covered_fraction
+                plan, quads = plan[keep], quads[keep]
+            pass_quads.append(quads)
+        pass_plans.append(plan)
+
+    flown = [i for i, plan in enumerate(pass_plans) if len(plan)]
+    starts = np.array([[pass_plans[i].x_m[0], pass_plans[i].y_m[0]] for i in flown]).reshape(-1, 2)
+    ends = np.array([[pass_plans[i].x_m[-1], pass_plans[i].y_m[-1]] for i in flown]).reshape(-1, 2)
+    order, reversed_, transit_m = _order_passes(starts, ends, launch_xy or (0.0, 0.0))
+    pass_order = [flown[k] for k in order]
+
+    ordered = [pass_plans[p][::-1] if r else pass_plans[p] for p, r in zip(pass_order, reversed_)]
+    pass_index = np.concatenate(
+        [np.full(len(pass_plans[p]), p, dtype=np.int64) for p in pass_order] or [np.empty(0, dtype=np.int64)]
+    )
+    return MultiPassPlan(
+        plan=WaypointArray.concatenate(ordered),
+        pass_index=pass_index,
+        passes=passes,
+        pass_order=pass_order,
+        reversed=reversed_,
+        transit_m=transit_m,
+    )
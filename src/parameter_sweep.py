@@ -0,0 +1,84 @@
+"""Evaluate grid plans over a sweep of dataset spec variations on a process pool.
+
+Example:
+    table = sweep_dataset_specs(
+        camera_x10,
+        dataset_spec,
+        {"height": [50, 100, 150], "overlap": [0.6, 0.7, 0.8], "camera_angle": [0.0, 30.0]},
+    )
+    best = np.argmin(table["duration_s"])
+"""
+
+import itertools
+import typing as T
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+
+import numpy as np
+
+from src.data_model import Camera, DatasetSpec, FrozenCamera, FrozenDatasetSpec, WaypointArray
+from src.mission_time import estimate_mission
+from src.plan_computation import generate_photo_plan_on_grid
+
+METRIC_COLUMNS = ("image_count", "speed_m_s", "flight_length_m", "duration_s")
+
+
+def plan_flight_length(plan: WaypointArray) -> float:
+    """Length of the polyline through the plan's waypoints, in meters."""
+    if len(plan) < 2:
+        return 0.0
+    return float(np.linalg.norm(np.diff(plan.positions(), axis=0), axis=1).sum())
+
+
+def _evaluate_spec(camera: FrozenCamera, dataset_spec: FrozenDatasetSpec) -> T.Tuple[float, ...]:
+    """Generate the plan for one spec and compute the values of `METRIC_COLUMNS`."""
+    plan = generate_photo_plan_on_grid(camera.thaw(), dataset_spec.thaw())
+    speed = float(plan.speed_m_s.min())
+    flight_length = plan_flight_length(plan)
+    duration = estimate_mission(plan).flight_time_s
+    return float(len(plan)), speed, flight_length, duration
+
+
+def sweep_dataset_specs(
+    camera: Camera,
+    base_spec: DatasetSpec,
+    variations: T.Mapping[str, T.Sequence[float]],
+    max_workers: T.Optional[int] = None,
+    chunksize: int = 1,
+) -> T.Dict[str, np.ndarray]:
+    """Evaluate `generate_photo_plan_on_grid` for every combination of the given spec variations.
+
+    Args:
+        camera: the camera model.
+        base_spec: spec providing the values of the fields that are not varied.
+        variations: DatasetSpec field name -> values to try. The sweep covers the cartesian product.
+        max_workers: number of worker processes. None uses all cores; 1 evaluates in this process.
+        chunksize: number of specs sent to a worker at a time.
+
+    Returns:
+        Columnar table (column name -> array with one entry per combination) holding the varied
+        fields followed by image_count, speed_m_s, flight_length_m and duration_s (flight time
+        from `estimate_mission` with the default kinematic model).
+    """
+    spec_fields = {f.name for f in fields(DatasetSpec)}
+    unknown = set(variations) - spec_fields
+    if unknown:
+        raise ValueError(f"Unknown DatasetSpec fields: {sorted(unknown)}")
+
+    names = list(variations)
+    combinations = list(itertools.product(*(variations[name] for name in names)))
+    specs = [replace(base_spec, **dict(zip(names, values))).frozen() for values in combinations]
+    cameras = itertools.repeat(camera.frozen(), len(specs))
+
+    if max_workers == 1:
+        rows = list(map(_evaluate_spec, cameras, specs))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            rows = list(executor.map(_evaluate_spec, cameras, specs, chunksize=chunksize))
+
+    table = {name: np.array([values[i] for values in combinations], dtype=np.float64) for i, name in enumerate(names)}
+    metrics = np.array(rows, dtype=np.float64).reshape(len(rows), len(METRIC_COLUMNS))
+    for i, name in enumerate(METRIC_COLUMNS):
+        table[name] = metrics[:, i]
+    table["image_count"] = table["image_count"].astype(np.int64)
+    return table
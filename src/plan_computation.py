@@ -1,12 +1,18 @@
 
 import math
-import copy
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
 import numpy as np
-from typing import List
-from src.data_model import Camera, DatasetSpec, Waypoint
-from src.camera_utils import (
-    compute_image_footprint_on_surface,
-    compute_ground_sampling_distance,
+from src import instrumentation
+from src.camera_utils import has_distortion, undistort_image_points
+from src.data_model import Camera, DatasetSpec, Waypoint, WaypointArray
+from src.geometry_cache import (
+    cached_ground_sampling_distance,
+    cached_image_footprint_on_surface,
+    cache_stats,
+    cached_undistortion_map,
+    geometry_cache,
 )
 
 def compute_distance_between_images(
@@ -14,7 +20,7 @@ def compute_distance_between_images(
 ) -> np.ndarray:
     angle_rad = math.radians(getattr(dataset_spec, "camera_angle", 0.0))
     effective_height = dataset_spec.height / math.cos(angle_rad)
-    footprint = compute_image_footprint_on_surface(camera, effective_height)
+    footprint = cached_image_footprint_on_surface(camera, effective_height)
     distance_x = footprint[0] * (1.0 - dataset_spec.overlap)
     distance_y = footprint[1] * (1.0 - dataset_spec.sidelap)
     return np.array([distance_x, distance_y], dtype=np.float32)
@@ -23,71 +29,361 @@ def compute_distance_between_images(
 def compute_speed_during_photo_capture(
     camera: Camera, dataset_spec: DatasetSpec, allowed_movement_px: float = 1
 ) -> float:
-    gsd = compute_ground_sampling_distance(camera, dataset_spec.height)
+    gsd = cached_ground_sampling_distance(camera, dataset_spec.height)
     max_movement_m = gsd * allowed_movement_px
     exposure_time_s = dataset_spec.exposure_time_ms / 1000.0
     speed = max_movement_m / exposure_time_s
     return float(speed)
 
 
-def _tilted_image_footprint(camera: Camera, height_m: float, camera_angle_deg: float = 0.0):
+def _pose_rotation_entries(cos_yaw, sin_yaw, cos_pitch, sin_pitch, cos_roll, sin_roll) -> list:
+    """Row-major entries of Rz(yaw) . Rx(pitch) . Rz(roll), for scalars or arrays alike."""
+    return [
+        cos_yaw * cos_roll - sin_yaw * cos_pitch * sin_roll,
+        -cos_yaw * sin_roll - sin_yaw * cos_pitch * cos_roll,
+        sin_yaw * sin_pitch,
+        sin_yaw * cos_roll + cos_yaw * cos_pitch * sin_roll,
+        -sin_yaw * sin_roll + cos_yaw * cos_pitch * cos_roll,
+        -cos_yaw * sin_pitch,
+        sin_pitch * sin_roll,
+        sin_pitch * cos_roll,
+        cos_pitch,
+    ]
+
+
+@geometry_cache("camera_rotation")
+def _camera_rotation(camera_angle_deg: float, camera_yaw_deg: float = 0.0, camera_roll_deg: float = 0.0) -> np.ndarray:
     """
-    Reproject the four image corners to the ground plane (z=0) taking into account a single-axis
-    camera tilt about the local X axis (pitch = camera_angle_deg). Returns footprint_x, footprint_y
-    (width, height) in meters and the reprojection center (ground point under image center).
+    Camera-to-world rotation of a gimbal pose: Rz(yaw) . Rx(pitch) . Rz(roll), i.e. roll about the
+    optical axis, then pitch away from nadir, then yaw about the vertical axis. With zero yaw and roll
+    this is the single-axis tilt Rx(pitch).
     """
-    angle_rad = math.radians(camera_angle_deg)
-    # rotation about camera X axis (pitch)
-    Rx = np.array(
-        [
-            [1.0, 0.0, 0.0],
-            [0.0, math.cos(angle_rad), -math.sin(angle_rad)],
-            [0.0, math.sin(angle_rad), math.cos(angle_rad)],
-        ],
-        dtype=np.float64,
+    yaw, pitch, roll = (math.radians(a) for a in (camera_yaw_deg, camera_angle_deg, camera_roll_deg))
+    entries = _pose_rotation_entries(
+        math.cos(yaw), math.sin(yaw), math.cos(pitch), math.sin(pitch), math.cos(roll), math.sin(roll)
     )
+    return np.array(entries, dtype=np.float64).reshape(3, 3)
 
-    corners_uv = [
-        (0.0, 0.0),
-        (float(camera.image_size_x_px), 0.0),
-        (float(camera.image_size_x_px), float(camera.image_size_y_px)),
-        (0.0, float(camera.image_size_y_px)),
-    ]
+
+def camera_rotation(yaw_deg: np.ndarray, pitch_deg: np.ndarray, roll_deg: np.ndarray) -> np.ndarray:
+    """
+    Batched camera-to-world rotations of the poses (yaw_deg, pitch_deg, roll_deg), e.g. the pose
+    columns of a `WaypointArray`. Returns an (..., 3, 3) array; see `_camera_rotation`.
+    """
+    yaw, pitch, roll = (np.radians(np.asarray(a, dtype=np.float64)) for a in (yaw_deg, pitch_deg, roll_deg))
+    entries = _pose_rotation_entries(np.cos(yaw), np.sin(yaw), np.cos(pitch), np.sin(pitch), np.cos(roll), np.sin(roll))
+    entries = np.broadcast_arrays(*entries)
+    return np.stack(entries, axis=-1).reshape(entries[0].shape + (3, 3))
+
+
+def _reproject_pixels_to_ground(camera: Camera, uv: np.ndarray, height_m: float, R: np.ndarray) -> np.ndarray:
+    """
+    Intersect the rays of the pixels `uv` (shape (K, 2)) with the ground plane (z=0) for a camera at
+    (0, 0, height_m) with camera-to-world rotation R. Returns the (K, 3) ground points.
+    """
+    if has_distortion(camera):
+        uv = undistort_image_points(camera, uv, undistortion_map=cached_undistortion_map(camera))
+
+    # Rays of all pixels in the camera frame, rotated to the world frame in one product.
+    d_cam = np.ones((uv.shape[0], 3), dtype=np.float64)
+    d_cam[:, 0] = (uv[:, 0] - camera.cx) / camera.fx
+    d_cam[:, 1] = (uv[:, 1] - camera.cy) / camera.fy
+    d_world = d_cam @ R.T
+    # avoid rays parallel to ground (fallback to a nearly horizontal ray)
+    d_world[np.abs(d_world[:, 2]) < 1e-8, 2] = 1e-8
 
     cam_pos = np.array([0.0, 0.0, float(height_m)], dtype=np.float64)  # local frame origin at scan center
-    ground_points = []
-    cx, cy, fx, fy = camera.cx, camera.cy, camera.fx, camera.fy
-
-    for (u, v) in corners_uv:
-        d_cam = np.array([(u - cx) / fx, (v - cy) / fy, 1.0], dtype=np.float64)
-        d_world = Rx.dot(d_cam)  # direction in world frame (assuming camera frame aligned with world axes except pitch)
-        # avoid rays parallel to ground
-        if abs(d_world[2]) < 1e-8:
-            # fallback to nadir direction
-            d_world[2] = 1e-8
-        t = -cam_pos[2] / d_world[2]
-        p = cam_pos + t * d_world
-        ground_points.append(p)
-
-    pts = np.array(ground_points)  # shape (4,3)
+    t = -cam_pos[2] / d_world[:, 2]
+    return cam_pos + t[:, None] * d_world
+
+
+def _yaw_rotated(points: np.ndarray, yaw_deg: float) -> np.ndarray:
+    """(K, 3) points rotated about the vertical axis by yaw_deg: Rz(yaw) . p."""
+    return points @ _camera_rotation(0.0, yaw_deg).T
+
+
+@geometry_cache("footprint_corners")
+def _tilted_footprint_corners(
+    camera: Camera,
+    height_m: float,
+    camera_angle_deg: float = 0.0,
+    camera_yaw_deg: float = 0.0,
+    camera_roll_deg: float = 0.0,
+) -> np.ndarray:
+    """
+    Reproject the four image corners to the ground plane (z=0) for a camera at (0, 0, height_m)
+    with gimbal pose (pitch = camera_angle_deg, yaw, roll). Returns the (4, 3) ground points in
+    image corner order (0,0), (W,0), (W,H), (0,H), i.e. the footprint quadrilateral.
+
+    The yaw only rotates the footprint about the vertical axis, so poses differing in yaw share the
+    cached reprojection of the unyawed pose.
+    """
+    if camera_yaw_deg != 0.0:
+        corners = _tilted_footprint_corners(camera, height_m, camera_angle_deg, 0.0, camera_roll_deg)
+        return _yaw_rotated(corners, camera_yaw_deg)
+    R = _camera_rotation(camera_angle_deg, camera_yaw_deg, camera_roll_deg)
+    w, h = float(camera.image_size_x_px), float(camera.image_size_y_px)
+    corners_uv = np.array([[0.0, 0.0], [w, 0.0], [w, h], [0.0, h]], dtype=np.float64)
+    return _reproject_pixels_to_ground(camera, corners_uv, height_m, R)  # shape (4,3)
+
+
+@geometry_cache("footprint_lattice")
+def _footprint_lattice(
+    camera: Camera,
+    height_m: float,
+    samples_per_axis: int,
+    camera_angle_deg: float = 0.0,
+    camera_yaw_deg: float = 0.0,
+    camera_roll_deg: float = 0.0,
+) -> np.ndarray:
+    """
+    Ground points of a `samples_per_axis` x `samples_per_axis` lattice of pixels spanning the image
+    (corners included), for the same camera and pose as `_tilted_footprint_corners`. Returns a
+    (samples_per_axis ** 2, 3) array in row-major pixel order. Shares the unyawed reprojection like
+    `_tilted_footprint_corners`.
+    """
+    if camera_yaw_deg != 0.0:
+        lattice = _footprint_lattice(camera, height_m, samples_per_axis, camera_angle_deg, 0.0, camera_roll_deg)
+        return _yaw_rotated(lattice, camera_yaw_deg)
+    R = _camera_rotation(camera_angle_deg, camera_yaw_deg, camera_roll_deg)
+    u = np.linspace(0.0, float(camera.image_size_x_px), samples_per_axis)
+    v = np.linspace(0.0, float(camera.image_size_y_px), samples_per_axis)
+    uu, vv = np.meshgrid(u, v)
+    return _reproject_pixels_to_ground(camera, np.stack([uu.ravel(), vv.ravel()], axis=1), height_m, R)
+
+
+@geometry_cache("tilted_footprint")
+def _tilted_image_footprint(
+    camera: Camera,
+    height_m: float,
+    camera_angle_deg: float = 0.0,
+    camera_yaw_deg: float = 0.0,
+    camera_roll_deg: float = 0.0,
+):
+    """
+    Reproject the four image corners to the ground plane (z=0) for the gimbal pose (pitch =
+    camera_angle_deg, yaw, roll). Returns footprint_x, footprint_y (width and height of the
+    footprint's bounding box) in meters and the reprojection center (ground point under image
+    center). The footprint itself is `_tilted_footprint_corners`.
+    """
+    pts = _tilted_footprint_corners(camera, height_m, camera_angle_deg, camera_yaw_deg, camera_roll_deg)
     min_x, max_x = pts[:, 0].min(), pts[:, 0].max()
     min_y, max_y = pts[:, 1].min(), pts[:, 1].max()
     footprint_x = float(max_x - min_x)
     footprint_y = float(max_y - min_y)
 
     # compute ground point under image center (u=cx,v=cy)
-    d_cam_center = np.array([0.0, 0.0, 1.0], dtype=np.float64)
-    d_world_center = Rx.dot(d_cam_center)
+    cam_pos = np.array([0.0, 0.0, float(height_m)], dtype=np.float64)
+    d_world_center = _camera_rotation(camera_angle_deg, camera_yaw_deg, camera_roll_deg)[:, 2]
     t_center = -cam_pos[2] / d_world_center[2]
     center_ground = cam_pos + t_center * d_world_center
 
     return footprint_x, footprint_y, center_ground
 
 
+def _camera_pose(dataset_spec: DatasetSpec) -> tuple:
+    """(pitch, yaw, roll) of the camera in degrees, in the argument order of `_camera_rotation`."""
+    return (
+        getattr(dataset_spec, "camera_angle", 0.0),
+        getattr(dataset_spec, "camera_yaw", 0.0),
+        getattr(dataset_spec, "camera_roll", 0.0),
+    )
+
+
+@dataclass(frozen=True)
+class _GridLayout:
+    """Geometry shared by every waypoint of a grid plan."""
+    n_x: int
+    n_y: int
+    spacing_x: float
+    spacing_y: float
+    x0: float
+    y0: float
+    height: float
+    capture_speed: float
+    yaw_deg: float  # direction of the look-at point, see `Waypoint.yaw_deg`
+    pitch_deg: float
+    roll_deg: float
+    gimbal_yaw_deg: float
+    look_at_offset: np.ndarray  # ground look-at point relative to the camera position, shape (3,)
+
+    @property
+    def num_waypoints(self) -> int:
+        return self.n_x * self.n_y
+
+
+@geometry_cache("grid_layout")
+def _compute_grid_layout(camera: Camera, dataset_spec: DatasetSpec) -> _GridLayout:
+    """
+    Compute the grid size, spacing and per-plan constants of `generate_photo_plan_on_grid`.
+    """
+    # 1) compute tilted footprint at origin to get nominal spacing (bounding box of the footprint)
+    cam_angle, cam_yaw, cam_roll = _camera_pose(dataset_spec)
+    with instrumentation.stage("plan.footprint"):
+        footprint_x, footprint_y, _ = _tilted_image_footprint(camera, dataset_spec.height, cam_angle, cam_yaw, cam_roll)
+
+    nominal_dx = max(1e-6, footprint_x * (1.0 - dataset_spec.overlap))
+    nominal_dy = max(1e-6, footprint_y * (1.0 - dataset_spec.sidelap))
+
+    # 2) number of images needed along each axis
+    n_x = max(1, math.ceil(dataset_spec.scan_dimension_x / nominal_dx))
+    n_y = max(1, math.ceil(dataset_spec.scan_dimension_y / nominal_dy))
+
+    # 3) actual spacing to evenly cover the scan area while centering grid
+    spacing_x = dataset_spec.scan_dimension_x / n_x
+    spacing_y = dataset_spec.scan_dimension_y / n_y
+
+    x0 = -dataset_spec.scan_dimension_x / 2.0 + spacing_x / 2.0
+    y0 = -dataset_spec.scan_dimension_y / 2.0 + spacing_y / 2.0
+
+    # The look-at ray is the same for every waypoint up to a translation, so intersect it once.
+    height = float(dataset_spec.height)
+    with instrumentation.stage("plan.look_at"):
+        d_world_center = _camera_rotation(cam_angle, cam_yaw, cam_roll)[:, 2].copy()
+        if abs(d_world_center[2]) < 1e-8:
+            d_world_center[2] = 1e-8
+        look_at_offset = (-height / d_world_center[2]) * d_world_center
+        look_at_offset.flags.writeable = False
+        # Adding 0.0 turns -0.0 into 0.0, so that a nadir look-at (zero offset) has yaw 0 rather than 180.
+        yaw_deg = math.degrees(math.atan2(look_at_offset[1] + 0.0, look_at_offset[0] + 0.0))
+
+    with instrumentation.stage("plan.speed"):
+        capture_speed = compute_speed_during_photo_capture(camera, dataset_spec)
+
+    return _GridLayout(
+        n_x=n_x,
+        n_y=n_y,
+        spacing_x=spacing_x,
+        spacing_y=spacing_y,
+        x0=x0,
+        y0=y0,
+        height=height,
+        capture_speed=capture_speed,
+        yaw_deg=yaw_deg,
+        pitch_deg=float(cam_angle),
+        roll_deg=float(cam_roll),
+        gimbal_yaw_deg=float(cam_yaw),
+        look_at_offset=look_at_offset,
+    )
+
+
+def _plan_for_index_range(layout: _GridLayout, start: int, stop: int) -> WaypointArray:
+    """
+    Build the waypoints with serpentine indices [start, stop) of the grid in one batch.
+
+    Row r visits columns left to right when r is even and right to left when r is odd; the
+    reversal is applied as a mask over the flat waypoint indices.
+    """
+    idx = np.arange(start, stop, dtype=np.int64)
+    row, pos = np.divmod(idx, layout.n_x)
+    col = np.where(row % 2 == 0, pos, layout.n_x - 1 - pos)
+
+    x = layout.x0 + col * layout.spacing_x
+    y = layout.y0 + row * layout.spacing_y
+    look_at_x = x + layout.look_at_offset[0]
+    look_at_y = y + layout.look_at_offset[1]
+    n = stop - start
+
+    return WaypointArray(
+        x_m=x,
+        y_m=y,
+        z_m=np.full(n, layout.height),
+        speed_m_s=np.full(n, layout.capture_speed),
+        yaw_deg=np.full(n, layout.yaw_deg),
+        look_at_x_m=look_at_x,
+        look_at_y_m=look_at_y,
+        look_at_z_m=np.zeros(n),
+        pitch_deg=np.full(n, layout.pitch_deg),
+        roll_deg=np.full(n, layout.roll_deg),
+        gimbal_yaw_deg=np.full(n, layout.gimbal_yaw_deg),
+    )
+
+
+def _count_plan(plan: WaypointArray, stats_before: dict) -> None:
+    """Report the waypoints and bytes of a generated plan and the geometry cache hits/misses since `stats_before`."""
+    instrumentation.count("plan.waypoints_generated", len(plan))
+    instrumentation.count("plan.bytes_allocated", sum(getattr(plan, name).nbytes for name in WaypointArray.COLUMNS))
+    for name, stats in cache_stats().items():
+        before = stats_before[name]
+        if stats.hits > before.hits:
+            instrumentation.count(f"cache.{name}.hits", stats.hits - before.hits)
+        if stats.misses > before.misses:
+            instrumentation.count(f"cache.{name}.misses", stats.misses - before.misses)
+
+
 def generate_photo_plan_on_grid(
     camera: Camera, dataset_spec: DatasetSpec
+) -> WaypointArray:
+    """
+    Full geometric plan generation:
+    - Compute nominal distances from tilted footprint (accounts for camera_angle).
+    - Compute number of images per axis with ceil to guarantee coverage.
+    - Evenly space images to cover scan area (centred).
+    - For non-nadir poses, compute the look_at ground point for each waypoint by reprojecting the
+      image center to the ground (using the same gimbal model). yaw_deg is the direction of the
+      look_at point; the gimbal pose (camera_angle, camera_roll, camera_yaw) is stored in the
+      pitch_deg, roll_deg and gimbal_yaw_deg columns.
+    - Assign capture speed to each waypoint.
+
+    The plan is returned as a `WaypointArray` (one NumPy column per attribute) laid out in
+    serpentine order; index or iterate it to get `Waypoint` objects. All waypoints are computed
+    in a single batch of NumPy operations.
+
+    With `instrumentation` sinks installed, the stages are timed and the waypoints, allocated bytes
+    and geometry cache hits are counted.
+    """
+    if not instrumentation.enabled():
+        layout = _compute_grid_layout(camera, dataset_spec)
+        return _plan_for_index_range(layout, 0, layout.num_waypoints)
+
+    stats_before = cache_stats()
+    with instrumentation.stage("plan.generate_photo_plan_on_grid"):
+        with instrumentation.stage("plan.grid_layout"):
+            layout = _compute_grid_layout(camera, dataset_spec)
+        with instrumentation.stage("plan.waypoints"):
+            plan = _plan_for_index_range(layout, 0, layout.num_waypoints)
+    _count_plan(plan, stats_before)
+    return plan
+
+
+def iter_photo_plan_on_grid(
+    camera: Camera, dataset_spec: DatasetSpec, chunk_size: Optional[int] = None
+) -> Iterator[WaypointArray]:
+    """
+    Stream the plan of `generate_photo_plan_on_grid` in serpentine order without materializing it.
+
+    Chunks are generated on demand from the same grid layout, so memory stays constant however large
+    the scan area is. Concatenating the chunks gives exactly `generate_photo_plan_on_grid`; use
+    `itertools.chain.from_iterable` on the chunks to iterate individual `Waypoint` objects.
+
+    Args:
+        camera: the camera model.
+        dataset_spec: the dataset specification.
+        chunk_size: number of waypoints per chunk. Defaults to one grid row per chunk.
+
+    Yields:
+        Consecutive `WaypointArray` chunks of the plan.
+    """
+    layout = _compute_grid_layout(camera, dataset_spec)
+    if chunk_size is None:
+        chunk_size = layout.n_x
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    for start in range(0, layout.num_waypoints, chunk_size):
+        with instrumentation.stage("plan.waypoints"):
+            chunk = _plan_for_index_range(layout, start, min(start + chunk_size, layout.num_waypoints))
+        instrumentation.count("plan.waypoints_generated", len(chunk))
+        yield chunk
+
+
+def _generate_photo_plan_on_grid_reference(
+    camera: Camera, dataset_spec: DatasetSpec
 ) -> List[Waypoint]:
     """
+    Reference implementation: the original per-waypoint `generate_photo_plan_on_grid`, kept verbatim
+    for equivalence tests and benchmarks. It supports camera_angle only (no gimbal yaw or roll).
+
     Full geometric plan generation:
     - Compute nominal distances from tilted footprint (accounts for camera_angle).
     - Compute number of images per axis with ceil to guarantee coverage.
@@ -0,0 +1,179 @@
+"""Compact, versioned binary serialization of photo plans.
+
+Layout of a plan file (all integers little-endian):
+
+    offset 0   magic b"DTPLAN\\0\\0"                  8 bytes
+    offset 8   format version                      uint16
+    offset 10  reserved (0)                        uint16
+    offset 12  length of the JSON header in bytes  uint32
+    offset 16  number of waypoint records          uint64
+    offset 24  JSON header: camera, dataset spec, altitude reference and the record column names
+               zero padding up to a multiple of 64 bytes
+    ...        fixed-width waypoint records, one little-endian float64 per column
+
+The records are read back with `np.memmap` / `np.frombuffer` as a structured array, and the
+`WaypointArray` columns are views into it, so loading does no parsing or copying. The loaded columns
+are therefore strided (one record, 8 bytes per column, between consecutive values); copy them with
+`np.ascontiguousarray` where contiguous memory matters.
+
+Format versions:
+
+    1  columns x_m .. look_at_z_m.
+    2  adds the pitch_deg, roll_deg and gimbal_yaw_deg columns and the "altitude_reference" header
+       entry. Version 1 files are still read: their waypoints load with a nadir gimbal pose and
+       relative altitudes.
+"""
+
+import json
+import struct
+import typing as T
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from src.data_model import Camera, DatasetSpec, WaypointArray
+
+MAGIC = b"DTPLAN\0\0"
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sHHIQ")
+_NUM_RECORDS_OFFSET = 16
+
+
+def record_dtype(columns: T.Sequence[str] = WaypointArray.COLUMNS) -> np.dtype:
+    """Structured dtype of one waypoint record."""
+    return np.dtype([(name, "<f8") for name in columns])
+
+
+@dataclass
+class PlanFile:
+    camera: Camera
+    dataset_spec: DatasetSpec
+    plan: WaypointArray
+
+
+def _to_json_value(value: T.Any) -> T.Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _encode_header(camera: Camera, dataset_spec: DatasetSpec, num_records: int, altitude_reference: str) -> bytes:
+    header = {
+        "camera": {k: _to_json_value(v) for k, v in asdict(camera).items()},
+        "dataset_spec": {k: _to_json_value(v) for k, v in asdict(dataset_spec).items()},
+        "altitude_reference": altitude_reference,
+        "columns": list(WaypointArray.COLUMNS),
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header_bytes), num_records)
+    padding = -(len(preamble) + len(header_bytes)) % ALIGNMENT
+    return preamble + header_bytes + b"\0" * padding
+
+
+def _decode_header(buffer: T.Union[bytes, memoryview]) -> T.Tuple[dict, int, int]:
+    """Parse the preamble and JSON header; returns (header, num_records, records offset)."""
+    if len(buffer) < _PREAMBLE.size:
+        raise ValueError("Truncated plan file")
+    magic, version, _, header_len, num_records = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a plan file")
+    if version not in READABLE_VERSIONS:
+        raise ValueError(f"Unsupported plan format version {version}, expected one of {READABLE_VERSIONS}")
+    header_end = _PREAMBLE.size + header_len
+    header = json.loads(bytes(buffer[_PREAMBLE.size:header_end]).decode("utf-8"))
+    return header, num_records, header_end + (-header_end % ALIGNMENT)
+
+
+def _to_records(plan: WaypointArray) -> np.ndarray:
+    records = np.empty(len(plan), dtype=record_dtype())
+    for name in WaypointArray.COLUMNS:
+        records[name] = getattr(plan, name)
+    return records
+
+
+def _from_records(header: dict, records: np.ndarray) -> PlanFile:
+    # Columns are looked up by name; those missing from version 1 files (pitch_deg, roll_deg,
+    # gimbal_yaw_deg) take their `WaypointArray` defaults.
+    plan = WaypointArray(
+        **{name: records[name] for name in header["columns"] if name in WaypointArray.COLUMNS},
+        altitude_reference=header.get("altitude_reference", "relative"),
+    )
+    return PlanFile(Camera(**header["camera"]), DatasetSpec(**header["dataset_spec"]), plan)
+
+
+class PlanWriter:
+    """
+    Streaming writer: append `WaypointArray` chunks (e.g. from `iter_photo_plan_on_grid`) and the
+    record count in the header is filled in on close. The chunks must have `altitude_reference`.
+
+        with PlanWriter(path, camera, dataset_spec) as writer:
+            for chunk in iter_photo_plan_on_grid(camera, dataset_spec, chunk_size=65536):
+                writer.write(chunk)
+    """
+
+    def __init__(
+        self, path: str, camera: Camera, dataset_spec: DatasetSpec, altitude_reference: str = "relative"
+    ) -> None:
+        self.num_records = 0
+        self.altitude_reference = altitude_reference
+        self._file = open(path, "wb")
+        self._file.write(_encode_header(camera, dataset_spec, 0, altitude_reference))
+
+    def write(self, plan: WaypointArray) -> None:
+        if plan.altitude_reference != self.altitude_reference:
+            raise ValueError(
+                f"Cannot write {plan.altitude_reference} altitudes to a plan file of {self.altitude_reference} ones"
+            )
+        self._file.write(_to_records(plan).tobytes())
+        self.num_records += len(plan)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.seek(_NUM_RECORDS_OFFSET)
+        self._file.write(struct.pack("<Q", self.num_records))
+        self._file.close()
+
+    def __enter__(self) -> "PlanWriter":
+        return self
+
+    def __exit__(self, *exc_info: T.Any) -> None:
+        self.close()
+
+
+def save_plan(path: str, plan: WaypointArray, camera: Camera, dataset_spec: DatasetSpec) -> None:
+    """Write a plan file."""
+    with PlanWriter(path, camera, dataset_spec, plan.altitude_reference) as writer:
+        writer.write(plan)
+
+
+def load_plan(path: str, mmap: bool = True) -> PlanFile:
+    """
+    Read a plan file. With `mmap` the waypoint columns are views into a read-only memory map of the
+    file; otherwise the records are read into memory.
+    """
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        header_len = _PREAMBLE.unpack(preamble)[3] if len(preamble) == _PREAMBLE.size else 0
+        header, num_records, offset = _decode_header(preamble + f.read(header_len))
+        if not mmap:
+            f.seek(offset)
+            records = np.fromfile(f, dtype=record_dtype(header["columns"]), count=num_records)
+            return _from_records(header, records)
+    if num_records == 0:
+        return _from_records(header, np.empty(0, dtype=record_dtype(header["columns"])))
+    records = np.memmap(path, dtype=record_dtype(header["columns"]), mode="r", offset=offset, shape=(num_records,))
+    return _from_records(header, records)
+
+
+def plan_to_bytes(plan: WaypointArray, camera: Camera, dataset_spec: DatasetSpec) -> bytes:
+    """Serialize a plan in the plan file format."""
+    return _encode_header(camera, dataset_spec, len(plan), plan.altitude_reference) + _to_records(plan).tobytes()
+
+
+def plan_from_bytes(buffer: T.Union[bytes, bytearray, memoryview]) -> PlanFile:
+    """Deserialize a plan; the waypoint columns are views into `buffer`."""
+    header, num_records, offset = _decode_header(memoryview(buffer))
+    records = np.frombuffer(buffer, dtype=record_dtype(header["columns"]), count=num_records, offset=offset)
+    return _from_records(header, records)
@@ -0,0 +1,128 @@
+"""Choose the grid orientation and traversal direction that minimize the estimated mission time.
+
+`generate_photo_plan_on_grid` always lays rows along the X axis. For a heading theta the planner is
+run on the scan rectangle as seen from a frame rotated by theta (its bounding box in that frame),
+and the resulting plan is rotated back into the site frame. The drone, and with it the camera
+footprint, rotates with the grid, so overlap and sidelap are unchanged. For headings that are not a
+multiple of 90 degrees, waypoints whose footprint misses the scan rectangle are dropped.
+"""
+
+import math
+import typing as T
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from src.coverage import plan_footprint_quads
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.mission_time import BatteryModel, KinematicModel, MissionEstimate, estimate_mission
+from src.plan_computation import generate_photo_plan_on_grid
+
+DEFAULT_HEADINGS_DEG = (0.0, 90.0, 180.0, 270.0)
+
+
+@dataclass
+class OrientationResult:
+    plan: WaypointArray
+    heading_deg: float
+    reversed: bool
+    estimate: MissionEstimate
+    candidates: T.Dict[str, np.ndarray]  # columnar: heading_deg, reversed, image_count, total_time_s
+
+
+def _cos_sin(heading_deg: float) -> T.Tuple[float, float]:
+    # Round so that multiples of 90 degrees give exact rotations.
+    angle = math.radians(heading_deg)
+    return round(math.cos(angle), 12), round(math.sin(angle), 12)
+
+
+def rotate_plan(plan: WaypointArray, heading_deg: float) -> WaypointArray:
+    """Rotate a plan (positions, look-at points, yaw and gimbal yaw) counter-clockwise about the origin."""
+    c, s = _cos_sin(heading_deg)
+    return WaypointArray(
+        x_m=c * plan.x_m - s * plan.y_m,
+        y_m=s * plan.x_m + c * plan.y_m,
+        z_m=plan.z_m.copy(),
+        speed_m_s=plan.speed_m_s.copy(),
+        yaw_deg=(plan.yaw_deg + heading_deg + 180.0) % 360.0 - 180.0,
+        look_at_x_m=c * plan.look_at_x_m - s * plan.look_at_y_m,
+        look_at_y_m=s * plan.look_at_x_m + c * plan.look_at_y_m,
+        look_at_z_m=plan.look_at_z_m.copy(),
+        pitch_deg=plan.pitch_deg.copy(),
+        roll_deg=plan.roll_deg.copy(),
+        gimbal_yaw_deg=(plan.gimbal_yaw_deg + heading_deg + 180.0) % 360.0 - 180.0,
+        altitude_reference=plan.altitude_reference,
+    )
+
+
+def generate_photo_plan_with_heading(
+    camera: Camera, dataset_spec: DatasetSpec, heading_deg: float, reverse: bool = False
+) -> WaypointArray:
+    """
+    Grid plan for the scan rectangle of `dataset_spec` with rows flown along `heading_deg`
+    (counter-clockwise from the X axis), optionally traversed from the last waypoint to the first.
+    """
+    cos_h, sin_h = _cos_sin(heading_deg)
+    c, s = abs(cos_h), abs(sin_h)
+    width, height = dataset_spec.scan_dimension_x, dataset_spec.scan_dimension_y
+    rotated_spec = replace(
+        dataset_spec,
+        scan_dimension_x=width * c + height * s,
+        scan_dimension_y=width * s + height * c,
+    )
+    local_plan = generate_photo_plan_on_grid(camera, rotated_spec)
+    plan = rotate_plan(local_plan, heading_deg)
+
+    if c * s != 0.0:
+        # Keep the waypoints whose (rotated) footprint bounding box touches the scan rectangle.
+        quads = plan_footprint_quads(camera, plan)
+        qx, qy = quads[:, :, 0], quads[:, :, 1]
+        keep = (
+            (qx.min(axis=1) < width / 2.0) & (qx.max(axis=1) > -width / 2.0)
+            & (qy.min(axis=1) < height / 2.0) & (qy.max(axis=1) > -height / 2.0)
+        )
+        plan = plan[keep]
+
+    return plan[::-1] if reverse else plan
+
+
+def optimize_plan_orientation(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    headings_deg: T.Sequence[float] = DEFAULT_HEADINGS_DEG,
+    kinematics: T.Optional[KinematicModel] = None,
+    battery: T.Optional[BatteryModel] = None,
+    launch_xy: T.Optional[T.Tuple[float, float]] = None,
+) -> OrientationResult:
+    """
+    Evaluate every candidate heading in both traversal directions and keep the fastest plan.
+
+    Args:
+        camera: the camera model.
+        dataset_spec: the dataset specification.
+        headings_deg: candidate row headings, counter-clockwise from the X axis.
+        kinematics, battery, launch_xy: passed to `estimate_mission` to score each candidate.
+
+    Returns:
+        The plan with the minimum estimated total mission time, and the scores of all candidates.
+    """
+    best: T.Optional[OrientationResult] = None
+    rows = []
+    for heading in headings_deg:
+        for reverse in (False, True):
+            plan = generate_photo_plan_with_heading(camera, dataset_spec, heading, reverse)
+            estimate = estimate_mission(plan, kinematics, battery, launch_xy)
+            rows.append((heading, reverse, len(plan), estimate.total_time_s))
+            if best is None or estimate.total_time_s < best.estimate.total_time_s:
+                best = OrientationResult(plan, float(heading), reverse, estimate, {})
+
+    if best is None:
+        raise ValueError("At least one candidate heading is required")
+    columns = list(zip(*rows))
+    best.candidates = {
+        "heading_deg": np.array(columns[0], dtype=np.float64),
+        "reversed": np.array(columns[1], dtype=bool),
+        "image_count": np.array(columns[2], dtype=np.int64),
+        "total_time_s": np.array(columns[3], dtype=np.float64),
+    }
+    return best
@@ -0,0 +1,389 @@
+"""Asyncio planning server: a small HTTP/JSON API around `generate_photo_plan_on_grid`.
+
+    python -m src.planning_server --port 8765            # TCP
+    python -m src.planning_server --unix /tmp/plan.sock  # Unix socket
+
+Endpoints:
+    POST /plan   body {"camera": {...Camera fields}, "dataset_spec": {...DatasetSpec fields},
+                 "format": "binary" | "ndjson"}
+                 Responds with the plan streamed in chunks (chunked transfer encoding), either in the
+                 `plan_io` file format (read it back with `plan_io.plan_from_bytes`) or as JSON lines
+                 of up to `ndjson_chunk_waypoints` waypoints each ({column name: [values]}).
+    GET /stats   request, cache and coalescing counters.
+
+Plans are generated, and ndjson responses encoded, in a worker pool, so the event loop keeps serving
+while large plans are built and streamed.
+Every float of the request is rounded to `significant_digits` digits, and the rounded (camera, spec)
+pair is both the plan key and the input of the generation: requests that differ only below that
+precision share one result. Concurrent requests for a key being generated wait for that one
+generation, and the serialized plans of recent keys are kept in an LRU cache bounded by their total
+size in bytes.
+
+Requests are validated before anything is generated: out-of-range specs (e.g. overlap >= 1) and
+plans of more than `max_waypoints` waypoints are rejected with 400. In ndjson responses, values that
+are not finite numbers (the unset look-at of a waypoint) are written as `null`.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import typing as T
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
+
+import numpy as np
+
+from src.data_model import Camera, DatasetSpec, FrozenCamera, FrozenDatasetSpec, WaypointArray
+from src.plan_computation import _compute_grid_layout, generate_photo_plan_on_grid
+from src.plan_io import plan_from_bytes, plan_to_bytes
+
+DEFAULT_CACHE_BYTES = 256 << 20
+DEFAULT_MAX_WAYPOINTS = 10_000_000
+DEFAULT_SIGNIFICANT_DIGITS = 9
+DEFAULT_CHUNK_BYTES = 1 << 20
+DEFAULT_NDJSON_CHUNK_WAYPOINTS = 4096
+FORMATS = ("binary", "ndjson")
+MAX_BODY_BYTES = 1 << 20
+
+PlanKey = T.Tuple[FrozenCamera, FrozenDatasetSpec]
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+
+def _round_significant(value: T.Any, digits: int) -> T.Any:
+    if isinstance(value, float):
+        return float(f"{value:.{digits}g}")
+    return value
+
+
+def quantize_key(
+    camera: Camera, dataset_spec: DatasetSpec, significant_digits: int = DEFAULT_SIGNIFICANT_DIGITS
+) -> PlanKey:
+    """Frozen (camera, spec) with every float rounded to `significant_digits` significant digits."""
+    def rounded(obj: T.Any) -> T.Dict[str, T.Any]:
+        return {f.name: _round_significant(getattr(obj, f.name), significant_digits) for f in fields(obj)}
+
+    return FrozenCamera(**rounded(camera)), FrozenDatasetSpec(**rounded(dataset_spec))
+
+
+def _generate_plan_bytes(camera: FrozenCamera, dataset_spec: FrozenDatasetSpec) -> bytes:
+    """Worker task: generate and serialize the plan of a quantized key."""
+    camera_, dataset_spec_ = camera.thaw(), dataset_spec.thaw()
+    return plan_to_bytes(generate_photo_plan_on_grid(camera_, dataset_spec_), camera_, dataset_spec_)
+
+
+class RequestError(Exception):
+    """A request the server rejects, with the HTTP status to respond with."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def validate_plan_request(camera: Camera, dataset_spec: DatasetSpec, max_waypoints: int) -> None:
+    """Raise a 400 `RequestError` for a camera or spec out of range, or a plan of more than `max_waypoints`."""
+    for obj in (camera, dataset_spec):
+        for f in fields(obj):
+            value = getattr(obj, f.name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise RequestError(400, f"{f.name} must be a finite number, got {value!r}")
+    for name in ("overlap", "sidelap"):
+        if not 0.0 <= getattr(dataset_spec, name) < 1.0:
+            raise RequestError(400, f"{name} must be in [0, 1), got {getattr(dataset_spec, name)}")
+    for obj, names in (
+        (dataset_spec, ("height", "scan_dimension_x", "scan_dimension_y", "exposure_time_ms")),
+        (camera, ("fx", "fy", "sensor_size_x_mm", "sensor_size_y_mm", "image_size_x_px", "image_size_y_px")),
+    ):
+        for name in names:
+            if getattr(obj, name) <= 0:
+                raise RequestError(400, f"{name} must be positive, got {getattr(obj, name)}")
+    if not abs(dataset_spec.camera_angle) < 90.0:
+        raise RequestError(400, f"camera_angle must be within (-90, 90) degrees, got {dataset_spec.camera_angle}")
+
+    try:
+        num_waypoints = _compute_grid_layout(camera, dataset_spec).num_waypoints
+    except (ValueError, OverflowError) as e:  # e.g. a footprint reaching beyond the horizon
+        raise RequestError(400, f"No grid plan for this camera pose: {e}") from e
+    if num_waypoints > max_waypoints:
+        raise RequestError(400, f"The plan has {num_waypoints} waypoints, more than the limit of {max_waypoints}")
+
+
+def _json_column(values: np.ndarray) -> T.List[T.Any]:
+    """Column values as a JSON-compatible list, with non-finite floats as None (`null`)."""
+    if values.dtype.kind == "f":
+        missing = ~np.isfinite(values)
+        if missing.any():
+            column = values.astype(object)
+            column[missing] = None
+            return column.tolist()
+    return values.tolist()
+
+
+def _ndjson_line(chunk: WaypointArray) -> bytes:
+    """Worker task: one ndjson line ({column name: [values]}) of a plan chunk."""
+    line = json.dumps({name: _json_column(getattr(chunk, name)) for name in WaypointArray.COLUMNS}, allow_nan=False)
+    return (line + "\n").encode("utf-8")
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    cache_hits: int = 0
+    coalesced: int = 0     # requests that waited for a generation started by another request
+    generated: int = 0     # plans generated in the worker pool
+    cache_bytes: int = 0   # total size of the cached plans
+
+
+class PlanningServer:
+    """
+    Plan generation service; `plan_bytes` can be awaited directly, `start` serves it over HTTP.
+
+    Args:
+        executor: pool running the generation. Defaults to a `ProcessPoolExecutor` with
+            `max_workers` processes, shut down by `close`; a given executor is left running.
+        max_workers: size of the default pool. None uses all cores.
+        cache_bytes: total size of the serialized plans kept; plans larger than this are not cached.
+        max_waypoints: largest plan served; larger requests are rejected with 400.
+        significant_digits: precision of the request floats that distinguishes plans.
+        chunk_bytes: size of the chunks binary plans are streamed in.
+        ndjson_chunk_waypoints: waypoints per JSON line of ndjson responses.
+    """
+
+    def __init__(
+        self,
+        executor: T.Optional[Executor] = None,
+        max_workers: T.Optional[int] = None,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+        max_waypoints: int = DEFAULT_MAX_WAYPOINTS,
+        significant_digits: int = DEFAULT_SIGNIFICANT_DIGITS,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        ndjson_chunk_waypoints: int = DEFAULT_NDJSON_CHUNK_WAYPOINTS,
+    ) -> None:
+        self._owns_executor = executor is None
+        self.executor = executor if executor is not None else ProcessPoolExecutor(max_workers=max_workers)
+        self.cache_bytes = cache_bytes
+        self.max_waypoints = max_waypoints
+        self.significant_digits = significant_digits
+        self.chunk_bytes = chunk_bytes
+        self.ndjson_chunk_waypoints = ndjson_chunk_waypoints
+        self.stats = ServerStats()
+        self._cache: "OrderedDict[PlanKey, bytes]" = OrderedDict()
+        self._in_flight: T.Dict[PlanKey, "asyncio.Task[bytes]"] = {}
+        self._server: T.Optional[asyncio.AbstractServer] = None
+
+    async def plan_bytes(self, camera: Camera, dataset_spec: DatasetSpec) -> bytes:
+        """
+        The serialized plan for (camera, dataset_spec), from the cache, a running generation or a new one.
+
+        Raises a `RequestError` for requests failing `validate_plan_request`.
+        """
+        self.stats.requests += 1
+        key = quantize_key(camera, dataset_spec, self.significant_digits)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.stats.cache_hits += 1
+            return cached
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            # Shielded: a cancelled waiter must not cancel the generation others are waiting for.
+            return await asyncio.shield(future)
+
+        # Cached and in-flight keys have passed validation already.
+        validate_plan_request(key[0].thaw(), key[1].thaw(), self.max_waypoints)
+        # The generation runs in a task of its own rather than in this request, so it completes and is
+        # cached even if every request waiting for it is cancelled.
+        task = asyncio.ensure_future(self._generate(key))
+        self._in_flight[key] = task
+        self.stats.generated += 1
+        return await asyncio.shield(task)
+
+    async def _generate(self, key: PlanKey) -> bytes:
+        """Generate the plan of `key` in the executor and cache it."""
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, _generate_plan_bytes, *key)
+        finally:
+            del self._in_flight[key]
+        if len(result) <= self.cache_bytes:
+            self._cache[key] = result
+            self.stats.cache_bytes += len(result)
+        while self.stats.cache_bytes > self.cache_bytes:
+            self.stats.cache_bytes -= len(self._cache.popitem(last=False)[1])
+        return result
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, unix_path: T.Optional[str] = None) -> None:
+        """Start listening on a TCP port (0 picks a free one, see `port`) or on a Unix socket."""
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host=host, port=port)
+
+    @property
+    def port(self) -> int:
+        assert self._server is not None, "the server is not started"
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None, "the server is not started"
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> "PlanningServer":
+        return self
+
+    async def __aexit__(self, *exc_info: T.Any) -> None:
+        await self.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, body = await _read_request(reader)
+                await self._route(method, path, body, writer)
+            except RequestError as e:
+                await _write_json(writer, e.status, {"error": str(e)})
+            except Exception as e:  # a failed generation must not take the server down
+                await _write_json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        if path == "/stats":
+            if method != "GET":
+                raise RequestError(405, f"{method} not allowed on {path}")
+            await _write_json(writer, 200, asdict(self.stats))
+        elif path == "/plan":
+            if method != "POST":
+                raise RequestError(405, f"{method} not allowed on {path}")
+            camera, dataset_spec, fmt = _parse_plan_request(body)
+            buffer = await self.plan_bytes(camera, dataset_spec)
+            if fmt == "binary":
+                await self._stream_binary(writer, buffer)
+            else:
+                await self._stream_ndjson(writer, buffer)
+        else:
+            raise RequestError(404, f"Unknown path {path}")
+
+    async def _stream_binary(self, writer: asyncio.StreamWriter, buffer: bytes) -> None:
+        _write_head(writer, 200, "application/octet-stream")
+        view = memoryview(buffer)
+        for start in range(0, len(view), self.chunk_bytes):
+            await _write_chunk(writer, view[start:start + self.chunk_bytes])
+        await _write_chunk(writer, b"")
+
+    async def _stream_ndjson(self, writer: asyncio.StreamWriter, buffer: bytes) -> None:
+        # The JSON lines are encoded in the executor, one chunk ahead of the writes, so that large
+        # responses do not hold up the event loop.
+        _write_head(writer, 200, "application/x-ndjson")
+        plan = plan_from_bytes(buffer).plan
+        loop = asyncio.get_running_loop()
+        pending: T.Optional["asyncio.Future[bytes]"] = None
+        for start in range(0, len(plan), self.ndjson_chunk_waypoints):
+            chunk = plan[start:start + self.ndjson_chunk_waypoints]
+            line = loop.run_in_executor(self.executor, _ndjson_line, chunk)
+            if pending is not None:
+                await _write_chunk(writer, await pending)
+            pending = line
+        if pending is not None:
+            await _write_chunk(writer, await pending)
+        await _write_chunk(writer, b"")
+
+
+def _parse_plan_request(body: bytes) -> T.Tuple[Camera, DatasetSpec, str]:
+    try:
+        request = json.loads(body)
+        camera = Camera(**request["camera"])
+        dataset_spec = DatasetSpec(**request["dataset_spec"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise RequestError(400, f"Invalid plan request: {e}") from e
+    fmt = request.get("format", "binary")
+    if fmt not in FORMATS:
+        raise RequestError(400, f"format must be one of {FORMATS}, got {fmt!r}")
+    return camera, dataset_spec, fmt
+
+
+async def _read_request(reader: asyncio.StreamReader) -> T.Tuple[str, str, bytes]:
+    """Read an HTTP/1.1 request; returns (method, path, body)."""
+    request_line = (await reader.readline()).decode("latin-1").split()
+    if len(request_line) != 3:
+        raise RequestError(400, "Malformed request line")
+    method, path, _ = request_line
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise RequestError(400, "Invalid Content-Length") from None
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"Request body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], body
+
+
+def _write_head(writer: asyncio.StreamWriter, status: int, content_type: str) -> None:
+    writer.write(
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+        "Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n".encode("latin-1")
+    )
+
+
+async def _write_chunk(writer: asyncio.StreamWriter, data: T.Union[bytes, memoryview]) -> None:
+    writer.write(b"%x\r\n" % len(data))
+    writer.write(data)
+    writer.write(b"\r\n")
+    await writer.drain()
+
+
+async def _write_json(writer: asyncio.StreamWriter, status: int, payload: T.Any) -> None:
+    _write_head(writer, status, "application/json")
+    await _write_chunk(writer, json.dumps(payload).encode("utf-8"))
+    await _write_chunk(writer, b"")
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    async with PlanningServer(
+        max_workers=args.workers, cache_bytes=args.cache_bytes, max_waypoints=args.max_waypoints
+    ) as server:
+        await server.start(args.host, args.port, args.unix)
+        print(f"Planning server listening on {args.unix or f'{args.host}:{server.port}'}")
+        await server.serve_forever()
+
+
+def main(argv: T.Optional[T.Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve photo plans over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--cache-bytes", type=int, default=DEFAULT_CACHE_BYTES)
+    parser.add_argument("--max-waypoints", type=int, default=DEFAULT_MAX_WAYPOINTS)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
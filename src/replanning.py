@@ -0,0 +1,209 @@
+"""Incremental replanning: update a flown or uploaded plan after a small change of the spec.
+
+`replan` compares the old and new camera and dataset spec and returns the new plan together with a
+`PlanPatch` (waypoints added, removed and updated), so that only the difference has to be uploaded.
+
+When only the scan size changes, the old grid is kept: its spacing, phase, capture speed and look-at
+offset are reused from the cached grid layout, and the lattice is extended or cropped to the new
+area, so existing waypoints keep their exact positions and only the rows and columns that enter or
+leave the area show up in the patch. Any other change regenerates the plan (the cached footprint and
+grid geometry are still reused for the fields that did not change) and waypoints are matched by
+position.
+
+Positions are matched on a lattice of `quantum_m` meters: two waypoints whose x and y round to the
+same multiple of `quantum_m` are the same waypoint, and the waypoint is unchanged if every other
+column agrees within `quantum_m`.
+"""
+
+import math
+import typing as T
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.plan_computation import _compute_grid_layout, _plan_for_index_range, generate_photo_plan_on_grid
+
+DEFAULT_QUANTUM_M = 1e-3
+
+_LATTICE_FIELDS = {"scan_dimension_x", "scan_dimension_y"}
+# Fraction of a cell by which an area edge may overshoot a cell boundary without adding a cell.
+_EDGE_TOLERANCE = 1e-9
+
+
+@dataclass
+class PlanPatch:
+    """Difference between an old plan and a new plan of `num_waypoints` waypoints."""
+    num_waypoints: int
+    unchanged_old_index: np.ndarray  # old indices of waypoints kept as they are ...
+    unchanged_index: np.ndarray      # ... and their indices in the new plan
+    updated_old_index: np.ndarray    # old indices of waypoints kept at the same position ...
+    updated_index: np.ndarray        # ... their indices in the new plan ...
+    updated: WaypointArray           # ... and their new values
+    removed_old_index: np.ndarray    # old waypoints that are not in the new plan
+    added_index: np.ndarray          # indices in the new plan of new waypoints ...
+    added: WaypointArray             # ... and their values
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the new plan is the old plan, in the same order."""
+        return (
+            len(self.updated) == 0 and len(self.added) == 0 and self.removed_old_index.shape[0] == 0
+            and np.array_equal(self.unchanged_old_index, self.unchanged_index)
+        )
+
+    def apply(self, old_plan: WaypointArray) -> WaypointArray:
+        """Rebuild the new plan from the old one."""
+        plan = WaypointArray.empty(self.num_waypoints)
+        for name in WaypointArray.COLUMNS:
+            column = getattr(plan, name)
+            column[self.unchanged_index] = getattr(old_plan, name)[self.unchanged_old_index]
+            column[self.updated_index] = getattr(self.updated, name)
+            column[self.added_index] = getattr(self.added, name)
+        return plan
+
+
+@dataclass
+class ReplanResult:
+    """Result of `replan`."""
+    plan: WaypointArray            # the new plan, in the frame of the old plan (`patch.apply(old_plan)`)
+    patch: PlanPatch               # old plan -> new plan
+    changed_fields: T.List[str]    # camera and dataset spec fields that differ
+    kept_lattice: bool             # whether the old grid was extended/cropped rather than regenerated
+
+
+def _position_keys(plan: WaypointArray, quantum_m: float) -> np.ndarray:
+    """One int64 per waypoint identifying its (x, y) rounded to `quantum_m`."""
+    qx = np.round(plan.x_m / quantum_m).astype(np.int64)
+    qy = np.round(plan.y_m / quantum_m).astype(np.int64)
+    return (qx << 32) + (qy & 0xFFFFFFFF)
+
+
+def diff_plans(old_plan: WaypointArray, new_plan: WaypointArray, quantum_m: float = DEFAULT_QUANTUM_M) -> PlanPatch:
+    """
+    Patch turning `old_plan` into `new_plan`, matching waypoints by position (see the module docstring).
+
+    Sorting the position keys dominates, so the cost is O(N log N) in the plan sizes.
+    """
+    old_keys = _position_keys(old_plan, quantum_m)
+    new_keys = _position_keys(new_plan, quantum_m)
+    _, old_index, new_index = np.intersect1d(old_keys, new_keys, return_indices=True)
+    order = np.argsort(new_index)
+    old_index, new_index = old_index[order], new_index[order]
+
+    same = np.ones(new_index.shape[0], dtype=bool)
+    for name in WaypointArray.COLUMNS:
+        a, b = getattr(old_plan, name)[old_index], getattr(new_plan, name)[new_index]
+        with np.errstate(invalid="ignore"):
+            same &= (np.abs(a - b) <= quantum_m) | (np.isnan(a) & np.isnan(b))
+
+    added = np.ones(len(new_plan), dtype=bool)
+    added[new_index] = False
+    removed = np.ones(len(old_plan), dtype=bool)
+    removed[old_index] = False
+    added_index = np.flatnonzero(added)
+    return PlanPatch(
+        num_waypoints=len(new_plan),
+        unchanged_old_index=old_index[same],
+        unchanged_index=new_index[same],
+        updated_old_index=old_index[~same],
+        updated_index=new_index[~same],
+        updated=new_plan[new_index[~same]],
+        removed_old_index=np.flatnonzero(removed),
+        added_index=added_index,
+        added=new_plan[added_index],
+    )
+
+
+def changed_fields(old: T.Any, new: T.Any) -> T.List[str]:
+    """Names of the dataclass fields whose values differ."""
+    return [f.name for f in fields(old) if getattr(old, f.name) != getattr(new, f.name)]
+
+
+def _cell_range(origin: float, spacing: float, low: float, high: float) -> T.Tuple[int, int]:
+    """First and last lattice cells (centres origin + i * spacing) needed to cover [low, high]."""
+    # Cells whose edge only touches the area do not cover any of it.
+    first = math.ceil((low - origin) / spacing - 0.5 + _EDGE_TOLERANCE)
+    last = math.floor((high - origin) / spacing + 0.5 - _EDGE_TOLERANCE)
+    return first, max(first, last)
+
+
+def _extended_lattice_plan(
+    camera: Camera, old_spec: DatasetSpec, new_spec: DatasetSpec, offset_xy: T.Tuple[float, float]
+) -> WaypointArray:
+    """The grid of `old_spec` extended or cropped to the area of `new_spec` centred at `offset_xy`."""
+    layout = _compute_grid_layout(camera, old_spec)
+    col_first, col_last = _cell_range(
+        layout.x0, layout.spacing_x,
+        offset_xy[0] - new_spec.scan_dimension_x / 2.0, offset_xy[0] + new_spec.scan_dimension_x / 2.0,
+    )
+    row_first, row_last = _cell_range(
+        layout.y0, layout.spacing_y,
+        offset_xy[1] - new_spec.scan_dimension_y / 2.0, offset_xy[1] + new_spec.scan_dimension_y / 2.0,
+    )
+    extended = replace(
+        layout,
+        n_x=col_last - col_first + 1,
+        n_y=row_last - row_first + 1,
+        x0=layout.x0 + col_first * layout.spacing_x,
+        y0=layout.y0 + row_first * layout.spacing_y,
+    )
+    return _plan_for_index_range(extended, 0, extended.num_waypoints)
+
+
+def _is_grid_of(plan: WaypointArray, camera: Camera, dataset_spec: DatasetSpec, quantum_m: float) -> bool:
+    layout = _compute_grid_layout(camera, dataset_spec)
+    return (
+        len(plan) == layout.num_waypoints and len(plan) > 0
+        and abs(plan.x_m[0] - layout.x0) <= quantum_m and abs(plan.y_m[0] - layout.y0) <= quantum_m
+    )
+
+
+def replan(
+    old_plan: WaypointArray,
+    old_camera: Camera,
+    old_spec: DatasetSpec,
+    new_camera: Camera,
+    new_spec: DatasetSpec,
+    offset_xy: T.Tuple[float, float] = (0.0, 0.0),
+    keep_lattice: bool = True,
+    quantum_m: float = DEFAULT_QUANTUM_M,
+) -> ReplanResult:
+    """
+    Plan for `new_spec` and the patch from `old_plan` to it.
+
+    Args:
+        old_plan: the current plan, generated for (old_camera, old_spec).
+        old_camera, old_spec: what `old_plan` was generated for.
+        new_camera, new_spec: the changed camera and spec.
+        offset_xy: centre of the new scan area in the frame of the old plan; e.g. extending the area by
+            d meters on its +x side only is `new_spec.scan_dimension_x += d` with offset (d / 2, 0).
+            The new plan is expressed in the frame of the old plan.
+        keep_lattice: when only the scan size (and `offset_xy`) changes and `old_plan` is the grid of
+            `old_spec`, extend or crop the old grid instead of regenerating it.
+        quantum_m: position matching resolution (see the module docstring).
+
+    Returns:
+        A `ReplanResult` with the new plan and the patch.
+    """
+    changed = changed_fields(old_camera, new_camera) + changed_fields(old_spec, new_spec)
+    moved = offset_xy[0] != 0.0 or offset_xy[1] != 0.0
+    kept_lattice = (
+        keep_lattice
+        and (changed or moved)
+        and set(changed) <= _LATTICE_FIELDS
+        and _is_grid_of(old_plan, old_camera, old_spec, quantum_m)
+    )
+
+    if not changed and not moved:
+        plan = old_plan
+    elif kept_lattice:
+        plan = _extended_lattice_plan(old_camera, old_spec, new_spec, offset_xy)
+    else:
+        plan = generate_photo_plan_on_grid(new_camera, new_spec)
+        for name, offset in (("x_m", offset_xy[0]), ("look_at_x_m", offset_xy[0]),
+                             ("y_m", offset_xy[1]), ("look_at_y_m", offset_xy[1])):
+            getattr(plan, name)[:] += offset
+    patch = diff_plans(old_plan, plan, quantum_m)
+    # Waypoints matched as unchanged keep their old values exactly.
+    return ReplanResult(patch.apply(old_plan), patch, changed, kept_lattice)
@@ -0,0 +1,178 @@
+"""Ground sampling distance (GSD) over the whole image, and planning for a worst-case GSD target.
+
+`compute_ground_sampling_distance` gives one value for a nadir camera. For a tilted camera the ground
+size of a pixel grows towards the far edge of the image. Here the GSD is measured per pixel of a
+lattice spanning the image: every lattice pixel and its right and lower neighbours are reprojected
+to the ground (same pose and distortion model as the footprint), and the distances between the
+ground points are the pixel's GSD along the image x and y axes.
+
+On flat ground every ground point scales with the height, so maps are computed and cached at unit
+height and scaled. The solver searches the cached maps for the height or camera angle at which the
+worst GSD in the frame meets a target.
+"""
+
+import math
+import typing as T
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.geometry_cache import geometry_cache
+from src.plan_computation import (
+    _camera_pose,
+    _camera_rotation,
+    _compute_grid_layout,
+    _reproject_pixels_to_ground,
+    generate_photo_plan_on_grid,
+)
+
+DEFAULT_SAMPLES_PER_AXIS = 33
+SOLVE_FOR = ("height", "camera_angle")
+
+
+@dataclass
+class GsdMap:
+    """GSD of a lattice of pixels; pixels whose ray misses the ground have an infinite GSD."""
+    u_px: np.ndarray   # (cols,) pixel x coordinates of the lattice
+    v_px: np.ndarray   # (rows,) pixel y coordinates of the lattice
+    gsd_x: np.ndarray  # (rows, cols) ground size of one pixel step along the image x axis (m)
+    gsd_y: np.ndarray  # (rows, cols) ground size of one pixel step along the image y axis (m)
+
+    @property
+    def gsd(self) -> np.ndarray:
+        """Per-pixel GSD: the larger of the two directions."""
+        return np.maximum(self.gsd_x, self.gsd_y)
+
+    @property
+    def max_gsd(self) -> float:
+        """Worst GSD anywhere in the frame."""
+        return float(self.gsd.max())
+
+
+@geometry_cache("unit_gsd_map")
+def _unit_gsd_map(
+    camera: Camera,
+    samples_per_axis: int,
+    camera_angle_deg: float = 0.0,
+    camera_yaw_deg: float = 0.0,
+    camera_roll_deg: float = 0.0,
+) -> T.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(u_px, v_px, gsd_x, gsd_y) of the lattice for a camera at unit height above flat ground."""
+    R = _camera_rotation(camera_angle_deg, camera_yaw_deg, camera_roll_deg)
+    u = np.linspace(0.0, float(camera.image_size_x_px), samples_per_axis)
+    v = np.linspace(0.0, float(camera.image_size_y_px), samples_per_axis)
+    uu, vv = np.meshgrid(u, v)
+    uv = np.stack([uu.ravel(), vv.ravel()], axis=1)
+
+    # The lattice pixels and their right / lower neighbours, reprojected in one batch.
+    ground = _reproject_pixels_to_ground(camera, np.concatenate([uv, uv + (1.0, 0.0), uv + (0.0, 1.0)]), 1.0, R)
+    ground = ground.reshape(3, -1, 3)
+    gsd_x = np.linalg.norm(ground[1] - ground[0], axis=1)
+    gsd_y = np.linalg.norm(ground[2] - ground[0], axis=1)
+
+    # A ray reaches the ground only if the ground point lies in front of the camera.
+    camera_position = np.array([0.0, 0.0, 1.0])
+    in_front = ((ground - camera_position) @ R[:, 2] < 0.0).all(axis=0)
+    gsd_x = np.where(in_front, gsd_x, np.inf).reshape(uu.shape)
+    gsd_y = np.where(in_front, gsd_y, np.inf).reshape(uu.shape)
+    return u, v, gsd_x, gsd_y
+
+
+def compute_gsd_map(
+    camera: Camera, dataset_spec: DatasetSpec, samples_per_axis: int = DEFAULT_SAMPLES_PER_AXIS
+) -> GsdMap:
+    """
+    Per-pixel GSD over a `samples_per_axis` x `samples_per_axis` lattice spanning the image, for the
+    height and camera pose of `dataset_spec` over flat ground.
+    """
+    u, v, gsd_x, gsd_y = _unit_gsd_map(camera, samples_per_axis, *map(float, _camera_pose(dataset_spec)))
+    height = float(dataset_spec.height)
+    return GsdMap(u_px=u, v_px=v, gsd_x=gsd_x * height, gsd_y=gsd_y * height)
+
+
+def _unit_max_gsd(camera: Camera, samples_per_axis: int, pitch: float, yaw: float, roll: float) -> float:
+    _, _, gsd_x, gsd_y = _unit_gsd_map(camera, samples_per_axis, pitch, yaw, roll)
+    return float(max(gsd_x.max(), gsd_y.max()))
+
+
+def _bisect(predicate: T.Callable[[float], bool], lo: float, hi: float, tolerance: float) -> float:
+    """Largest x in [lo, hi] with predicate(x) true, for a predicate true at lo and false at hi."""
+    while hi - lo > tolerance:
+        mid = 0.5 * (lo + hi)
+        if predicate(mid):
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+@dataclass
+class ResolutionSolution:
+    """Result of `solve_for_max_gsd`."""
+    dataset_spec: DatasetSpec  # input spec with the solved height or camera angle
+    max_gsd_m: float           # worst GSD in the frame with the solved spec
+    distance_between_images_m: np.ndarray  # [x, y] waypoint spacing of the resulting grid plan (m)
+
+
+def solve_for_max_gsd(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    max_gsd_m: float,
+    solve_for: str = "height",
+    samples_per_axis: int = DEFAULT_SAMPLES_PER_AXIS,
+    tolerance_deg: float = 1e-4,
+) -> ResolutionSolution:
+    """
+    Adjust `dataset_spec` so that the worst GSD anywhere in the frame equals `max_gsd_m`.
+
+    Args:
+        camera: the camera model.
+        dataset_spec: the dataset specification; all fields but the solved one are kept.
+        max_gsd_m: GSD target for every pixel of the image (m).
+        solve_for: "height" -- the highest flight height meeting the target (exact, the GSD is linear
+            in the height) -- or "camera_angle" -- the largest tilt from nadir meeting the target at
+            the given height, keeping the sign of the current angle (bisection over cached maps).
+        samples_per_axis: GSD lattice resolution.
+        tolerance_deg: bracket width at which the angle search stops.
+
+    Returns:
+        The solved spec, its worst GSD and the image spacing of the resulting grid plan.
+    """
+    if solve_for not in SOLVE_FOR:
+        raise ValueError(f"solve_for must be one of {SOLVE_FOR}, got {solve_for!r}")
+    if max_gsd_m <= 0.0:
+        raise ValueError(f"max_gsd_m must be positive, got {max_gsd_m}")
+    pitch, yaw, roll = map(float, _camera_pose(dataset_spec))
+
+    if solve_for == "height":
+        unit_gsd = _unit_max_gsd(camera, samples_per_axis, pitch, yaw, roll)
+        if not math.isfinite(unit_gsd):
+            raise ValueError(f"Part of the image does not see the ground at camera_angle={pitch}")
+        solved = replace(dataset_spec, height=max_gsd_m / unit_gsd)
+    else:
+        height = float(dataset_spec.height)
+        sign = -1.0 if pitch < 0.0 else 1.0
+
+        def meets_target(angle: float) -> bool:
+            return height * _unit_max_gsd(camera, samples_per_axis, sign * angle, yaw, roll) <= max_gsd_m
+
+        if not meets_target(0.0):
+            raise ValueError(f"A GSD of {max_gsd_m} m cannot be reached at a height of {height} m")
+        angle = _bisect(meets_target, 0.0, 90.0, tolerance_deg)
+        solved = replace(dataset_spec, camera_angle=sign * angle)
+
+    layout = _compute_grid_layout(camera, solved)
+    return ResolutionSolution(
+        dataset_spec=solved,
+        max_gsd_m=compute_gsd_map(camera, solved, samples_per_axis).max_gsd,
+        distance_between_images_m=np.array([layout.spacing_x, layout.spacing_y]),
+    )
+
+
+def generate_photo_plan_for_max_gsd(
+    camera: Camera, dataset_spec: DatasetSpec, max_gsd_m: float, solve_for: str = "height"
+) -> WaypointArray:
+    """Grid plan for the spec solved by `solve_for_max_gsd`."""
+    solution = solve_for_max_gsd(camera, dataset_spec, max_gsd_m, solve_for)
+    return generate_photo_plan_on_grid(camera, solution.dataset_spec)
@@ -0,0 +1,286 @@
+"""Resume an interrupted survey: plan only what is left after an aborted flight.
+
+The capture log (positions, or waypoints with their camera pose) is matched against the plan with a
+`GridIndex`, a bucket grid over the plan positions answering fixed-radius nearest-neighbour queries
+in O(1) per capture. The footprints of the logged captures (`plan_footprint_quads`, i.e. the
+`_tilted_footprint_corners` model) are rasterized over the scan area to find the ground that has not
+been imaged yet.
+
+A cell is short when fewer than `min_multiplicity` logged captures image it. With the default of 1
+any ground imaged once counts as done, so the overlap of the plan is not preserved: a log of every
+other waypoint of a well-overlapping plan needs no completion. Ask for the multiplicity the plan
+provides (e.g. 2 for stereo coverage) to keep the overlap.
+
+Every grid waypoint is responsible for the spacing-sized tile around its look-at point; these tiles
+partition the scan area. The completion starts from the uncaptured waypoints whose tile contains a
+short cell, tested in O(1) each with a summed-area table of the short cells. Where their footprints
+still leave a cell short (e.g. trapezoidal oblique footprints), every uncaptured waypoint whose
+footprint contains that cell is added. Finally redundant waypoints are pruned: a waypoint is dropped
+if every cell of its footprint keeps enough coverage without it. Waypoints whose footprints cannot
+overlap are pruned together, so that no selected waypoint can be dropped without leaving a cell
+short.
+"""
+
+import typing as T
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.coverage import RasterGrid, footprint_cells, plan_footprint_quads, rasterize_footprints
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.plan_computation import _compute_grid_layout
+
+# Default raster resolution, in cells per grid spacing.
+DEFAULT_CELLS_PER_SPACING = 8
+# Footprints whose cells are listed at once by the gap and pruning passes.
+_CHUNK_SIZE = 4096
+
+_NEIGHBOUR_OFFSETS = [(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)]
+
+
+class GridIndex:
+    """Bucket grid over 2D points for nearest-neighbour queries within at most one cell size."""
+
+    def __init__(self, xy: np.ndarray, cell_size_m: float) -> None:
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        if cell_size_m <= 0.0:
+            raise ValueError(f"cell_size_m must be positive, got {cell_size_m}")
+        self.xy = xy
+        self.cell_size_m = float(cell_size_m)
+        cells = np.floor(xy / self.cell_size_m).astype(np.int64)
+        self._origin = cells.min(axis=0) if len(xy) else np.zeros(2, dtype=np.int64)
+        cells -= self._origin
+        self._shape = cells.max(axis=0) + 1 if len(xy) else np.zeros(2, dtype=np.int64)
+        keys = cells[:, 0] * self._shape[1] + cells[:, 1]
+        self._order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._order]
+
+    def nearest_within(self, query_xy: np.ndarray, radius_m: float) -> np.ndarray:
+        """
+        For every query point, the index of the nearest indexed point within `radius_m`, or -1.
+
+        `radius_m` must not exceed the cell size, so the 3 x 3 cells around a query hold every
+        candidate.
+        """
+        if radius_m > self.cell_size_m:
+            raise ValueError(f"radius_m ({radius_m}) must not exceed the cell size ({self.cell_size_m})")
+        query_xy = np.asarray(query_xy, dtype=np.float64).reshape(-1, 2)
+        nearest = np.full(query_xy.shape[0], -1, dtype=np.int64)
+        if not len(self.xy) or not len(query_xy):
+            return nearest
+        query_cells = np.floor(query_xy / self.cell_size_m).astype(np.int64) - self._origin
+
+        query_parts, point_parts = [], []
+        for di, dj in _NEIGHBOUR_OFFSETS:
+            i, j = query_cells[:, 0] + di, query_cells[:, 1] + dj
+            inside = np.flatnonzero((i >= 0) & (i < self._shape[0]) & (j >= 0) & (j < self._shape[1]))
+            keys = i[inside] * self._shape[1] + j[inside]
+            lo = np.searchsorted(self._sorted_keys, keys, side="left")
+            counts = np.searchsorted(self._sorted_keys, keys, side="right") - lo
+            # One (query, point) pair per point in the bucket.
+            query_index = np.repeat(inside, counts)
+            slot = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(query_index.shape[0])
+            query_parts.append(query_index)
+            point_parts.append(self._order[slot])
+
+        query_index = np.concatenate(query_parts)
+        point_index = np.concatenate(point_parts)
+        d2 = np.sum((self.xy[point_index] - query_xy[query_index]) ** 2, axis=1)
+        close = d2 <= radius_m * radius_m
+        query_index, point_index, d2 = query_index[close], point_index[close], d2[close]
+        # The closest point of each query comes first after sorting by (query, distance).
+        order = np.lexsort((d2, query_index))
+        query_index, point_index = query_index[order], point_index[order]
+        first = np.ones(query_index.shape[0], dtype=bool)
+        first[1:] = query_index[1:] != query_index[:-1]
+        nearest[query_index[first]] = point_index[first]
+        return nearest
+
+
+@dataclass
+class CompletionPlan:
+    """Result of `plan_completion`."""
+    plan: WaypointArray          # waypoints still to fly, in the order of the original plan
+    plan_index: np.ndarray       # their indices in the original plan
+    captured_index: np.ndarray   # indices of the original waypoints matched by the capture log
+    grid: RasterGrid             # raster over the scan area
+    multiplicity: np.ndarray     # (num_rows, num_cols) number of logged captures covering each cell
+    min_multiplicity: int = 1    # captures a cell needs to count as covered
+
+    @property
+    def uncovered_fraction(self) -> float:
+        """Fraction of the scan area imaged by fewer than `min_multiplicity` logged captures."""
+        return float((self.multiplicity < self.min_multiplicity).mean())
+
+
+def _summed_area(mask: np.ndarray) -> np.ndarray:
+    """Summed-area table with a leading row and column of zeros."""
+    table = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int64)
+    table[1:, 1:] = mask.cumsum(axis=0).cumsum(axis=1)
+    return table
+
+
+def _any_in_boxes(
+    table: np.ndarray, grid: RasterGrid, x_lo: np.ndarray, x_hi: np.ndarray, y_lo: np.ndarray, y_hi: np.ndarray
+) -> np.ndarray:
+    """Whether each box [x_lo, x_hi] x [y_lo, y_hi] contains the centre of a marked cell."""
+    cs = grid.cell_size_m
+    c0 = np.clip(np.ceil((x_lo - grid.origin_x_m) / cs - 0.5), 0, grid.num_cols).astype(np.int64)
+    c1 = np.clip(np.floor((x_hi - grid.origin_x_m) / cs - 0.5) + 1, 0, grid.num_cols).astype(np.int64)
+    r0 = np.clip(np.ceil((y_lo - grid.origin_y_m) / cs - 0.5), 0, grid.num_rows).astype(np.int64)
+    r1 = np.clip(np.floor((y_hi - grid.origin_y_m) / cs - 0.5) + 1, 0, grid.num_rows).astype(np.int64)
+    c1, r1 = np.maximum(c1, c0), np.maximum(r1, r0)
+    return (table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]) > 0
+
+
+def _footprints_reaching(quads: np.ndarray, grid: RasterGrid, mask: np.ndarray) -> np.ndarray:
+    """Whether each footprint contains the centre of a cell marked in `mask`."""
+    reaching = np.zeros(quads.shape[0], dtype=bool)
+    flat_mask = mask.ravel()
+    for start in range(0, quads.shape[0], _CHUNK_SIZE):
+        chunk = quads[start:start + _CHUNK_SIZE]
+        quad_index, cells = footprint_cells(chunk, grid)
+        reaching[start:start + chunk.shape[0]] = np.bincount(quad_index[flat_mask[cells]], minlength=chunk.shape[0]) > 0
+    return reaching
+
+
+def _disjoint_batches(quads: np.ndarray) -> T.List[np.ndarray]:
+    """
+    Partition of the footprints into batches whose bounding boxes do not overlap: boxes are binned
+    by centre on a lattice of the largest box size, and a batch takes at most one box per bin from
+    bins of the same parity, whose centres are more than one box size apart.
+    """
+    if not quads.shape[0]:
+        return []
+    lo, hi = quads.min(axis=1), quads.max(axis=1)
+    size = np.maximum((hi - lo).max(axis=0), 1e-9)
+    bins = np.floor(0.5 * (lo + hi) / size).astype(np.int64)
+    order = np.lexsort((bins[:, 1], bins[:, 0]))
+    new_bin = np.ones(order.shape[0], dtype=bool)
+    new_bin[1:] = np.any(bins[order[1:]] != bins[order[:-1]], axis=1)
+    bin_start = np.maximum.accumulate(np.where(new_bin, np.arange(order.shape[0]), 0))
+    rank = np.empty(order.shape[0], dtype=np.int64)
+    rank[order] = np.arange(order.shape[0]) - bin_start
+    batch = 4 * rank + 2 * (bins[:, 0] & 1) + (bins[:, 1] & 1)
+    return [np.flatnonzero(batch == b) for b in np.unique(batch)]
+
+
+def _prune_redundant(quads: np.ndarray, grid: RasterGrid, total: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Which footprints to keep so that no kept one is redundant: a footprint is dropped if every cell
+    it contains has more than `target` coverage in `total`, which is then updated.
+    """
+    keep = np.ones(quads.shape[0], dtype=bool)
+    total = total.ravel().copy()
+    surplus_needed = target.ravel()
+    for batch in _disjoint_batches(quads):
+        for start in range(0, batch.shape[0], _CHUNK_SIZE):
+            members = batch[start:start + _CHUNK_SIZE]
+            quad_index, cells = footprint_cells(quads[members], grid)
+            short = np.bincount(quad_index[total[cells] <= surplus_needed[cells]], minlength=members.shape[0])
+            drop = short == 0
+            keep[members[drop]] = False
+            # The footprints of a batch are disjoint, so every cell is decremented at most once.
+            total[cells[drop[quad_index]]] -= 1
+    return keep
+
+
+def _captured_footprints(
+    camera: Camera, plan: WaypointArray, captures: T.Union[WaypointArray, np.ndarray], matched: np.ndarray
+) -> np.ndarray:
+    """Footprint quads of the logged captures."""
+    if isinstance(captures, WaypointArray):
+        return plan_footprint_quads(camera, captures)
+    # Bare positions: the camera pose (and the height, if not logged) of the matched waypoint.
+    positions = np.asarray(captures, dtype=np.float64)
+    keep = matched >= 0
+    shots = plan[matched[keep]]
+    shots.x_m[:] = positions[keep, 0]
+    shots.y_m[:] = positions[keep, 1]
+    if positions.shape[1] > 2:
+        shots.z_m[:] = positions[keep, 2]
+    return plan_footprint_quads(camera, shots)
+
+
+def plan_completion(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    plan: WaypointArray,
+    captures: T.Union[WaypointArray, np.ndarray],
+    match_radius_m: T.Optional[float] = None,
+    cell_size_m: T.Optional[float] = None,
+    min_multiplicity: int = 1,
+) -> CompletionPlan:
+    """
+    Minimal set of waypoints of `plan` that completes the coverage left by an interrupted flight.
+
+    Args:
+        camera: the camera model.
+        dataset_spec: the dataset specification `plan` was generated for.
+        plan: the plan from `generate_photo_plan_on_grid`.
+        captures: the capture log, either as a `WaypointArray` (positions and camera poses of the
+            images taken) or as an (M, 2) / (M, 3) array of positions, which take the camera pose
+            (and, for (M, 2), the height) of the waypoint they are matched to; positions that match
+            no waypoint are then ignored.
+        match_radius_m: a capture within this distance of a waypoint marks it as flown. Defaults to
+            half the smaller grid spacing.
+        cell_size_m: coverage raster resolution. Defaults to 1/8 of the smaller grid spacing.
+        min_multiplicity: number of images a cell needs to count as covered. 1 treats any ground
+            imaged once as done and does not preserve the overlap of the plan; where the whole plan
+            images a cell fewer times, all of its images are required.
+
+    Returns:
+        A `CompletionPlan` with the waypoints still to fly.
+    """
+    if min_multiplicity < 1:
+        raise ValueError(f"min_multiplicity must be at least 1, got {min_multiplicity}")
+    layout = _compute_grid_layout(camera, dataset_spec)
+    spacing = min(layout.spacing_x, layout.spacing_y)
+    match_radius_m = 0.5 * spacing if match_radius_m is None else match_radius_m
+    cell_size_m = spacing / DEFAULT_CELLS_PER_SPACING if cell_size_m is None else cell_size_m
+
+    capture_xy = (
+        np.stack([captures.x_m, captures.y_m], axis=1) if isinstance(captures, WaypointArray)
+        else np.asarray(captures, dtype=np.float64)[:, :2]
+    )
+    index = GridIndex(np.stack([plan.x_m, plan.y_m], axis=1), match_radius_m)
+    matched = index.nearest_within(capture_xy, match_radius_m)
+    captured = np.zeros(len(plan), dtype=bool)
+    captured[matched[matched >= 0]] = True
+
+    half_x, half_y = dataset_spec.scan_dimension_x / 2.0, dataset_spec.scan_dimension_y / 2.0
+    grid = RasterGrid.covering(-half_x, -half_y, half_x, half_y, cell_size_m)
+    multiplicity = rasterize_footprints(_captured_footprints(camera, plan, captures, matched), grid)
+
+    # Tiles of the uncaptured waypoints, centred at their look-at points.
+    candidates = np.flatnonzero(~captured)
+    center_x = np.where(np.isnan(plan.look_at_x_m), plan.x_m, plan.look_at_x_m)[candidates]
+    center_y = np.where(np.isnan(plan.look_at_y_m), plan.y_m, plan.look_at_y_m)[candidates]
+    table = _summed_area(multiplicity < min_multiplicity)
+    needed = _any_in_boxes(
+        table, grid,
+        center_x - layout.spacing_x / 2.0, center_x + layout.spacing_x / 2.0,
+        center_y - layout.spacing_y / 2.0, center_y + layout.spacing_y / 2.0,
+    )
+
+    # Fill what the footprints of the selected waypoints leave short, as far as the uncaptured
+    # waypoints can, then drop the ones the others make redundant.
+    quads = plan_footprint_quads(camera, plan[candidates])
+    target = np.minimum(min_multiplicity, multiplicity + rasterize_footprints(quads, grid))
+    total = multiplicity + rasterize_footprints(quads[needed], grid)
+    gaps = total < target
+    if gaps.any():
+        needed |= _footprints_reaching(quads, grid, gaps)
+        total = multiplicity + rasterize_footprints(quads[needed], grid)
+    selected = np.flatnonzero(needed)
+    selected = selected[_prune_redundant(quads[selected], grid, total, target)]
+
+    plan_index = candidates[selected]
+    return CompletionPlan(
+        plan=plan[plan_index],
+        plan_index=plan_index,
+        captured_index=np.flatnonzero(captured),
+        grid=grid,
+        multiplicity=multiplicity,
+        min_multiplicity=min_multiplicity,
+    )
@@ -0,0 +1,204 @@
+"""Polygonal survey areas (with holes) and clipping of grid plans to them.
+
+Point-in-polygon queries use the even-odd rule evaluated on horizontal scanlines: the crossings of
+every polygon edge with the distinct scanline heights are computed once and sorted, after which a
+query point on a scanline is inside if an odd number of crossings lie to its left. Grid waypoints
+share a handful of distinct y values, so polygons with thousands of vertices and plans with
+hundreds of thousands of waypoints are handled with a few sorts and binary searches.
+"""
+
+import typing as T
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from src.coverage import plan_footprint_quads
+from src.data_model import Camera, DatasetSpec, WaypointArray
+from src.plan_computation import generate_photo_plan_on_grid
+
+
+@dataclass
+class SurveyPolygon:
+    """
+    Survey area in the local metric frame: an exterior ring and optional holes, each an (M, 2)
+    array of vertices (the closing edge is implicit). Orientation of the rings does not matter.
+    """
+    exterior: np.ndarray
+    holes: T.List[np.ndarray] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.exterior = np.asarray(self.exterior, dtype=np.float64)
+        self.holes = [np.asarray(hole, dtype=np.float64) for hole in self.holes]
+        for ring in [self.exterior, *self.holes]:
+            if ring.ndim != 2 or ring.shape[1] != 2 or ring.shape[0] < 3:
+                raise ValueError(f"Polygon rings must have shape (M >= 3, 2), got {ring.shape}")
+
+    def bounds(self) -> T.Tuple[float, float, float, float]:
+        """(x_min, y_min, x_max, y_max) of the exterior ring."""
+        x_min, y_min = self.exterior.min(axis=0)
+        x_max, y_max = self.exterior.max(axis=0)
+        return float(x_min), float(y_min), float(x_max), float(y_max)
+
+    def edges(self) -> np.ndarray:
+        """All edges of all rings as an (E, 2, 2) array of (start, end) points."""
+        rings = [self.exterior, *self.holes]
+        return np.concatenate([np.stack([ring, np.roll(ring, -1, axis=0)], axis=1) for ring in rings])
+
+
+class _ScanlineCrossings:
+    """Sorted x coordinates where the polygon boundary crosses each of a set of scanlines."""
+
+    def __init__(self, polygon: SurveyPolygon, scanline_y: np.ndarray) -> None:
+        self.scanline_y = scanline_y  # sorted, unique
+        edges = polygon.edges()
+        y0, y1 = edges[:, 0, 1], edges[:, 1, 1]
+        lo, hi = np.minimum(y0, y1), np.maximum(y0, y1)
+
+        # Half-open [lo, hi) so that a vertex shared by two edges is counted once.
+        first = np.searchsorted(scanline_y, lo, side="left")
+        last = np.searchsorted(scanline_y, hi, side="left")
+        count = np.maximum(last - first, 0)
+
+        edge = np.repeat(np.arange(edges.shape[0]), count)
+        offsets = np.cumsum(count) - count
+        line = first[edge] + np.arange(edge.shape[0]) - np.repeat(offsets, count)
+        y = scanline_y[line]
+        p, q = edges[edge, 0], edges[edge, 1]
+        x = p[:, 0] + (y - p[:, 1]) * (q[:, 0] - p[:, 0]) / (q[:, 1] - p[:, 1])
+
+        # Sort crossings by (line, x) through one monotone key.
+        x_min = float(x.min()) if x.shape[0] else 0.0
+        self._width = (float(x.max()) - x_min if x.shape[0] else 0.0) + 1.0
+        self._x_min = x_min
+        self.keys = np.sort(line * self._width + (x - x_min))
+        self.line_start = np.searchsorted(self.keys, np.arange(scanline_y.shape[0]) * self._width, side="left")
+
+    def count_left_of(self, line: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """Number of crossings on each query's scanline with crossing x <= query x."""
+        x = np.clip(x, self._x_min - 0.5, self._x_min + self._width - 0.5)
+        keys = line * self._width + (x - self._x_min)
+        return np.searchsorted(self.keys, keys, side="right") - self.line_start[line]
+
+
+def points_in_polygon(polygon: SurveyPolygon, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Boolean mask of the points (x, y) that lie inside the polygon (even-odd rule)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    scanline_y, line = np.unique(y, return_inverse=True)
+    crossings = _ScanlineCrossings(polygon, scanline_y)
+    return crossings.count_left_of(line, x) % 2 == 1
+
+
+def _segments_intersect_boxes(p: np.ndarray, q: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Whether each segment [p, q] meets the closed box (x_min, y_min, x_max, y_max) paired with it (Liang-Barsky)."""
+    d = q - p
+    t0 = np.zeros(p.shape[0])
+    t1 = np.ones(p.shape[0])
+    hit = np.ones(p.shape[0], dtype=bool)
+    for direction, distance in (
+        (-d[:, 0], p[:, 0] - boxes[:, 0]), (d[:, 0], boxes[:, 2] - p[:, 0]),
+        (-d[:, 1], p[:, 1] - boxes[:, 1]), (d[:, 1], boxes[:, 3] - p[:, 1]),
+    ):
+        parallel = direction == 0.0
+        hit &= ~(parallel & (distance < 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = distance / direction
+        t0 = np.where(~parallel & (direction < 0.0), np.maximum(t0, r), t0)
+        t1 = np.where(~parallel & (direction > 0.0), np.minimum(t1, r), t1)
+    return hit & (t0 <= t1)
+
+
+def _candidate_pairs(boxes: np.ndarray, edges: np.ndarray) -> T.Tuple[np.ndarray, np.ndarray]:
+    """
+    (box, edge) index pairs whose bounding boxes may overlap, from a bucket grid with cells the size
+    of a typical box. Every edge is registered in the cells of its bounding box.
+    """
+    extent = np.maximum(boxes[:, 2:] - boxes[:, :2], 0.0)
+    cell = float(max(np.median(extent.max(axis=1)), 1e-9))
+    origin = boxes[:, :2].min(axis=0)
+    top = np.floor((boxes[:, 2:].max(axis=0) - origin) / cell).astype(np.int64)
+    num_cols = int(top[0]) + 1
+
+    def cell_ranges(lo: np.ndarray, hi: np.ndarray) -> T.Tuple[np.ndarray, np.ndarray]:
+        first = np.clip(np.floor((lo - origin) / cell), 0, top + 1).astype(np.int64)
+        last = np.clip(np.floor((hi - origin) / cell), -1, top).astype(np.int64)
+        return first, np.maximum(last, first - 1)
+
+    def expand(first: np.ndarray, last: np.ndarray) -> T.Tuple[np.ndarray, np.ndarray]:
+        """(item, cell key) for every cell of every item's range."""
+        cols, rows = last[:, 0] - first[:, 0] + 1, last[:, 1] - first[:, 1] + 1
+        count = cols * rows
+        item = np.repeat(np.arange(first.shape[0]), count)
+        k = np.arange(item.shape[0]) - np.repeat(np.cumsum(count) - count, count)
+        row, col = np.divmod(k, cols[item])
+        return item, (first[item, 1] + row) * num_cols + first[item, 0] + col
+
+    edge_first, edge_last = cell_ranges(edges.min(axis=1), edges.max(axis=1))
+    edge_index, edge_keys = expand(edge_first, edge_last)
+    order = np.argsort(edge_keys, kind="stable")
+    edge_index, edge_keys = edge_index[order], edge_keys[order]
+
+    box_index, box_keys = expand(*cell_ranges(boxes[:, :2], boxes[:, 2:]))
+    lo = np.searchsorted(edge_keys, box_keys, side="left")
+    count = np.searchsorted(edge_keys, box_keys, side="right") - lo
+    pair_box = np.repeat(box_index, count)
+    slot = np.repeat(lo - np.cumsum(count) + count, count) + np.arange(pair_box.shape[0])
+    pair_edge = edge_index[slot]
+
+    # An edge spanning several cells of one box is paired with it once.
+    pair_keys = np.unique(pair_box * edges.shape[0] + pair_edge)
+    return np.divmod(pair_keys, edges.shape[0])
+
+
+def boxes_intersect_polygon(polygon: SurveyPolygon, boxes: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of the axis-aligned boxes (x_min, y_min, x_max, y_max) that intersect the polygon.
+
+    The test is exact: a box meets the polygon if a polygon edge meets the box (which includes a
+    vertex inside it) or, when no boundary passes through it, if its centre is inside. Candidate
+    (box, edge) pairs come from a bucket grid, so the cost grows with the number of boxes and edges
+    rather than with their product.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    hits = points_in_polygon(polygon, 0.5 * (boxes[:, 0] + boxes[:, 2]), 0.5 * (boxes[:, 1] + boxes[:, 3]))
+    if not boxes.shape[0]:
+        return hits
+    edges = polygon.edges()
+    box_index, edge_index = _candidate_pairs(boxes, edges)
+    crosses = _segments_intersect_boxes(edges[edge_index, 0], edges[edge_index, 1], boxes[box_index])
+    hits[box_index[crosses]] = True
+    return hits
+
+
+def clip_plan_to_polygon(
+    camera: Camera,
+    plan: WaypointArray,
+    polygon: SurveyPolygon,
+) -> WaypointArray:
+    """Keep the waypoints whose ground footprint (bounding box) intersects the polygon."""
+    quads = plan_footprint_quads(camera, plan)
+    boxes = np.concatenate([quads.min(axis=1), quads.max(axis=1)], axis=1)
+    return plan[boxes_intersect_polygon(polygon, boxes)]
+
+
+def generate_photo_plan_on_polygon(
+    camera: Camera,
+    dataset_spec: DatasetSpec,
+    polygon: SurveyPolygon,
+) -> WaypointArray:
+    """
+    Grid plan over the polygon's bounding box, clipped to the waypoints whose footprint touches it.
+
+    The scan dimensions of `dataset_spec` are replaced by the polygon's bounding box and the plan is
+    returned in the polygon's frame. The serpentine order of the remaining waypoints is kept.
+    """
+    x_min, y_min, x_max, y_max = polygon.bounds()
+    bbox_spec = replace(dataset_spec, scan_dimension_x=x_max - x_min, scan_dimension_y=y_max - y_min)
+    plan = generate_photo_plan_on_grid(camera, bbox_spec)
+
+    center_x, center_y = (x_min + x_max) / 2.0, (y_min + y_max) / 2.0
+    plan.x_m += center_x
+    plan.y_m += center_y
+    plan.look_at_x_m += center_x
+    plan.look_at_y_m += center_y
+    return clip_plan_to_polygon(camera, plan, polygon)
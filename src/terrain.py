@@ -0,0 +1,307 @@
+"""Terrain-following plans from digital elevation models (DEMs).
+
+Elevations are sampled in batch with bilinear interpolation. `DemGrid` wraps a single elevation
+array, typically memory-mapped from a .npy or raw file so that only the pages around the queried
+points are read. `TiledDem` splits a large DEM into square tiles that are loaded on demand and kept
+in a bounded LRU cache, so a country-scale DEM is never loaded as a whole.
+
+Both use the same georeferencing: cell (row, col) is centred at
+(origin_x_m + col * resolution_m, origin_y_m + row * resolution_m) in the plan's local frame. Both
+also treat missing data alike: points outside a `DemGrid` and cells of `TiledDem` tiles without data
+have no elevation (NaN), and `apply_terrain_following` rejects plans that need them.
+"""
+
+import os
+import typing as T
+from collections import OrderedDict
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from src.data_model import DatasetSpec, WaypointArray
+
+
+class ElevationModel(T.Protocol):
+    def sample(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Ground elevation at the points (x, y), in meters."""
+        ...
+
+
+def _bilinear(
+    values_at: T.Callable[[np.ndarray, np.ndarray], np.ndarray],
+    x: np.ndarray,
+    y: np.ndarray,
+    origin_x_m: float,
+    origin_y_m: float,
+    resolution_m: float,
+) -> np.ndarray:
+    """Bilinear interpolation given a function returning the elevations of integer cells."""
+    col = (np.asarray(x, dtype=np.float64) - origin_x_m) / resolution_m
+    row = (np.asarray(y, dtype=np.float64) - origin_y_m) / resolution_m
+    col0 = np.floor(col).astype(np.int64)
+    row0 = np.floor(row).astype(np.int64)
+    fx = col - col0
+    fy = row - row0
+
+    z00 = values_at(row0, col0)
+    z01 = values_at(row0, col0 + 1)
+    z10 = values_at(row0 + 1, col0)
+    z11 = values_at(row0 + 1, col0 + 1)
+    return _lerp(_lerp(z00, z01, fx), _lerp(z10, z11, fx), fy)
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, f: np.ndarray) -> np.ndarray:
+    # Exactly `a` at f = 0, so that points on the last row or column do not read the missing cells beyond it.
+    return np.where(f == 0.0, a, a * (1 - f) + b * f)
+
+
+class DemGrid:
+    """Elevation model backed by one 2-D array (rows along y, columns along x)."""
+
+    def __init__(self, elevations: np.ndarray, origin_x_m: float, origin_y_m: float, resolution_m: float) -> None:
+        if elevations.ndim != 2:
+            raise ValueError(f"elevations must be 2-D, got shape {elevations.shape}")
+        self.elevations = elevations
+        self.origin_x_m = origin_x_m
+        self.origin_y_m = origin_y_m
+        self.resolution_m = resolution_m
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        origin_x_m: float,
+        origin_y_m: float,
+        resolution_m: float,
+        shape: T.Optional[T.Tuple[int, int]] = None,
+        dtype: DTypeLike = np.float32,
+    ) -> "DemGrid":
+        """Memory-map a .npy file, or a raw file of the given shape and dtype."""
+        if shape is None:
+            elevations = np.load(path, mmap_mode="r")
+        else:
+            elevations = np.memmap(path, dtype=dtype, mode="r", shape=shape)
+        return cls(elevations, origin_x_m, origin_y_m, resolution_m)
+
+    def _values_at(self, row: np.ndarray, col: np.ndarray) -> np.ndarray:
+        # Points outside the grid have no elevation, like the cells of missing `TiledDem` tiles.
+        num_rows, num_cols = self.elevations.shape
+        inside = (row >= 0) & (row < num_rows) & (col >= 0) & (col < num_cols)
+        values = np.full(row.shape, np.nan)
+        values[inside] = self.elevations[row[inside], col[inside]]
+        return values
+
+    def sample(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return _bilinear(self._values_at, x, y, self.origin_x_m, self.origin_y_m, self.resolution_m)
+
+
+class TiledDem:
+    """
+    Elevation model split into square tiles of `tile_size` cells, loaded lazily through `load_tile`.
+
+    `load_tile(tile_row, tile_col)` returns the (tile_size, tile_size) elevations of that tile, or
+    None where there is no data (those cells read as `fill_value`, by default NaN: no elevation). At
+    most `max_cached_tiles` tiles are kept in memory.
+    """
+
+    def __init__(
+        self,
+        load_tile: T.Callable[[int, int], T.Optional[np.ndarray]],
+        tile_size: int,
+        origin_x_m: float,
+        origin_y_m: float,
+        resolution_m: float,
+        max_cached_tiles: int = 64,
+        fill_value: float = np.nan,
+    ) -> None:
+        self.load_tile = load_tile
+        self.tile_size = tile_size
+        self.origin_x_m = origin_x_m
+        self.origin_y_m = origin_y_m
+        self.resolution_m = resolution_m
+        self.max_cached_tiles = max_cached_tiles
+        self.fill_value = fill_value
+        self.tiles_loaded = 0
+        self._cache: "OrderedDict[T.Tuple[int, int], T.Optional[np.ndarray]]" = OrderedDict()
+
+    @classmethod
+    def from_directory(
+        cls,
+        directory: str,
+        tile_size: int,
+        origin_x_m: float,
+        origin_y_m: float,
+        resolution_m: float,
+        pattern: str = "tile_{row}_{col}.npy",
+        **kwargs: T.Any,
+    ) -> "TiledDem":
+        """Tiles stored as memory-mapped .npy files named after their tile row and column."""
+        def load_tile(row: int, col: int) -> T.Optional[np.ndarray]:
+            path = os.path.join(directory, pattern.format(row=row, col=col))
+            return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+        return cls(load_tile, tile_size, origin_x_m, origin_y_m, resolution_m, **kwargs)
+
+    def _tile(self, key: T.Tuple[int, int]) -> T.Optional[np.ndarray]:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        tile = self.load_tile(*key)
+        self.tiles_loaded += 1
+        self._cache[key] = tile
+        if len(self._cache) > self.max_cached_tiles:
+            self._cache.popitem(last=False)
+        return tile
+
+    def _values_at(self, row: np.ndarray, col: np.ndarray) -> np.ndarray:
+        tile_row, local_row = np.divmod(row, self.tile_size)
+        tile_col, local_col = np.divmod(col, self.tile_size)
+        values = np.full(row.shape, self.fill_value, dtype=np.float64)
+
+        # Group the queries by tile so that each touched tile is fetched once.
+        keys, inverse = np.unique(np.stack([tile_row, tile_col]), axis=1, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(keys.shape[1] + 1))
+        for k in range(keys.shape[1]):
+            tile = self._tile((int(keys[0, k]), int(keys[1, k])))
+            if tile is None:
+                continue
+            idx = order[bounds[k]:bounds[k + 1]]
+            values[idx] = tile[local_row[idx], local_col[idx]]
+        return values
+
+    def sample(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return _bilinear(self._values_at, x, y, self.origin_x_m, self.origin_y_m, self.resolution_m)
+
+
+def _terrain_crossings(
+    dem: ElevationModel,
+    origin: np.ndarray,
+    direction: np.ndarray,
+    max_range: float,
+    step: float,
+    tolerance_m: float,
+) -> T.Tuple[np.ndarray, np.ndarray]:
+    """
+    Ray parameter t of the first crossing of the rays origin + t * direction (shape (N, 3), t = 1 on
+    the flat ground) with the terrain, and whether one was found within t <= max_range.
+
+    f(t) = ray height - terrain height is positive at t = 0. It is sampled every `step` until it changes
+    sign; the crossing is then bisected until the bracket is shorter than `tolerance_m` along the
+    ray and refined by one secant step, which is exact where the terrain is planar. A ray reaching a
+    point without elevation (NaN) stops there and is not found; t is that point.
+    """
+    def height_above_terrain(index: np.ndarray, t: np.ndarray) -> np.ndarray:
+        point = origin[index] + t[:, None] * direction[index]
+        return point[:, 2] - dem.sample(point[:, 0], point[:, 1])
+
+    n = origin.shape[0]
+    lo, hi = np.zeros(n), np.full(n, step)
+    f_lo = height_above_terrain(np.arange(n), lo)
+    f_hi = np.empty(n)
+    found = np.zeros(n, dtype=bool)
+
+    # March along the rays still above the terrain.
+    active = np.flatnonzero(f_lo > 0.0)
+    found[f_lo <= 0.0] = True
+    hi[found], f_hi[found] = 0.0, f_lo[found]
+    while active.shape[0] and hi[active[0]] <= max_range + 1e-12:
+        f = height_above_terrain(active, hi[active])
+        crossed = f <= 0.0
+        f_hi[active[crossed]] = f[crossed]
+        found[active[crossed]] = True
+        above = active[f > 0.0]
+        lo[above], f_lo[above] = hi[above], f[f > 0.0]
+        hi[above] += step
+        active = above
+
+    # Bisect the brackets, then interpolate.
+    bracketed = np.flatnonzero(found & (hi > lo))
+    length = np.linalg.norm(direction[bracketed], axis=1)
+    iterations = int(np.ceil(np.log2(max(step * float(length.max(initial=0.0)) / tolerance_m, 1.0))))
+    for _ in range(iterations):
+        mid = 0.5 * (lo[bracketed] + hi[bracketed])
+        f = height_above_terrain(bracketed, mid)
+        below = f <= 0.0
+        hi[bracketed[below]], f_hi[bracketed[below]] = mid[below], f[below]
+        lo[bracketed[~below]], f_lo[bracketed[~below]] = mid[~below], f[~below]
+    t = hi.copy()
+    lo_b, hi_b, f_lo_b, f_hi_b = lo[bracketed], hi[bracketed], f_lo[bracketed], f_hi[bracketed]
+    t[bracketed] = lo_b + f_lo_b * (hi_b - lo_b) / (f_lo_b - f_hi_b)
+    return t, found
+
+
+def apply_terrain_following(
+    dataset_spec: DatasetSpec,
+    plan: WaypointArray,
+    dem: ElevationModel,
+    max_range: float = 10.0,
+    tolerance_m: float = 1e-3,
+    step: float = 0.25,
+) -> WaypointArray:
+    """
+    Adapt a flat-ground plan to the terrain of `dem`.
+
+    - z_m becomes the ground elevation under the waypoint plus `dataset_spec.height`.
+    - The look-at point is re-intersected with the terrain along the same viewing ray: the first
+      crossing found by sampling the ray every `step` times the flat-ground distance, bisected to
+      `tolerance_m` along the ray. Ridges narrower than one step may be missed.
+    - The capture speed (from `compute_speed_during_photo_capture`) is scaled by the ratio of the
+      distance to the look-at point on the terrain to the distance on flat ground, since GSD grows
+      linearly with that distance.
+
+    z_m and look_at_z_m of the result are elevations in the DEM's vertical datum, and its
+    `altitude_reference` is "absolute". The plan can be streamed: chunks from
+    `iter_photo_plan_on_grid` can be processed independently.
+
+    Raises:
+        ValueError: if the plan is not a flat-ground ("relative") plan, if the DEM has no elevation
+            under a waypoint or along a viewing ray up to the terrain, or if a viewing ray does not
+            reach the terrain within `max_range` times the flat-ground distance, e.g. an oblique view
+            over ground falling away more steeply than the ray.
+    """
+    if plan.altitude_reference != "relative":
+        raise ValueError(f"Terrain following needs a flat-ground plan, not {plan.altitude_reference} altitudes")
+    height = float(dataset_spec.height)
+    ground = dem.sample(plan.x_m, plan.y_m)
+    missing = np.flatnonzero(np.isnan(ground))
+    if missing.shape[0]:
+        raise ValueError(f"The DEM has no elevation under {missing.shape[0]} waypoints (first: {missing[0]})")
+    z = ground + height
+
+    # Viewing ray of the flat plan: from the camera to its look-at point on the z = 0 ground.
+    look_at_z = np.nan_to_num(plan.look_at_z_m, nan=0.0)
+    dx = np.nan_to_num(plan.look_at_x_m - plan.x_m, nan=0.0)
+    dy = np.nan_to_num(plan.look_at_y_m - plan.y_m, nan=0.0)
+    dz = look_at_z - plan.z_m
+
+    # P(t) = camera + t * d hits the terrain when P_z(t) = dem(P_xy(t)); t = 1 on flat ground.
+    t, found = _terrain_crossings(
+        dem, np.stack([plan.x_m, plan.y_m, z], axis=1), np.stack([dx, dy, dz], axis=1), max_range, step, tolerance_m
+    )
+    if not found.all():
+        missed = np.flatnonzero(~found)
+        # Rays stopped by missing elevations end within max_range; the others ran out of range.
+        left_dem = missed[t[missed] <= max_range + 1e-12]
+        if left_dem.shape[0]:
+            raise ValueError(f"The viewing rays of {left_dem.shape[0]} waypoints (first: {left_dem[0]}) leave the DEM")
+        raise ValueError(
+            f"The viewing rays of {missed.shape[0]} waypoints (first: {missed[0]}) do not reach the terrain "
+            f"within {max_range} times the flat-ground distance"
+        )
+
+    return WaypointArray(
+        x_m=plan.x_m.copy(),
+        y_m=plan.y_m.copy(),
+        z_m=z,
+        speed_m_s=plan.speed_m_s * t,
+        yaw_deg=plan.yaw_deg.copy(),
+        look_at_x_m=plan.x_m + t * dx,
+        look_at_y_m=plan.y_m + t * dy,
+        look_at_z_m=z + t * dz,
+        pitch_deg=plan.pitch_deg.copy(),
+        roll_deg=plan.roll_deg.copy(),
+        gimbal_yaw_deg=plan.gimbal_yaw_deg.copy(),
+        altitude_reference="absolute",
+    )
@@ -1,20 +1,153 @@
 """Utility to visualize photo plans.
+
+Traces are built directly from the `WaypointArray` columns and drawn with WebGL (`go.Scattergl`), so
+plans with millions of waypoints stay interactive. Large plans are decimated to a level of detail
+first: the start, the end and every turn of the path (e.g. the row endpoints of a serpentine) are
+always kept, and the remaining budget is spread evenly over the straight segments, so the drawn path
+has the same shape as the full one.
 """
 
 import typing as T
 
+import numpy as np
 import plotly.graph_objects as go
 
-from src.data_model import Waypoint
+from src.coverage import RasterGrid, plan_footprint_quads, rasterize_footprints
+from src.data_model import Camera, Waypoint, WaypointArray
+
+DEFAULT_MAX_POINTS = 20_000
+DEFAULT_MAX_FOOTPRINTS = 2_000
+DEFAULT_MAX_COVERAGE_CELLS = 250_000
+
+# Directions of consecutive segments differing by more than this angle make a turn.
+_TURN_COS = np.cos(np.radians(1.0))
+
+
+def turn_indices(plan: WaypointArray) -> np.ndarray:
+    """Indices of the first and last waypoints and of every waypoint where the path changes direction."""
+    n = len(plan)
+    if n <= 2:
+        return np.arange(n)
+    segments = np.diff(np.stack([plan.x_m, plan.y_m], axis=1), axis=0)
+    lengths = np.hypot(segments[:, 0], segments[:, 1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        directions = segments / lengths[:, None]
+    cos_turn = np.einsum("ij,ij->i", directions[:-1], directions[1:])
+    # NaN (a zero-length segment, e.g. a hover) counts as a turn.
+    is_turn = ~(cos_turn >= _TURN_COS)
+    return np.concatenate([[0], np.flatnonzero(is_turn) + 1, [n - 1]])
+
+
+def decimate_plan(plan: WaypointArray, max_points: int = DEFAULT_MAX_POINTS) -> np.ndarray:
+    """
+    Sorted indices of at most `max_points` waypoints to draw for `plan`.
+
+    The turns from `turn_indices` are kept and the rest of the budget is filled with evenly spaced
+    waypoints. If there are more turns than `max_points`, evenly spaced turns are kept instead.
+    """
+    n = len(plan)
+    if n <= max_points:
+        return np.arange(n)
+    turns = turn_indices(plan)
+    if turns.shape[0] >= max_points:
+        return turns[np.linspace(0, turns.shape[0] - 1, max_points).round().astype(np.int64)]
+    fill = np.linspace(0, n - 1, max_points - turns.shape[0]).round().astype(np.int64)
+    return np.union1d(turns, fill)
+
+
+def _footprint_trace(camera: Camera, plan: WaypointArray, max_footprints: int) -> go.Scattergl:
+    """Outlines of up to `max_footprints` evenly spaced footprints, as one NaN-separated line trace."""
+    step = max(1, -(-len(plan) // max_footprints))
+    quads = plan_footprint_quads(camera, plan[::step])
+    outline = np.concatenate([quads, quads[:, :1], np.full((quads.shape[0], 1, 2), np.nan)], axis=1).reshape(-1, 2)
+    return go.Scattergl(
+        x=outline[:, 0], y=outline[:, 1], mode="lines", name=f"footprints (every {step})" if step > 1 else "footprints",
+        line=dict(width=1, color="rgba(31, 119, 180, 0.35)"), hoverinfo="skip",
+    )
+
+
+def _coverage_trace(camera: Camera, plan: WaypointArray, max_cells: int) -> go.Heatmap:
+    """Heatmap of the number of images covering each cell of a raster spanning all footprints."""
+    quads = plan_footprint_quads(camera, plan)
+    x_min, y_min = quads.reshape(-1, 2).min(axis=0)
+    x_max, y_max = quads.reshape(-1, 2).max(axis=0)
+    cell_size = max(np.sqrt((x_max - x_min) * (y_max - y_min) / max_cells), 1e-3)
+    grid = RasterGrid.covering(x_min, y_min, x_max, y_max, cell_size)
+    multiplicity = rasterize_footprints(quads, grid)
+    xs, ys = grid.cell_centers()
+    return go.Heatmap(
+        x=xs, y=ys, z=np.where(multiplicity > 0, multiplicity, np.nan), name="coverage",
+        colorscale="Viridis", colorbar=dict(title="images", x=1.12), opacity=0.6,
+        hovertemplate="x=%{x:.1f} m<br>y=%{y:.1f} m<br>images=%{z}<extra></extra>",
+    )
 
 
-def plot_photo_plan(photo_plans: T.List[Waypoint]) -> go.Figure:
+def plot_photo_plan(
+    photo_plans: T.Union[WaypointArray, T.List[Waypoint]],
+    camera: T.Optional[Camera] = None,
+    show_footprints: bool = False,
+    show_coverage: bool = False,
+    max_points: int = DEFAULT_MAX_POINTS,
+    max_footprints: int = DEFAULT_MAX_FOOTPRINTS,
+    max_coverage_cells: int = DEFAULT_MAX_COVERAGE_CELLS,
+) -> go.Figure:
     """Plot the photo plan on a 2D grid.
 
     Args:
-        photo_plans: List of waypoints for the photo plan.
+        photo_plans: waypoints for the photo plan (a `WaypointArray` or a list of waypoints).
+        camera: the camera model; required for the footprint and coverage overlays.
+        show_footprints: overlay the ground footprints of (up to `max_footprints`) waypoints.
+        show_coverage: overlay a heatmap of the number of images covering each ground cell.
+        max_points: level of detail; larger plans are decimated with `decimate_plan`.
+        max_footprints: number of footprints drawn at most.
+        max_coverage_cells: number of cells of the coverage raster at most.
 
     Returns:
         Plotly figure object.
     """
-    raise NotImplementedError()
+    plan = photo_plans if isinstance(photo_plans, WaypointArray) else WaypointArray.from_waypoints(photo_plans)
+    if (show_footprints or show_coverage) and camera is None:
+        raise ValueError("A camera is required to show footprints or coverage")
+
+    fig = go.Figure()
+    if show_coverage and len(plan):
+        fig.add_trace(_coverage_trace(camera, plan, max_coverage_cells))
+    if show_footprints and len(plan):
+        fig.add_trace(_footprint_trace(camera, plan, max_footprints))
+
+    index = decimate_plan(plan, max_points)
+    shown = plan[index]
+    name = "flight path" if len(shown) == len(plan) else f"flight path ({len(shown)} of {len(plan)} waypoints)"
+    fig.add_trace(go.Scattergl(
+        x=shown.x_m, y=shown.y_m, mode="lines+markers", name=name,
+        line=dict(width=1, color="gray"),
+        marker=dict(size=5, color=index, colorscale="Plasma", colorbar=dict(title="order")),
+        customdata=np.stack([index, shown.z_m, shown.speed_m_s], axis=1),
+        hovertemplate=(
+            "waypoint %{customdata[0]}<br>x=%{x:.2f} m, y=%{y:.2f} m, z=%{customdata[1]:.2f} m"
+            "<br>speed=%{customdata[2]:.2f} m/s<extra></extra>"
+        ),
+    ))
+
+    oblique = np.isfinite(shown.look_at_x_m) & ((shown.look_at_x_m != shown.x_m) | (shown.look_at_y_m != shown.y_m))
+    if oblique.any():
+        fig.add_trace(go.Scattergl(
+            x=shown.look_at_x_m[oblique], y=shown.look_at_y_m[oblique], mode="markers", name="look-at points",
+            marker=dict(size=3, color="firebrick"), visible="legendonly",
+        ))
+    if len(plan):
+        fig.add_trace(go.Scattergl(
+            x=plan.x_m[[0, -1]], y=plan.y_m[[0, -1]], mode="markers+text", name="start / end",
+            text=["start", "end"], textposition="top center",
+            marker=dict(size=12, color=["green", "red"], symbol=["circle", "x"]),
+        ))
+
+    fig.update_layout(
+        title=f"Photo plan: {len(plan)} waypoints",
+        xaxis_title="x (m)",
+        yaxis_title="y (m)",
+        yaxis=dict(scaleanchor="x", scaleratio=1),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02),
+        template="plotly_white",
+    )
+    return fig
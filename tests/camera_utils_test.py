@@ -79,6 +79,56 @@ class CameraUnitsTest(unittest.TestCase):
         computed_footprint = camera_utils.compute_image_footprint_on_surface(TEST_CAMERA, height)
         np.testing.assert_allclose(computed_footprint, expected_footprint, rtol=1e-1, atol=1e-1)
 
+    def test_project_world_points_to_image(self) -> None:
+        world_points = np.array([[10.0, 20.0, 50.0], [20.0, 10.0, 50.0], [-7.5, 3.0, 12.0]])
+        expected = np.stack(
+            [camera_utils.project_world_point_to_image(TEST_CAMERA, p) for p in world_points]
+        )
+
+        computed = camera_utils.project_world_points_to_image(TEST_CAMERA, world_points)
+        self.assertEqual(computed.dtype, np.float32)
+        np.testing.assert_allclose(computed, expected, rtol=1e-6)
+
+        # float64 on request, and into a preallocated buffer
+        computed = camera_utils.project_world_points_to_image(TEST_CAMERA, world_points, dtype=np.float64)
+        self.assertEqual(computed.dtype, np.float64)
+        np.testing.assert_allclose(computed, expected, rtol=1e-6)
+
+        out = np.empty((3, 2))
+        result = camera_utils.project_world_points_to_image(TEST_CAMERA, world_points, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_allclose(out, expected, rtol=1e-6)
+
+        with self.assertRaises(ValueError):
+            camera_utils.project_world_points_to_image(TEST_CAMERA, world_points, out=np.empty((2, 2)))
+
+    def test_reproject_image_points_to_world(self) -> None:
+        world_points = np.array([[10.0, 20.0, 50.0], [20.0, 10.0, 50.0], [-7.5, 3.0, 12.0]])
+        image_points = camera_utils.project_world_points_to_image(
+            TEST_CAMERA, world_points, dtype=np.float64
+        )
+
+        # Case 1: per-point depths
+        computed = camera_utils.reproject_image_points_to_world(
+            TEST_CAMERA, image_points, world_points[:, 2], dtype=np.float64
+        )
+        np.testing.assert_allclose(computed, world_points, atol=1e-9)
+
+        # Case 2: one depth for all points matches the scalar version
+        computed = camera_utils.reproject_image_points_to_world(TEST_CAMERA, image_points, 50.0)
+        expected = np.stack(
+            [camera_utils.reproject_image_point_to_world(TEST_CAMERA, p, 50.0) for p in image_points]
+        )
+        np.testing.assert_allclose(computed, expected, rtol=1e-6)
+
+    def test_compute_image_footprints_on_surface(self) -> None:
+        heights = np.array([150.0, 300.0])
+        expected = np.stack(
+            [camera_utils.compute_image_footprint_on_surface(TEST_CAMERA, h) for h in heights]
+        )
+        computed = camera_utils.compute_image_footprints_on_surface(TEST_CAMERA, heights, dtype=np.float64)
+        np.testing.assert_allclose(computed, expected, rtol=1e-6)
+
     def test_compute_gsd(self):
         # Case 1: baseline
         height = 150
@@ -93,6 +143,39 @@ class CameraUnitsTest(unittest.TestCase):
         computed_gsd = camera_utils.compute_ground_sampling_distance(camera_, height)
         self.assertAlmostEqual(computed_gsd, expected_gsd, places=3)
 
+    def test_lens_distortion(self) -> None:
+        camera_ = deepcopy(TEST_CAMERA)
+        camera_.k1, camera_.k2, camera_.p1, camera_.p2 = -0.2, 0.05, 1e-3, -5e-4
+        rng = np.random.default_rng(0)
+        image_points = rng.uniform(0.0, 1000.0, size=(1000, 2))
+
+        # Case 1: undistortion inverts distortion, with and without the lookup table
+        ideal = camera_utils.undistort_image_points(camera_, image_points)
+        np.testing.assert_allclose(camera_utils.distort_image_points(camera_, ideal), image_points, atol=1e-6)
+        undistortion_map = camera_utils.compute_undistortion_map(camera_)
+        from_map = camera_utils.undistort_image_points(camera_, image_points, undistortion_map=undistortion_map)
+        np.testing.assert_allclose(from_map, ideal, atol=1e-4)
+
+        # Case 2: projection and reprojection stay inverse of each other
+        world_points = camera_utils.reproject_image_points_to_world(camera_, image_points, 50.0, dtype=np.float64)
+        projected = camera_utils.project_world_points_to_image(camera_, world_points, dtype=np.float64)
+        np.testing.assert_allclose(projected, image_points, atol=1e-4)
+        world_point = camera_utils.reproject_image_point_to_world(camera_, image_points[0], 50.0)
+        np.testing.assert_allclose(world_point, world_points[0], rtol=1e-5)
+        np.testing.assert_allclose(camera_utils.project_world_point_to_image(camera_, world_point), image_points[0], atol=1e-2)
+
+        # Case 3: barrel distortion (k1 < 0) widens the footprint
+        camera_.k2 = camera_.p1 = camera_.p2 = 0.0
+        footprint = camera_utils.compute_image_footprint_on_surface(camera_, 150.0)
+        self.assertTrue(np.all(footprint > camera_utils.compute_image_footprint_on_surface(TEST_CAMERA, 150.0)))
+        np.testing.assert_allclose(
+            camera_utils.compute_image_footprints_on_surface(camera_, np.array([150.0])), footprint[None], rtol=1e-6
+        )
+
+        # Case 4: zero coefficients are the identity
+        self.assertFalse(camera_utils.has_distortion(TEST_CAMERA))
+        np.testing.assert_allclose(camera_utils.undistort_image_points(TEST_CAMERA, image_points), image_points, atol=1e-9)
+
 
 
 
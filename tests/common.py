@@ -1,4 +1,4 @@
-from src.data_model import Camera
+from src.data_model import Camera, DatasetSpec
 
 fx = 700
 fy = 700
@@ -19,3 +19,12 @@ TEST_CAMERA = Camera(
     image_size_x_px,
     image_size_y_px
 )
+
+TEST_DATASET_SPEC = DatasetSpec(
+    overlap=0.7,
+    sidelap=0.7,
+    height=50.0,
+    scan_dimension_x=200.0,
+    scan_dimension_y=150.0,
+    exposure_time_ms=2.0,
+)
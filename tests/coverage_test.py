@@ -0,0 +1,72 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.coverage as coverage
+from src.plan_computation import generate_photo_plan_on_grid
+from src.plan_optimization import generate_photo_plan_with_heading
+
+
+class CoverageTest(unittest.TestCase):
+
+    def test_rasterize_footprints(self) -> None:
+        grid = coverage.RasterGrid(0.0, 0.0, 1.0, num_rows=4, num_cols=6)
+        quads = np.array([
+            [[0.0, 0.0], [3.0, 0.0], [3.0, 2.0], [0.0, 2.0]],  # covers cols 0-2, rows 0-1
+            [[1.0, 1.0], [5.0, 1.0], [5.0, 4.0], [1.0, 4.0]],  # covers cols 1-4, rows 1-3
+        ])
+        expected = np.array([
+            [1, 1, 1, 0, 0, 0],
+            [1, 2, 2, 1, 1, 0],
+            [0, 1, 1, 1, 1, 0],
+            [0, 1, 1, 1, 1, 0],
+        ])
+
+        for chunk_size in (1, 2):
+            computed = coverage.rasterize_footprints(quads, grid, chunk_size=chunk_size)
+            np.testing.assert_array_equal(computed, expected)
+
+    def test_generated_plan_meets_spec(self) -> None:
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        report = coverage.verify_plan_coverage(TEST_CAMERA, TEST_DATASET_SPEC, plan)
+
+        self.assertTrue(report.meets_spec)
+        self.assertEqual(report.num_gap_cells, 0)
+        self.assertGreaterEqual(report.min_multiplicity, 1)
+        self.assertGreaterEqual(report.achieved_overlap, TEST_DATASET_SPEC.overlap - 1e-6)
+        self.assertGreaterEqual(report.achieved_sidelap, TEST_DATASET_SPEC.sidelap - 1e-6)
+
+    def test_rotated_plan_meets_spec(self) -> None:
+        # Rows are not at constant y, so they are segmented along the flight path
+        for heading_deg in (30.0, 90.0, 200.0):
+            plan = generate_photo_plan_with_heading(TEST_CAMERA, TEST_DATASET_SPEC, heading_deg)
+            report = coverage.verify_plan_coverage(TEST_CAMERA, TEST_DATASET_SPEC, plan)
+            self.assertTrue(report.meets_spec, heading_deg)
+            self.assertLess(report.achieved_overlap, TEST_DATASET_SPEC.overlap + 0.05)
+            self.assertLess(report.achieved_sidelap, TEST_DATASET_SPEC.sidelap + 0.05)
+
+    def test_detects_gaps_and_low_overlap(self) -> None:
+        # Case 1: a plan generated for lower overlap does not meet the nominal spec
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.overlap = 0.3
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+        report = coverage.verify_plan_coverage(TEST_CAMERA, TEST_DATASET_SPEC, plan)
+        self.assertFalse(report.meets_spec)
+        self.assertLess(report.achieved_overlap, TEST_DATASET_SPEC.overlap)
+
+        # Case 2: dropping every other row leaves gaps
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.sidelap = 0.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+        rows = np.unique(plan.y_m)
+        plan = plan[np.isin(plan.y_m, rows[::2])]
+        report = coverage.verify_plan_coverage(TEST_CAMERA, spec_, plan)
+        self.assertFalse(report.meets_spec)
+        self.assertGreater(report.num_gap_cells, 0)
+        self.assertEqual(report.min_multiplicity, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
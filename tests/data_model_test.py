@@ -0,0 +1,61 @@
+import unittest
+from dataclasses import replace
+
+import numpy as np
+
+from src.data_model import Waypoint, WaypointArray
+
+
+class WaypointArrayTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.waypoints = [
+            Waypoint(0.0, 1.0, 30.0, 2.5, 0.0, 0.0, 1.0, 0.0),
+            Waypoint(5.0, 1.0, 30.0, 2.5, 90.0, 5.0, 18.3, 0.0),
+            Waypoint(10.0, 1.0, 30.0, 2.5, 0.0),
+        ]
+
+    def test_round_trip(self) -> None:
+        plan = WaypointArray.from_waypoints(self.waypoints)
+
+        self.assertEqual(len(plan), 3)
+        self.assertEqual(plan.to_list(), self.waypoints)
+        self.assertTrue(np.isnan(plan.look_at_x_m[2]))
+
+    def test_indexing(self) -> None:
+        plan = WaypointArray.from_waypoints(self.waypoints)
+
+        self.assertEqual(plan[1], self.waypoints[1])
+        self.assertEqual(plan[-1], self.waypoints[-1])
+
+        sliced = plan[1:]
+        self.assertIsInstance(sliced, WaypointArray)
+        self.assertEqual(list(sliced), self.waypoints[1:])
+
+        masked = plan[plan.yaw_deg == 0.0]
+        np.testing.assert_allclose(masked.x_m, [0.0, 10.0])
+
+    def test_concatenate(self) -> None:
+        plan = WaypointArray.from_waypoints(self.waypoints)
+
+        joined = WaypointArray.concatenate([plan, plan[:1]])
+        self.assertEqual(len(joined), 4)
+        self.assertEqual(joined[3], self.waypoints[0])
+        np.testing.assert_allclose(joined.positions()[:, 0], [0.0, 5.0, 10.0, 0.0])
+
+        # The altitude reference is kept by slices and must agree between joined plans.
+        absolute = replace(plan, altitude_reference="absolute")
+        self.assertEqual(absolute[1:].altitude_reference, "absolute")
+        self.assertEqual(WaypointArray.concatenate([absolute, absolute]).altitude_reference, "absolute")
+        with self.assertRaises(ValueError):
+            WaypointArray.concatenate([plan, absolute])
+        with self.assertRaises(ValueError):
+            replace(plan, altitude_reference="ground")
+
+    def test_rejects_mismatched_columns(self) -> None:
+        with self.assertRaises(ValueError):
+            WaypointArray(*([np.zeros(3)] * 7), np.zeros(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
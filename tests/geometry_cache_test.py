@@ -0,0 +1,52 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.camera_utils as camera_utils
+import src.geometry_cache as geometry_cache
+from src.data_model import FrozenCamera
+from src.plan_computation import compute_speed_during_photo_capture
+
+
+class GeometryCacheTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        geometry_cache.clear_caches()
+
+    def test_frozen_variants(self) -> None:
+        frozen_camera = TEST_CAMERA.frozen()
+        self.assertIsInstance(frozen_camera, FrozenCamera)
+        self.assertEqual(hash(frozen_camera), hash(deepcopy(TEST_CAMERA).frozen()))
+        self.assertEqual(frozen_camera.thaw(), TEST_CAMERA)
+        self.assertEqual(TEST_DATASET_SPEC.frozen().thaw(), TEST_DATASET_SPEC)
+
+    def test_cached_values_and_stats(self) -> None:
+        expected = camera_utils.compute_image_footprint_on_surface(TEST_CAMERA, 150)
+        for _ in range(3):
+            computed = geometry_cache.cached_image_footprint_on_surface(TEST_CAMERA, 150)
+            np.testing.assert_array_equal(computed, expected)
+        self.assertFalse(computed.flags.writeable)
+
+        stats = geometry_cache.cache_stats()["image_footprint"]
+        self.assertEqual(stats.misses, 1)
+        self.assertEqual(stats.hits, 2)
+
+        # A mutated camera is a different key
+        camera_ = deepcopy(TEST_CAMERA)
+        camera_.fx *= 2
+        computed = geometry_cache.cached_image_footprint_on_surface(camera_, 150)
+        np.testing.assert_array_equal(computed, camera_utils.compute_image_footprint_on_surface(camera_, 150))
+        self.assertEqual(geometry_cache.cache_stats()["image_footprint"].misses, 2)
+
+    def test_speed_uses_gsd_cache(self) -> None:
+        for _ in range(5):
+            compute_speed_during_photo_capture(TEST_CAMERA, TEST_DATASET_SPEC)
+        stats = geometry_cache.cache_stats()["ground_sampling_distance"]
+        self.assertEqual((stats.hits, stats.misses), (4, 1))
+        self.assertAlmostEqual(stats.hit_rate, 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import logging
+import unittest
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+from src import camera_utils, instrumentation
+from src.geometry_cache import clear_caches
+from src.plan_computation import generate_photo_plan_on_grid
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_disabled_records_nothing(self) -> None:
+        sink = instrumentation.HistogramSink()
+        with instrumentation.instrumented(sink):
+            pass
+        self.assertFalse(instrumentation.enabled())
+        generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        self.assertEqual(sink.summary(), {})
+        self.assertEqual(dict(sink.counters), {})
+
+    def test_plan_generation_breakdown(self) -> None:
+        clear_caches()
+        sink = instrumentation.HistogramSink()
+        with instrumentation.instrumented(sink):
+            plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+            generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+
+        summary = sink.summary()
+        for name in ("plan.footprint", "plan.look_at", "plan.speed"):
+            # Computed once, the second plan reuses the cached grid layout.
+            self.assertEqual(summary[name].calls, 1)
+        self.assertEqual(summary["plan.waypoints"].calls, 2)
+        self.assertEqual(sink.counters["plan.waypoints_generated"], 2 * len(plan))
+        self.assertEqual(sink.counters["cache.grid_layout.misses"], 1)
+        self.assertEqual(sink.counters["cache.grid_layout.hits"], 1)
+        self.assertIn("plan.generate_photo_plan_on_grid", sink.format_table())
+
+    def test_camera_utils_and_sinks(self) -> None:
+        points = np.array([[1.0, 2.0, 50.0], [-3.0, 4.0, 80.0]])
+        histogram = instrumentation.HistogramSink()
+        prometheus = instrumentation.PrometheusSink(buckets_s=(1e-3, 1.0))
+        with self.assertLogs("src.instrumentation", level=logging.DEBUG) as logs:
+            with instrumentation.instrumented(histogram, prometheus, instrumentation.LoggingSink()):
+                camera_utils.project_world_points_to_image(TEST_CAMERA, points)
+                camera_utils.project_world_points_to_image(TEST_CAMERA, points)
+
+        self.assertEqual(histogram.summary()["camera_utils.project_world_points_to_image"].calls, 2)
+        self.assertEqual(histogram.counters["camera_utils.points_projected"], 4)
+        self.assertTrue(any("camera_utils.project_world_points_to_image" in line for line in logs.output))
+
+        text = prometheus.render()
+        self.assertIn("# TYPE drone_planning_stage_duration_seconds histogram", text)
+        self.assertIn(
+            'drone_planning_stage_duration_seconds_bucket{stage="camera_utils.project_world_points_to_image",le="+Inf"} 2',
+            text,
+        )
+        self.assertIn("drone_planning_camera_utils_points_projected_total 4", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import csv
+import json
+import math
+import os
+import tempfile
+import unittest
+from copy import deepcopy
+from dataclasses import replace
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.mission_export as mission_export
+import src.terrain as terrain
+from src.data_model import Waypoint, WaypointArray
+from src.plan_computation import generate_photo_plan_on_grid, iter_photo_plan_on_grid
+
+
+class MissionExportTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.spec = deepcopy(TEST_DATASET_SPEC)
+        self.plan = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        self.origin = mission_export.GeodeticOrigin(47.3977, 8.5456, 488.0)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp.name, name)
+
+    def test_local_to_geodetic(self) -> None:
+        lat, lon, alt = mission_export.local_to_geodetic(
+            self.origin, np.array([0.0, 0.0, 1000.0]), np.array([0.0, 1000.0, 0.0]), np.array([0.0, 0.0, 0.0])
+        )
+        self.assertAlmostEqual(lat[0], self.origin.latitude_deg, places=9)
+        self.assertAlmostEqual(lon[0], self.origin.longitude_deg, places=9)
+        self.assertAlmostEqual(alt[0], self.origin.altitude_m, places=4)
+
+        # 1 km north / east: meridian and prime vertical radii of curvature at the origin.
+        sin_lat = np.sin(np.radians(self.origin.latitude_deg))
+        w = 1.0 - mission_export.WGS84_E2 * sin_lat ** 2
+        meridian = mission_export.WGS84_A * (1.0 - mission_export.WGS84_E2) / w ** 1.5
+        prime_vertical = mission_export.WGS84_A / np.sqrt(w)
+        north_m = np.radians(lat[1] - lat[0]) * (meridian + self.origin.altitude_m)
+        east_m = np.radians(lon[2] - lon[0]) * (prime_vertical + self.origin.altitude_m) * np.cos(np.radians(lat[2]))
+        self.assertAlmostEqual(north_m, 1000.0, delta=0.05)
+        self.assertAlmostEqual(east_m, 1000.0, delta=0.05)
+        # Moving along the tangent plane rises above the curved ellipsoid.
+        self.assertAlmostEqual(alt[1] - alt[0], 1000.0 ** 2 / (2 * 6_371_000.0), delta=0.01)
+
+    def test_qgc_wpl(self) -> None:
+        num_items = mission_export.write_qgc_wpl(self.path("plan.waypoints"), self.plan, self.origin)
+
+        with open(self.path("plan.waypoints")) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "QGC WPL 110")
+        items = [line.split("\t") for line in lines[1:]]
+        self.assertEqual(len(items), num_items)
+        self.assertEqual([int(item[0]) for item in items], list(range(num_items)))
+
+        commands = np.array([int(item[3]) for item in items[1:]])
+        self.assertEqual(np.count_nonzero(commands == 16), len(self.plan))
+        self.assertEqual(np.count_nonzero(commands == 203), len(self.plan))
+        self.assertEqual(np.count_nonzero(commands == 178), 1)  # constant capture speed
+
+        waypoints = [item for item in items[1:] if item[3] == "16"]
+        self.assertAlmostEqual(float(waypoints[0][10]), self.plan.z_m[0], places=3)
+        self.assertAlmostEqual(float(waypoints[0][7]), 90.0, places=2)  # yaw 0 (east) -> heading 90
+
+    def test_csv_streamed_matches_whole_plan(self) -> None:
+        count = mission_export.write_csv(self.path("whole.csv"), self.plan, self.origin, chunk_size=7)
+        chunks = iter_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        mission_export.write_csv(self.path("chunks.csv"), chunks, self.origin)
+
+        self.assertEqual(count, len(self.plan))
+        with open(self.path("whole.csv")) as f, open(self.path("chunks.csv")) as g:
+            self.assertEqual(f.read(), g.read())
+        with open(self.path("whole.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), len(self.plan))
+        self.assertAlmostEqual(float(rows[3]["x_m"]), self.plan.x_m[3], places=3)
+
+    def test_kml_and_geojson(self) -> None:
+        mission_export.write_kml(self.path("plan.kml"), self.plan, self.origin)
+        with open(self.path("plan.kml")) as f:
+            kml = f.read()
+        coordinates = kml.split("<coordinates>\n")[1].split("</coordinates>")[0].split()
+        self.assertEqual(len(coordinates), len(self.plan))
+
+        mission_export.write_geojson(self.path("plan.geojson"), self.plan, self.origin, chunk_size=5)
+        with open(self.path("plan.geojson")) as f:
+            features = json.load(f)["features"]
+        self.assertEqual(len(features), len(self.plan))
+        self.assertEqual([feature["properties"]["index"] for feature in features], list(range(len(self.plan))))
+        lon, lat, alt = features[0]["geometry"]["coordinates"]
+        kml_lon, kml_lat, kml_alt = map(float, coordinates[0].split(","))
+        self.assertAlmostEqual(kml_lon, lon, places=6)
+        self.assertAlmostEqual(kml_lat, lat, places=6)
+        # Both carry the absolute height: origin altitude + height above it
+        self.assertAlmostEqual(kml_alt, alt, places=3)
+        self.assertAlmostEqual(kml_alt, self.origin.altitude_m + self.plan.z_m[0], places=3)
+        self.assertIn("<altitudeMode>absolute</altitudeMode>", kml)
+
+    def test_far_waypoints_and_missing_values(self) -> None:
+        # Kilometres from the origin the ellipsoid drops metres below the tangent plane; the exported
+        # height must not follow it. The first waypoint has no look-at point and no capture speed.
+        plan = WaypointArray.from_waypoints([
+            Waypoint(5000.0, 3000.0, 50.0, math.nan),
+            Waypoint(-4000.0, -6000.0, 120.0, 8.0, 45.0, -3950.0, -5950.0, 0.0),
+        ])
+        lat, lon, _ = mission_export.local_to_geodetic(self.origin, plan.x_m, plan.y_m, np.zeros(2))
+
+        mission_export.write_csv(self.path("plan.csv"), plan, self.origin)
+        with open(self.path("plan.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        np.testing.assert_allclose([float(row["altitude_m"]) for row in rows], self.origin.altitude_m + plan.z_m)
+        np.testing.assert_allclose([float(row["latitude_deg"]) for row in rows], lat, atol=1e-8)
+        self.assertEqual([rows[0][name] for name in ("look_at_x_m", "look_at_y_m", "look_at_z_m")], ["", "", ""])
+        self.assertEqual(float(rows[1]["look_at_y_m"]), -5950.0)
+
+        mission_export.write_csv(self.path("plan.csv"), replace(plan, altitude_reference="absolute"), self.origin)
+        with open(self.path("plan.csv"), newline="") as f:
+            np.testing.assert_allclose([float(row["altitude_m"]) for row in csv.DictReader(f)], plan.z_m)
+
+        mission_export.write_kml(self.path("plan.kml"), plan, self.origin, name="Fields <north> & south")
+        with open(self.path("plan.kml")) as f:
+            kml = f.read()
+        self.assertIn("<name>Fields &lt;north&gt; &amp; south</name>", kml)
+        coordinates = kml.split("<coordinates>\n")[1].split("</coordinates>")[0].split()
+        np.testing.assert_allclose([float(c.split(",")[2]) for c in coordinates], self.origin.altitude_m + plan.z_m)
+
+        mission_export.write_geojson(self.path("plan.geojson"), plan, self.origin)
+        with open(self.path("plan.geojson")) as f:
+            features = json.load(f, parse_constant=self.fail)["features"]
+        self.assertIsNone(features[0]["properties"]["speed_m_s"])
+        self.assertEqual(features[1]["properties"]["speed_m_s"], 8.0)
+        self.assertAlmostEqual(features[1]["properties"]["heading_deg"], 45.0)
+
+    def test_terrain_plan_exports_absolute_altitudes(self) -> None:
+        # DEM in the vertical datum of the origin: ground at the origin altitude, rising 0.1 m per m east
+        coords = -200.0 + 5.0 * np.arange(81)
+        gx, _ = np.meshgrid(coords, coords)
+        dem = terrain.DemGrid(self.origin.altitude_m + 0.1 * gx, -200.0, -200.0, 5.0)
+        plan = terrain.apply_terrain_following(self.spec, self.plan, dem)
+        expected = self.origin.altitude_m + 0.1 * plan.x_m + self.spec.height
+        self.assertEqual(plan.altitude_reference, "absolute")
+
+        mission_export.write_qgc_wpl(self.path("plan.waypoints"), plan, self.origin, altitude_reference="absolute")
+        with open(self.path("plan.waypoints")) as f:
+            items = [line.split("\t") for line in f.read().splitlines()[1:]]
+        waypoints = [item for item in items if item[3] == "16"][1:]
+        self.assertTrue(all(item[2] == "0" for item in waypoints))  # MAV_FRAME_GLOBAL
+        np.testing.assert_allclose([float(item[10]) for item in waypoints], expected, atol=0.01)
+
+        mission_export.write_kml(self.path("plan.kml"), plan, self.origin, altitude_reference="absolute")
+        with open(self.path("plan.kml")) as f:
+            coordinates = f.read().split("<coordinates>\n")[1].split("</coordinates>")[0].split()
+        np.testing.assert_allclose([float(c.split(",")[2]) for c in coordinates], expected, atol=0.01)
+
+        # The plan records its altitude reference.
+        mission_export.write_geojson(self.path("plan.geojson"), plan, self.origin)
+        with open(self.path("plan.geojson")) as f:
+            features = json.load(f)["features"]
+        np.testing.assert_allclose([feat["geometry"]["coordinates"][2] for feat in features], expected, atol=0.01)
+
+        mission_export.write_csv(self.path("plan.csv"), plan, self.origin, altitude_reference="absolute")
+        with open(self.path("plan.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        np.testing.assert_allclose([float(row["altitude_m"]) for row in rows], expected, atol=0.01)
+
+        with self.assertRaises(ValueError):
+            mission_export.write_csv(self.path("plan.csv"), plan, self.origin, altitude_reference="ground")
+        # Terrain elevations are not heights above the origin.
+        with self.assertRaises(ValueError):
+            mission_export.write_kml(self.path("plan.kml"), plan, self.origin, altitude_reference="relative")
+
+
+if __name__ == "__main__":
+    unittest.main()
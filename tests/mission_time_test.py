@@ -0,0 +1,69 @@
+import math
+import unittest
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.mission_time as mission_time
+from src.data_model import Waypoint, WaypointArray
+from src.plan_computation import generate_photo_plan_on_grid
+
+
+class MissionTimeTest(unittest.TestCase):
+
+    def test_segment_times(self) -> None:
+        distance = np.array([100.0, 10.0, 0.0, 20.0])
+        entry = np.array([0.0, 0.0, 0.0, 4.0])
+        exit_ = np.array([0.0, 0.0, 0.0, 4.0])
+        computed = mission_time.segment_times(distance, entry, exit_, 16.0, 3.5)
+
+        # Case 1: trapezoid reaching max speed; Case 2: triangle; Case 3: no motion
+        expected = [2 * 16.0 / 3.5 + (100.0 - 256.0 / 3.5) / 16.0, 2 * math.sqrt(35.0) / 3.5, 0.0]
+        np.testing.assert_allclose(computed[:3], expected)
+
+        # Case 4: triangle starting and ending at speed
+        peak = math.sqrt(3.5 * 20.0 + 16.0)
+        self.assertAlmostEqual(computed[3], 2 * (peak - 4.0) / 3.5)
+
+    def test_turns_add_stops_and_yaw_time(self) -> None:
+        straight = WaypointArray.from_waypoints(
+            [Waypoint(0.0, 0.0, 30.0, 5.0), Waypoint(50.0, 0.0, 30.0, 5.0), Waypoint(100.0, 0.0, 30.0, 5.0)]
+        )
+        corner = WaypointArray.from_waypoints(
+            [Waypoint(0.0, 0.0, 30.0, 5.0), Waypoint(50.0, 0.0, 30.0, 5.0), Waypoint(50.0, 50.0, 30.0, 5.0)]
+        )
+        kinematics = mission_time.KinematicModel(turn_rate_deg_s=90.0)
+
+        straight_estimate = mission_time.estimate_mission(straight, kinematics)
+        corner_estimate = mission_time.estimate_mission(corner, kinematics)
+
+        np.testing.assert_allclose(straight_estimate.dwell_time_s, 0.0)
+        np.testing.assert_allclose(corner_estimate.dwell_time_s, [0.0, 1.0, 0.0])
+        self.assertGreater(corner_estimate.flight_time_s, straight_estimate.flight_time_s + 1.0)
+
+        # Stop-and-shoot stops everywhere and hovers for each capture
+        kinematics = mission_time.KinematicModel(stop_and_shoot=True, capture_time_s=0.5)
+        stop_estimate = mission_time.estimate_mission(straight, kinematics)
+        np.testing.assert_allclose(stop_estimate.dwell_time_s, 0.5)
+        self.assertGreater(stop_estimate.flight_time_s, straight_estimate.flight_time_s)
+
+    def test_sorties(self) -> None:
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        battery = mission_time.BatteryModel(capacity_wh=5.0)
+        estimate = mission_time.estimate_mission(plan, battery=battery, launch_xy=(0.0, -200.0))
+
+        self.assertGreater(len(estimate.sorties), 1)
+        self.assertEqual(estimate.sorties[0].start, 0)
+        self.assertEqual(estimate.sorties[-1].stop, len(plan))
+        for previous, sortie in zip(estimate.sorties, estimate.sorties[1:]):
+            self.assertEqual(previous.stop, sortie.start)
+        for sortie in estimate.sorties:
+            self.assertLessEqual(sortie.energy_wh, battery.usable_wh + 1e-9)
+        self.assertGreater(estimate.total_time_s, estimate.flight_time_s)
+
+        with self.assertRaises(ValueError):
+            mission_time.estimate_mission(plan, battery=battery, launch_xy=(0.0, -5000.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.motion_blur as motion_blur
+from src.data_model import WaypointArray
+from src.plan_computation import (
+    _camera_rotation,
+    _reproject_pixels_to_ground,
+    compute_speed_during_photo_capture,
+    generate_photo_plan_on_grid,
+)
+from src.terrain import DemGrid, apply_terrain_following
+
+
+class MotionBlurTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.spec = deepcopy(TEST_DATASET_SPEC)
+
+    def test_nadir_flat_ground_matches_constant_speed(self) -> None:
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        expected = compute_speed_during_photo_capture(TEST_CAMERA, self.spec)
+        for direction in motion_blur.DIRECTIONS:
+            profile = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, plan, direction=direction)
+            np.testing.assert_allclose(profile.speed_m_s, expected, rtol=1e-6)
+            np.testing.assert_allclose(profile.blur_px, 1.0, rtol=1e-6)
+
+        # Twice the budget, twice the speed
+        profile = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, plan, allowed_movement_px=2)
+        np.testing.assert_allclose(profile.speed_m_s, 2.0 * expected, rtol=1e-6)
+
+    def test_tilted_camera_is_bound_by_the_near_edge(self) -> None:
+        self.spec.camera_angle = 30.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        profile = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, plan)
+
+        # The constant nadir speed blurs the near edge by more than the budget
+        self.assertTrue((profile.speed_m_s < compute_speed_during_photo_capture(TEST_CAMERA, self.spec)).all())
+        self.assertTrue((profile.blur_px > 1.0).all())
+        np.testing.assert_allclose(profile.blur_px * profile.speed_m_s, plan.speed_m_s, rtol=1e-9)
+
+        # The binding pixel is on the near side of the image, beyond the closest ground point
+        uv = np.stack(np.meshgrid(np.linspace(0, 1000, 9), np.linspace(0, 1000, 9)), axis=-1).reshape(-1, 2)
+        ground = _reproject_pixels_to_ground(TEST_CAMERA, uv, self.spec.height, _camera_rotation(30.0))
+        distance = np.linalg.norm(ground - (0.0, 0.0, self.spec.height), axis=1)
+        self.assertGreaterEqual(profile.binding_v_px.min(), uv[distance.argmin(), 1])
+
+        # Across-track transitions and along-track rows see different blur
+        self.assertEqual(np.unique(np.round(profile.speed_m_s, 9)).shape[0], 2)
+        any_direction = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, plan, direction="any")
+        self.assertTrue((any_direction.speed_m_s <= profile.speed_m_s + 1e-9).all())
+
+    def test_speed_scales_with_height_above_terrain(self) -> None:
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        x = np.arange(-150.0, 151.0, 10.0)
+        dem = DemGrid(np.add.outer(np.zeros_like(x), 0.1 * x), -150.0, -150.0, 10.0)
+        followed = apply_terrain_following(self.spec, plan, dem)
+
+        profile = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, followed, direction="any")
+        np.testing.assert_allclose(profile.speed_m_s, followed.speed_m_s, rtol=1e-6)
+
+        # Climbing along the rows also moves the image radially; the level row transitions do not
+        travel = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, followed)
+        climbing = np.diff(followed.z_m, append=followed.z_m[-1]) != 0.0
+        climbing[-1] = True
+        self.assertTrue((travel.speed_m_s[climbing] < profile.speed_m_s[climbing]).all())
+        np.testing.assert_allclose(travel.speed_m_s[~climbing], profile.speed_m_s[~climbing], rtol=1e-9)
+
+    def test_binding_rays_meet_the_terrain(self) -> None:
+        self.spec.camera_angle = 30.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        y = np.arange(-300.0, 301.0, 10.0)
+        exposure_time_s = self.spec.exposure_time_ms / 1000.0
+        for slope in (-0.4, 0.4):
+            dem = DemGrid(np.add.outer(slope * y, np.zeros_like(y)), -300.0, -300.0, 10.0)
+            followed = apply_terrain_following(self.spec, plan, dem)
+            profile = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, followed, dem=dem)
+
+            # Brute force: project the points where the lattice rays meet the plane z = slope * y from
+            # the camera before and after a small step along the direction of travel.
+            directions, _ = motion_blur._travel_directions(followed)
+            R = _camera_rotation(30.0)
+            uv = np.stack(np.meshgrid(np.linspace(0, 1000, 9), np.linspace(0, 1000, 9)), axis=-1).reshape(-1, 2)
+            rays = np.stack([(uv[:, 0] - 500.0) / 700.0, (uv[:, 1] - 500.0) / 700.0, np.ones(len(uv))], axis=1) @ R.T
+            for w in range(0, len(followed), 7):
+                camera = np.array([followed.x_m[w], followed.y_m[w], followed.z_m[w]])
+                s = (slope * camera[1] - camera[2]) / (rays[:, 2] - slope * rays[:, 1])
+                ground = camera + s[s < 0.0, None] * rays[s < 0.0]
+
+                def project(position: np.ndarray) -> np.ndarray:
+                    p = (ground - position) @ R
+                    return 700.0 * p[:, :2] / p[:, 2:]
+
+                step = 1e-4
+                motion = np.linalg.norm(project(camera + step * directions[w]) - project(camera), axis=1) / step
+                self.assertAlmostEqual(profile.speed_m_s[w], 1.0 / (exposure_time_s * motion.max()), delta=1e-3)
+
+            # The flat ground through the look-at point misjudges the near edge on the slope.
+            flat = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, followed)
+            self.assertGreater(np.abs(flat.speed_m_s / profile.speed_m_s - 1.0).max(), 0.05)
+
+    def test_apply_speed_profile(self) -> None:
+        self.spec.camera_angle = 20.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        result = motion_blur.apply_speed_profile(TEST_CAMERA, self.spec, plan, max_speed_m_s=25.0)
+        profile = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, result)
+        self.assertTrue((profile.blur_px <= 1.0 + 1e-9).all())
+        self.assertLessEqual(result.speed_m_s.max(), 25.0)
+        np.testing.assert_array_equal(result.x_m, plan.x_m)
+        self.assertFalse(np.shares_memory(result.speed_m_s, plan.speed_m_s))
+
+        # Degenerate plans: no waypoints, or a single waypoint with no direction of travel
+        empty = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, WaypointArray.empty(0))
+        self.assertEqual(empty.speed_m_s.shape, (0,))
+        single = motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, plan[:1])
+        self.assertAlmostEqual(
+            single.speed_m_s[0],
+            motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, plan[:1], direction="any").speed_m_s[0],
+        )
+        with self.assertRaises(ValueError):
+            motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, plan, direction="sideways")
+
+        # A camera pointing at the sky sees no ground: its speed must be capped.
+        plan.pitch_deg[:] = 180.0
+        self.assertTrue(np.isinf(motion_blur.compute_speed_profile(TEST_CAMERA, self.spec, plan).speed_m_s).all())
+        with self.assertRaises(ValueError):
+            motion_blur.apply_speed_profile(TEST_CAMERA, self.spec, plan)
+        capped = motion_blur.apply_speed_profile(TEST_CAMERA, self.spec, plan, max_speed_m_s=15.0)
+        np.testing.assert_array_equal(capped.speed_m_s, 15.0)
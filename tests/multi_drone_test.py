@@ -0,0 +1,72 @@
+import itertools
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.multi_drone as multi_drone
+from src.data_model import WaypointArray
+from src.mission_time import estimate_mission
+from src.plan_computation import _compute_grid_layout, generate_photo_plan_on_grid
+
+
+class MultiDroneTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.spec = deepcopy(TEST_DATASET_SPEC)
+        self.spec.scan_dimension_y = 400.0
+        self.plan = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        self.layout = _compute_grid_layout(TEST_CAMERA, self.spec)
+        self.launch_xy = (-100.0, -50.0)
+
+    def test_detect_row_starts(self) -> None:
+        np.testing.assert_array_equal(
+            multi_drone.detect_row_starts(self.plan), np.arange(self.layout.n_y) * self.layout.n_x
+        )
+
+    def test_partition_is_contiguous_along_rows(self) -> None:
+        result = multi_drone.generate_multi_drone_plan(TEST_CAMERA, self.spec, 3, self.launch_xy)
+        self.assertEqual(len(result.missions), 3)
+        self.assertEqual([m.start for m in result.missions[1:]], [m.stop for m in result.missions[:-1]])
+        self.assertEqual((result.missions[0].start, result.missions[-1].stop), (0, len(self.plan)))
+
+        for mission in result.missions:
+            # Cuts fall between rows, so the grid spacing (and sidelap) across bands is unchanged.
+            self.assertEqual(mission.start % self.layout.n_x, 0)
+            forward = mission.plan[::-1] if mission.reversed else mission.plan
+            np.testing.assert_array_equal(forward.x_m, self.plan.x_m[mission.start:mission.stop])
+            # The mission begins at the end of its band nearer the launch point.
+            first, last = mission.plan[0], mission.plan[len(mission.plan) - 1]
+            self.assertLessEqual(
+                np.hypot(first.x_m - self.launch_xy[0], first.y_m - self.launch_xy[1]),
+                np.hypot(last.x_m - self.launch_xy[0], last.y_m - self.launch_xy[1]),
+            )
+
+    def test_partition_minimizes_makespan(self) -> None:
+        row_starts = np.arange(self.layout.n_y) * self.layout.n_x
+        bounds = [*row_starts, len(self.plan)]
+
+        def band_time(a: int, b: int) -> float:
+            band = self.plan[bounds[a]:bounds[b]]
+            ends = np.stack([band.x_m[[0, -1]], band.y_m[[0, -1]]], axis=1) - self.launch_xy
+            return estimate_mission(band).flight_time_s + np.hypot(ends[:, 0], ends[:, 1]).sum() / 16.0
+
+        for num_drones in (2, 3):
+            best = min(
+                max(band_time(a, b) for a, b in zip((0, *cuts), (*cuts, self.layout.n_y)))
+                for cuts in itertools.combinations(range(1, self.layout.n_y), num_drones - 1)
+            )
+            result = multi_drone.partition_plan(self.plan, num_drones, self.launch_xy)
+            self.assertAlmostEqual(result.makespan_s, best, places=6)
+
+    def test_too_many_drones(self) -> None:
+        with self.assertRaises(ValueError):
+            multi_drone.partition_plan(self.plan, self.layout.n_y + 1)
+        single = multi_drone.partition_plan(self.plan, 1)
+        self.assertEqual(len(single.missions), 1)
+        self.assertIsInstance(single.missions[0].plan, WaypointArray)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.oblique_plan as oblique_plan
+from src.plan_computation import _compute_grid_layout, generate_photo_plan_on_grid
+
+
+class ObliquePlanTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.spec = deepcopy(TEST_DATASET_SPEC)
+
+    def test_oblique_pass_looks_at_scan_area(self) -> None:
+        capture_pass = oblique_plan.CapturePass(45.0, 90.0)
+        plan = oblique_plan.generate_pass_plan(TEST_CAMERA, self.spec, capture_pass)
+
+        # Same look-at grid as the nadir plan, viewed from the east.
+        nadir = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        self.assertLessEqual(np.abs(plan.look_at_x_m).max(), self.spec.scan_dimension_x / 2.0)
+        self.assertLessEqual(np.abs(plan.look_at_y_m).max(), self.spec.scan_dimension_y / 2.0)
+        np.testing.assert_allclose(plan.x_m - plan.look_at_x_m, self.spec.height, atol=1e-9)
+        np.testing.assert_array_equal(plan.gimbal_yaw_deg, 90.0)
+        np.testing.assert_array_equal(plan.pitch_deg, 45.0)
+        self.assertEqual(len(nadir), len(generate_photo_plan_on_grid(TEST_CAMERA, self.spec)))
+
+        fraction = oblique_plan.site_fraction(TEST_CAMERA, self.spec, plan)
+        self.assertTrue(np.all((fraction > 0.0) & (fraction <= 1.0)))
+        self.assertEqual(oblique_plan.site_fraction(TEST_CAMERA, self.spec, nadir).max(), 1.0)
+
+    def test_maltese_cross(self) -> None:
+        result = oblique_plan.generate_multi_pass_plan(TEST_CAMERA, self.spec, min_on_site_fraction=0.5)
+        passes = oblique_plan.maltese_cross_passes()
+        self.assertEqual(result.passes, passes)
+        self.assertEqual(sorted(result.pass_order), list(range(5)))
+        self.assertEqual(len(result.pass_index), len(result.plan))
+
+        # Each pass is contiguous in the merged plan and keeps its camera pose.
+        changes = np.count_nonzero(np.diff(result.pass_index))
+        self.assertEqual(changes, 4)
+        for p, capture_pass in enumerate(passes):
+            mask = result.pass_index == p
+            np.testing.assert_array_equal(result.plan.pitch_deg[mask], capture_pass.camera_angle)
+            np.testing.assert_array_equal(result.plan.gimbal_yaw_deg[mask], capture_pass.camera_yaw)
+
+        # The nadir pass is kept whole; obliques lose their captures that barely see the site.
+        nadir = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        self.assertEqual(np.count_nonzero(result.pass_index == 0), len(nadir))
+        full = oblique_plan.generate_multi_pass_plan(TEST_CAMERA, self.spec, min_on_site_fraction=0.0)
+        self.assertLess(len(result.plan), len(full.plan))
+        fraction = oblique_plan.site_fraction(TEST_CAMERA, self.spec, result.plan)
+        self.assertGreaterEqual(fraction[result.pass_index != 0].min(), 0.5)
+
+    def test_dedupes_captures_of_similar_views(self) -> None:
+        self.spec.scan_dimension_x, self.spec.scan_dimension_y = 600.0, 450.0
+        passes = [
+            oblique_plan.CapturePass(0.0),
+            oblique_plan.CapturePass(45.0, 0.0),
+            oblique_plan.CapturePass(40.0, 0.0),
+            oblique_plan.CapturePass(45.0, 90.0),
+        ]
+        full = oblique_plan.generate_multi_pass_plan(TEST_CAMERA, self.spec, passes)
+        deduped = oblique_plan.generate_multi_pass_plan(TEST_CAMERA, self.spec, passes, max_covered_fraction=0.99)
+        counts = [np.count_nonzero(deduped.pass_index == p) for p in range(len(passes))]
+        full_counts = [np.count_nonzero(full.pass_index == p) for p in range(len(passes))]
+
+        # Only the 40 degree pass looks like an earlier one (the 45 degree pass with the same yaw); the
+        # nadir and the other direction are 45 and 60 degrees away and keep all their captures.
+        self.assertEqual([counts[p] for p in (0, 1, 3)], [full_counts[p] for p in (0, 1, 3)])
+        self.assertGreater(counts[2], 0)
+        self.assertLess(counts[2], full_counts[2] / 2)
+
+        # What is left of the 40 degree pass images ground the 45 degree pass does not.
+        layout = _compute_grid_layout(TEST_CAMERA, self.spec)
+        grid = oblique_plan.RasterGrid.covering(
+            -300.0, -225.0, 300.0, 225.0, min(layout.spacing_x, layout.spacing_y) / oblique_plan._CELLS_PER_SPACING
+        )
+        earlier = oblique_plan.plan_footprint_quads(TEST_CAMERA, deduped.plan[deduped.pass_index == 1])
+        covered = oblique_plan.rasterize_footprints(earlier, grid) > 0
+        kept = oblique_plan.plan_footprint_quads(TEST_CAMERA, deduped.plan[deduped.pass_index == 2])
+        self.assertTrue((oblique_plan.covered_fraction(kept, grid, covered) < 0.99).all())
+
+        # The Maltese cross has no similar views: nothing is dropped.
+        cross = oblique_plan.generate_multi_pass_plan(TEST_CAMERA, self.spec, max_covered_fraction=0.5)
+        self.assertEqual(len(cross.plan), len(oblique_plan.generate_multi_pass_plan(TEST_CAMERA, self.spec).plan))
+
+    def test_pass_order_minimizes_transit(self) -> None:
+        result = oblique_plan.generate_multi_pass_plan(TEST_CAMERA, self.spec, launch_xy=(-500.0, 0.0))
+
+        # Transit of the merged plan: launch to first waypoint plus the jumps between passes.
+        plan = result.plan
+        boundaries = np.flatnonzero(np.diff(result.pass_index)) + 1
+        jumps = np.hypot(plan.x_m[boundaries] - plan.x_m[boundaries - 1], plan.y_m[boundaries] - plan.y_m[boundaries - 1])
+        expected = np.hypot(plan.x_m[0] + 500.0, plan.y_m[0]) + jumps.sum()
+        self.assertAlmostEqual(result.transit_m, expected, places=6)
+
+        # Flying the passes in their listed order, forwards, is never shorter.
+        starts = []
+        ends = []
+        for p in range(len(result.passes)):
+            mask = np.flatnonzero(result.pass_index == p)
+            first, last = (mask[-1], mask[0]) if result.reversed[result.pass_order.index(p)] else (mask[0], mask[-1])
+            starts.append((plan.x_m[first], plan.y_m[first]))
+            ends.append((plan.x_m[last], plan.y_m[last]))
+        position, naive = np.array([-500.0, 0.0]), 0.0
+        for start, end in zip(starts, ends):
+            naive += np.hypot(*(np.array(start) - position))
+            position = np.array(end)
+        self.assertLessEqual(result.transit_m, naive + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.parameter_sweep as parameter_sweep
+from src.plan_computation import compute_speed_during_photo_capture, generate_photo_plan_on_grid
+
+
+class ParameterSweepTest(unittest.TestCase):
+
+    variations = {"height": [40.0, 60.0], "overlap": [0.6, 0.7, 0.8]}
+
+    def test_sweep_matches_direct_evaluation(self) -> None:
+        table = parameter_sweep.sweep_dataset_specs(
+            TEST_CAMERA, TEST_DATASET_SPEC, self.variations, max_workers=1
+        )
+
+        self.assertEqual(len(table["height"]), 6)
+        for i in range(6):
+            spec_ = deepcopy(TEST_DATASET_SPEC)
+            spec_.height = table["height"][i]
+            spec_.overlap = table["overlap"][i]
+            plan = generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+
+            self.assertEqual(table["image_count"][i], len(plan))
+            self.assertAlmostEqual(table["speed_m_s"][i], compute_speed_during_photo_capture(TEST_CAMERA, spec_))
+            self.assertAlmostEqual(table["flight_length_m"][i], parameter_sweep.plan_flight_length(plan))
+
+    def test_process_pool_matches_serial(self) -> None:
+        serial = parameter_sweep.sweep_dataset_specs(
+            TEST_CAMERA, TEST_DATASET_SPEC, self.variations, max_workers=1
+        )
+        parallel = parameter_sweep.sweep_dataset_specs(
+            TEST_CAMERA, TEST_DATASET_SPEC, self.variations, max_workers=2
+        )
+        self.assertEqual(serial.keys(), parallel.keys())
+        for name in serial:
+            np.testing.assert_array_equal(serial[name], parallel[name])
+
+    def test_rejects_unknown_fields(self) -> None:
+        with self.assertRaises(ValueError):
+            parameter_sweep.sweep_dataset_specs(TEST_CAMERA, TEST_DATASET_SPEC, {"altitude": [1.0]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+from src.data_model import WaypointArray
+import src.plan_computation as plan_computation
+
+
+def assert_plans_equal(test_case: unittest.TestCase, plan: WaypointArray, expected: WaypointArray) -> None:
+    test_case.assertEqual(len(plan), len(expected))
+    for name in WaypointArray.COLUMNS:
+        np.testing.assert_array_equal(getattr(plan, name), getattr(expected, name), err_msg=name)
+
+
+class PlanComputationTest(unittest.TestCase):
+
+    def test_generate_photo_plan_matches_reference(self) -> None:
+        specs = []
+
+        # Case 1: baseline nadir
+        specs.append(deepcopy(TEST_DATASET_SPEC))
+
+        # Case 2: non-square area with an odd number of rows
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.scan_dimension_x = 310.0
+        spec_.scan_dimension_y = 95.0
+        specs.append(spec_)
+
+        # Case 3: tilted camera
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.camera_angle = 25.0
+        specs.append(spec_)
+
+        # Case 4: tilted the other way
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.camera_angle = -40.0
+        specs.append(spec_)
+
+        for spec in specs:
+            plan = plan_computation.generate_photo_plan_on_grid(TEST_CAMERA, spec)
+            expected = WaypointArray.from_waypoints(
+                plan_computation._generate_photo_plan_on_grid_reference(TEST_CAMERA, spec)
+            )
+            # The reference waypoints carry no gimbal pose; the pitch is the camera angle.
+            expected.pitch_deg[:] = spec.camera_angle
+            assert_plans_equal(self, plan, expected)
+
+    def test_generate_photo_plan_serpentine(self) -> None:
+        plan = plan_computation.generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        layout = plan_computation._compute_grid_layout(TEST_CAMERA, TEST_DATASET_SPEC)
+
+        x = plan.x_m.reshape(layout.n_y, layout.n_x)
+        np.testing.assert_array_equal(x[0], x[1][::-1])
+        self.assertTrue(np.all(np.diff(x[0]) > 0))
+
+    def test_camera_rotation(self) -> None:
+        # Pitch alone is the original single-axis tilt Rx(pitch).
+        c, s = np.cos(np.radians(25.0)), np.sin(np.radians(25.0))
+        np.testing.assert_allclose(
+            plan_computation._camera_rotation(25.0), [[1.0, 0.0, 0.0], [0.0, c, -s], [0.0, s, c]], atol=1e-15
+        )
+        # Quarter turns of yaw and roll: Rz(90) . Rx(90) . Rz(90).
+        np.testing.assert_allclose(
+            plan_computation._camera_rotation(90.0, 90.0, 90.0), [[0.0, 0.0, 1.0], [0.0, -1.0, 0.0], [1.0, 0.0, 0.0]],
+            atol=1e-15,
+        )
+
+        yaw = np.array([0.0, 30.0, -120.0])
+        pitch = np.array([10.0, 45.0, 80.0])
+        roll = np.array([0.0, 5.0, -15.0])
+        R = plan_computation.camera_rotation(yaw, pitch, roll)
+        self.assertEqual(R.shape, (3, 3, 3))
+        for i in range(3):
+            np.testing.assert_allclose(R[i], plan_computation._camera_rotation(pitch[i], yaw[i], roll[i]), atol=1e-15)
+            np.testing.assert_allclose(R[i] @ R[i].T, np.eye(3), atol=1e-12)
+
+    def test_gimbal_yaw_rotates_footprint(self) -> None:
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.camera_angle = 20.0
+        base = plan_computation._tilted_footprint_corners(TEST_CAMERA, spec_.height, 20.0)
+        yawed = plan_computation._tilted_footprint_corners(TEST_CAMERA, spec_.height, 20.0, 90.0)
+        # A quarter turn about the vertical axis maps (x, y) to (-y, x).
+        np.testing.assert_allclose(yawed[:, 0], -base[:, 1], atol=1e-9)
+        np.testing.assert_allclose(yawed[:, 1], base[:, 0], atol=1e-9)
+
+        spec_.camera_yaw = 90.0
+        plan = plan_computation.generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+        np.testing.assert_allclose(plan.look_at_x_m - plan.x_m, -spec_.height * np.tan(np.radians(20.0)))
+        np.testing.assert_allclose(plan.look_at_y_m - plan.y_m, 0.0, atol=1e-9)
+        np.testing.assert_array_equal(plan.gimbal_yaw_deg, 90.0)
+        np.testing.assert_array_equal(plan.pitch_deg, 20.0)
+        # yaw_deg keeps pointing at the look-at point: 90 degrees of gimbal yaw turn it from +Y to -X.
+        np.testing.assert_allclose(plan.yaw_deg, 180.0)
+
+    def test_iter_photo_plan_on_grid(self) -> None:
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.scan_dimension_y = 260.0
+        spec_.camera_angle = 10.0
+        expected = plan_computation.generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+        layout = plan_computation._compute_grid_layout(TEST_CAMERA, spec_)
+
+        # Case 1: one row per chunk
+        chunks = list(plan_computation.iter_photo_plan_on_grid(TEST_CAMERA, spec_))
+        self.assertEqual(len(chunks), layout.n_y)
+        assert_plans_equal(self, WaypointArray.concatenate(chunks), expected)
+
+        # Case 2: fixed-size chunks that straddle rows
+        chunks = list(plan_computation.iter_photo_plan_on_grid(TEST_CAMERA, spec_, chunk_size=7))
+        self.assertTrue(all(len(chunk) == 7 for chunk in chunks[:-1]))
+        assert_plans_equal(self, WaypointArray.concatenate(chunks), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import unittest
+from copy import deepcopy
+from dataclasses import replace
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.plan_io as plan_io
+from src.data_model import WaypointArray
+from src.plan_computation import generate_photo_plan_on_grid, iter_photo_plan_on_grid
+
+
+class PlanIoTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.spec = deepcopy(TEST_DATASET_SPEC)
+        self.spec.camera_angle = 20.0
+        self.plan = generate_photo_plan_on_grid(TEST_CAMERA, self.spec)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "plan.bin")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def assert_loaded(self, loaded: plan_io.PlanFile) -> None:
+        self.assertEqual(loaded.camera, TEST_CAMERA)
+        self.assertEqual(loaded.dataset_spec, self.spec)
+        self.assertEqual(len(loaded.plan), len(self.plan))
+        for name in WaypointArray.COLUMNS:
+            np.testing.assert_array_equal(getattr(loaded.plan, name), getattr(self.plan, name))
+
+    def test_save_and_load(self) -> None:
+        plan_io.save_plan(self.path, self.plan, TEST_CAMERA, self.spec)
+
+        loaded = plan_io.load_plan(self.path)
+        self.assert_loaded(loaded)
+        self.assertIsInstance(loaded.plan.x_m.base, np.memmap)
+        # The columns are views one record apart.
+        self.assertEqual(loaded.plan.x_m.strides, (8 * len(WaypointArray.COLUMNS),))
+        del loaded
+
+        self.assert_loaded(plan_io.load_plan(self.path, mmap=False))
+
+    def test_streaming_writer(self) -> None:
+        with plan_io.PlanWriter(self.path, TEST_CAMERA, self.spec) as writer:
+            for chunk in iter_photo_plan_on_grid(TEST_CAMERA, self.spec, chunk_size=5):
+                writer.write(chunk)
+        self.assertEqual(writer.num_records, len(self.plan))
+        self.assert_loaded(plan_io.load_plan(self.path))
+
+    def test_altitude_reference_round_trip(self) -> None:
+        absolute = replace(self.plan, altitude_reference="absolute")
+        plan_io.save_plan(self.path, absolute, TEST_CAMERA, self.spec)
+        self.assertEqual(plan_io.load_plan(self.path).plan.altitude_reference, "absolute")
+        buffer = plan_io.plan_to_bytes(self.plan, TEST_CAMERA, self.spec)
+        self.assertEqual(plan_io.plan_from_bytes(buffer).plan.altitude_reference, "relative")
+
+        with plan_io.PlanWriter(self.path, TEST_CAMERA, self.spec) as writer:
+            with self.assertRaises(ValueError):
+                writer.write(absolute)
+
+    def test_bytes_round_trip_is_zero_copy(self) -> None:
+        buffer = plan_io.plan_to_bytes(self.plan, TEST_CAMERA, self.spec)
+        loaded = plan_io.plan_from_bytes(buffer)
+        self.assert_loaded(loaded)
+        self.assertTrue(np.shares_memory(loaded.plan.x_m, np.frombuffer(buffer, dtype=np.uint8)))
+
+        with self.assertRaises(ValueError):
+            plan_io.plan_from_bytes(b"NOTAPLAN" + buffer[8:])
+
+    def test_loads_files_without_pose_columns(self) -> None:
+        # Version 1 files, written before the gimbal pose columns existed, only carry the first eight columns.
+        old_columns = WaypointArray.COLUMNS[:8]
+        buffer = bytearray(plan_io.plan_to_bytes(self.plan[:0], TEST_CAMERA, self.spec))
+        header, _, _ = plan_io._decode_header(memoryview(buffer))
+        header["columns"] = list(old_columns)
+        del header["altitude_reference"]
+        header_bytes = json.dumps(header).encode("utf-8")
+        preamble = plan_io._PREAMBLE.pack(plan_io.MAGIC, 1, 0, len(header_bytes), len(self.plan))
+        records = np.empty(len(self.plan), dtype=plan_io.record_dtype(old_columns))
+        for name in old_columns:
+            records[name] = getattr(self.plan, name)
+        prefix = preamble + header_bytes
+        prefix += b"\0" * (-len(prefix) % plan_io.ALIGNMENT)
+
+        loaded = plan_io.plan_from_bytes(prefix + records.tobytes())
+        np.testing.assert_array_equal(loaded.plan.look_at_y_m, self.plan.look_at_y_m)
+        np.testing.assert_array_equal(loaded.plan.pitch_deg, np.zeros(len(self.plan)))
+        self.assertEqual(loaded.plan.altitude_reference, "relative")
+
+        # Unknown versions are rejected.
+        future = bytearray(prefix + records.tobytes())
+        future[8:10] = (plan_io.FORMAT_VERSION + 1).to_bytes(2, "little")
+        with self.assertRaisesRegex(ValueError, "version"):
+            plan_io.plan_from_bytes(future)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.plan_optimization as plan_optimization
+from src.coverage import verify_plan_coverage
+from src.plan_computation import generate_photo_plan_on_grid
+
+
+class PlanOptimizationTest(unittest.TestCase):
+
+    def test_heading_zero_is_the_grid_plan(self) -> None:
+        plan = plan_optimization.generate_photo_plan_with_heading(TEST_CAMERA, TEST_DATASET_SPEC, 0.0)
+        expected = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        np.testing.assert_array_equal(plan.x_m, expected.x_m)
+        np.testing.assert_array_equal(plan.y_m, expected.y_m)
+
+        reversed_plan = plan_optimization.generate_photo_plan_with_heading(
+            TEST_CAMERA, TEST_DATASET_SPEC, 0.0, reverse=True
+        )
+        np.testing.assert_array_equal(reversed_plan.x_m, expected.x_m[::-1])
+
+    def test_rotated_plan_covers_the_site(self) -> None:
+        plan = plan_optimization.generate_photo_plan_with_heading(TEST_CAMERA, TEST_DATASET_SPEC, 90.0)
+
+        # Rows now run along Y; rotating back gives a plan that meets the spec on the swapped area
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.scan_dimension_x, spec_.scan_dimension_y = spec_.scan_dimension_y, spec_.scan_dimension_x
+        local = plan_optimization.rotate_plan(plan, -90.0)
+        self.assertTrue(verify_plan_coverage(TEST_CAMERA, spec_, local).meets_spec)
+        self.assertLessEqual(np.abs(plan.x_m).max(), TEST_DATASET_SPEC.scan_dimension_x / 2.0)
+        self.assertLessEqual(np.abs(plan.y_m).max(), TEST_DATASET_SPEC.scan_dimension_y / 2.0)
+
+    def test_optimizer_flies_along_the_long_axis(self) -> None:
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.scan_dimension_x = 150.0
+        spec_.scan_dimension_y = 1200.0
+
+        result = plan_optimization.optimize_plan_orientation(TEST_CAMERA, spec_)
+
+        self.assertIn(result.heading_deg, (90.0, 270.0))
+        self.assertEqual(len(result.candidates["total_time_s"]), 8)
+        self.assertAlmostEqual(result.estimate.total_time_s, result.candidates["total_time_s"].min())
+        along_x = result.candidates["total_time_s"][result.candidates["heading_deg"] == 0.0]
+        self.assertTrue(np.all(result.estimate.total_time_s < along_x))
+
+
+if __name__ == '__main__':
+    unittest.main()
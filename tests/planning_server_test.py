@@ -0,0 +1,161 @@
+import asyncio
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, replace
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+from src.plan_computation import generate_photo_plan_on_grid
+from src.plan_io import plan_from_bytes
+from src.planning_server import PlanningServer
+
+
+async def http_request(port: int, method: str, path: str, payload: object = None) -> tuple:
+    """Send one request and return (status, decoded chunked body, number of chunks)."""
+    body = b"" if payload is None else json.dumps(payload).encode()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()) != b"\r\n":
+        pass
+    chunks = []
+    while True:
+        size = int(await reader.readline(), 16)
+        data = await reader.readexactly(size + 2)
+        if size == 0:
+            break
+        chunks.append(data[:-2])
+    writer.close()
+    return status, b"".join(chunks), len(chunks)
+
+
+class PlanningServerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.server = PlanningServer(executor=self.executor, chunk_bytes=256, ndjson_chunk_waypoints=7)
+        await self.server.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.server.close()
+        self.executor.shutdown()
+
+    async def test_coalescing_and_cache(self) -> None:
+        # Near-identical heights quantize to the same key and share one generation.
+        specs = [replace(TEST_DATASET_SPEC, height=TEST_DATASET_SPEC.height + 1e-9 * i) for i in range(8)]
+        results = await asyncio.gather(*(self.server.plan_bytes(TEST_CAMERA, spec) for spec in specs))
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.server.stats.generated, 1)
+        self.assertEqual(self.server.stats.coalesced, 7)
+
+        await self.server.plan_bytes(TEST_CAMERA, TEST_DATASET_SPEC)
+        self.assertEqual(self.server.stats.cache_hits, 1)
+        self.assertEqual(self.server.stats.cache_bytes, len(results[0]))
+
+        # LRU eviction once the cached plans exceed cache_bytes.
+        self.server.cache_bytes = len(results[0]) + 1
+        other = await self.server.plan_bytes(TEST_CAMERA, replace(TEST_DATASET_SPEC, height=71.0))
+        self.assertEqual(self.server.stats.cache_bytes, len(other))
+        await self.server.plan_bytes(TEST_CAMERA, TEST_DATASET_SPEC)
+        self.assertEqual(self.server.stats.generated, 3)
+        self.assertLessEqual(self.server.stats.cache_bytes, self.server.cache_bytes)
+
+        # Plans larger than the whole cache are served but not kept.
+        self.server.cache_bytes = 16
+        await self.server.plan_bytes(TEST_CAMERA, replace(TEST_DATASET_SPEC, height=83.0))
+        self.assertEqual(self.server.stats.cache_bytes, 0)
+
+    async def test_generation_survives_cancelled_requester(self) -> None:
+        request = asyncio.ensure_future(self.server.plan_bytes(TEST_CAMERA, TEST_DATASET_SPEC))
+        while not self.server._in_flight:
+            await asyncio.sleep(0)
+        request.cancel()
+        await asyncio.gather(*self.server._in_flight.values())
+
+        # The generation finished and was cached although nobody was waiting for it any more.
+        self.assertTrue(request.cancelled())
+        result = await self.server.plan_bytes(TEST_CAMERA, TEST_DATASET_SPEC)
+        self.assertEqual(self.server.stats.generated, 1)
+        self.assertEqual(self.server.stats.cache_hits, 1)
+        self.assertEqual(self.server.stats.cache_bytes, len(result))
+
+    async def test_http_plan(self) -> None:
+        expected = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        request = {"camera": asdict(TEST_CAMERA), "dataset_spec": asdict(TEST_DATASET_SPEC)}
+
+        status, body, num_chunks = await http_request(self.server.port, "POST", "/plan", request)
+        self.assertEqual(status, 200)
+        self.assertGreater(num_chunks, 1)
+        np.testing.assert_array_equal(plan_from_bytes(body).plan.x_m, expected.x_m)
+
+        status, body, _ = await http_request(self.server.port, "POST", "/plan", {**request, "format": "ndjson"})
+        self.assertEqual(status, 200)
+        # Strict JSON: no bare NaN for the unset look-at heights.
+        lines = [json.loads(line, parse_constant=self.fail) for line in body.decode().splitlines()]
+        self.assertEqual(len(lines), -(-len(expected) // 7))
+        np.testing.assert_array_equal(np.concatenate([line["y_m"] for line in lines]), expected.y_m)
+        look_at_z = np.concatenate([line["look_at_z_m"] for line in lines])
+        self.assertEqual(
+            [value is None for value in look_at_z.tolist()], np.isnan(expected.look_at_z_m).tolist()
+        )
+
+        status, body, _ = await http_request(self.server.port, "GET", "/stats")
+        self.assertEqual(json.loads(body)["cache_hits"], 1)
+
+    async def test_requests_served_during_ndjson_stream(self) -> None:
+        spec = replace(TEST_DATASET_SPEC, scan_dimension_x=2000.0, scan_dimension_y=1500.0)
+        request = {"camera": asdict(TEST_CAMERA), "dataset_spec": asdict(spec), "format": "ndjson"}
+        num_waypoints = len(generate_photo_plan_on_grid(TEST_CAMERA, spec))
+        self.assertGreater(num_waypoints, 5_000)
+
+        # Start a large ndjson response and read only its first line.
+        body = json.dumps(request).encode()
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        writer.write(f"POST /plan HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        while (await reader.readline()) != b"\r\n":
+            pass
+        await reader.readexactly(int(await reader.readline(), 16) + 2)
+
+        # Another request is answered while the stream is still in flight.
+        status, stats, _ = await asyncio.wait_for(http_request(self.server.port, "GET", "/stats"), timeout=10.0)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(stats)["generated"], 1)
+        self.assertFalse(reader.at_eof())
+
+        rest = await reader.read()
+        writer.close()
+        self.assertTrue(rest.endswith(b"\r\n0\r\n\r\n"))
+        self.assertEqual(rest.count(b"\n{"), -(-num_waypoints // 7) - 1)
+
+    async def test_http_errors(self) -> None:
+        status, body, _ = await http_request(self.server.port, "POST", "/plan", {"camera": {}})
+        self.assertEqual(status, 400)
+        self.assertIn("error", json.loads(body))
+        self.assertEqual((await http_request(self.server.port, "GET", "/plan"))[0], 405)
+        self.assertEqual((await http_request(self.server.port, "GET", "/nope"))[0], 404)
+
+    async def test_http_rejects_invalid_specs(self) -> None:
+        camera = asdict(TEST_CAMERA)
+        for changes in ({"overlap": 1.0}, {"sidelap": -0.1}, {"height": 0.0}, {"scan_dimension_x": -5.0},
+                        {"exposure_time_ms": 0.0}, {"camera_angle": 90.0}):
+            spec = {**asdict(TEST_DATASET_SPEC), **changes}
+            request = {"camera": camera, "dataset_spec": spec}
+            status, body, _ = await http_request(self.server.port, "POST", "/plan", request)
+            self.assertEqual(status, 400, changes)
+            self.assertIn(next(iter(changes)), json.loads(body)["error"])
+
+        # Too many waypoints: rejected before anything is generated.
+        self.server.max_waypoints = len(generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)) - 1
+        request = {"camera": camera, "dataset_spec": asdict(TEST_DATASET_SPEC)}
+        status, body, _ = await http_request(self.server.port, "POST", "/plan", request)
+        self.assertEqual(status, 400)
+        self.assertIn("waypoints", json.loads(body)["error"])
+        self.assertEqual(self.server.stats.generated, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import benchmarks.regression_suite as regression_suite
+from src.geometry_cache import cache_stats
+
+
+class RegressionSuiteTest(unittest.TestCase):
+
+    def test_run_save_and_compare(self) -> None:
+        cases = [regression_suite.BenchmarkCase("zeros", lambda size: lambda: np.zeros(size), (1_000, 1_000_000))]
+        results = regression_suite.run_cases(cases, repeat=1)
+        self.assertEqual([result.key for result in results], ["zeros[1000]", "zeros[1000000]"])
+        # The 8 MB buffer is allocated inside the measured call.
+        self.assertGreaterEqual(results[1].peak_bytes, 8_000_000)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            regression_suite.save_results(path, results)
+            baseline = regression_suite.load_results(path)
+        self.assertEqual(baseline["zeros[1000000]"], results[1])
+        self.assertEqual(regression_suite.find_regressions(results, baseline), [])
+
+    def test_cases_release_their_resources(self) -> None:
+        # The footprint case reprojects on every call instead of hitting the geometry caches.
+        fn = regression_suite._tilted_footprint(10)
+        fn()
+        fn()
+        self.assertEqual(cache_stats()["footprint_corners"].hits, 0)
+
+        # Temporary files of the save/load case are removed once it has been measured.
+        case = regression_suite.BenchmarkCase("save_and_load", regression_suite._save_and_load, (100,))
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(tempfile, "tempdir", tmp):
+            regression_suite.run_cases([case], repeat=1)
+            self.assertEqual(os.listdir(tmp), [])
+
+    def test_committed_baseline(self) -> None:
+        baseline = regression_suite.load_results(regression_suite.DEFAULT_BASELINE)
+        expected = {f"{case.name}[{size}]" for case in regression_suite.CASES for size in case.sizes}
+        self.assertEqual(set(baseline), expected)
+
+    def test_find_regressions(self) -> None:
+        baseline = {
+            "a[10]": regression_suite.BenchmarkResult("a", 10, 0.100, 1_000_000),
+            "b[10]": regression_suite.BenchmarkResult("b", 10, 0.0001, 1_000),
+        }
+        results = [
+            # 50% slower and a per-item allocation doubling the peak memory
+            regression_suite.BenchmarkResult("a", 10, 0.150, 2_000_000),
+            # large relative but negligible absolute changes are noise
+            regression_suite.BenchmarkResult("b", 10, 0.0003, 3_000),
+            # no baseline
+            regression_suite.BenchmarkResult("c", 10, 1.0, 1),
+        ]
+        regressions = regression_suite.find_regressions(results, baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(r.startswith("a[10]") for r in regressions))
+        self.assertEqual(regression_suite.find_regressions(results, baseline, threshold=1.5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.replanning as replanning
+from src.plan_computation import _compute_grid_layout, generate_photo_plan_on_grid
+from tests.plan_computation_test import assert_plans_equal
+
+
+class ReplanningTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.old_plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        self.layout = _compute_grid_layout(TEST_CAMERA, TEST_DATASET_SPEC)
+
+    def replan(self, new_spec, offset_xy=(0.0, 0.0), new_camera=TEST_CAMERA):
+        return replanning.replan(
+            self.old_plan, TEST_CAMERA, TEST_DATASET_SPEC, new_camera, new_spec, offset_xy=offset_xy
+        )
+
+    def test_unchanged_spec(self) -> None:
+        result = self.replan(deepcopy(TEST_DATASET_SPEC))
+        self.assertEqual(result.changed_fields, [])
+        self.assertTrue(result.patch.is_empty)
+
+    def test_extend_area_on_one_side(self) -> None:
+        # Two more columns on the +x side and one more row on the -y side.
+        new_spec = deepcopy(TEST_DATASET_SPEC)
+        new_spec.scan_dimension_x += 2 * self.layout.spacing_x
+        new_spec.scan_dimension_y += self.layout.spacing_y
+        result = self.replan(new_spec, offset_xy=(self.layout.spacing_x, -self.layout.spacing_y / 2))
+
+        patch = result.patch
+        self.assertTrue(result.kept_lattice)
+        self.assertEqual(result.changed_fields, ["scan_dimension_x", "scan_dimension_y"])
+        self.assertEqual(len(result.plan), (self.layout.n_x + 2) * (self.layout.n_y + 1))
+        # Every old waypoint is kept as is; only the new row and columns are added.
+        self.assertEqual(patch.unchanged_old_index.shape[0], len(self.old_plan))
+        self.assertEqual(len(patch.updated), 0)
+        self.assertEqual(patch.removed_old_index.shape[0], 0)
+        self.assertEqual(len(patch.added), 2 * self.layout.n_y + self.layout.n_x + 2)
+        self.assertTrue(np.all(
+            (patch.added.x_m > self.old_plan.x_m.max()) | (patch.added.y_m < self.old_plan.y_m.min())
+        ))
+        assert_plans_equal(self, patch.apply(self.old_plan), result.plan)
+
+    def test_crop_area(self) -> None:
+        new_spec = deepcopy(TEST_DATASET_SPEC)
+        new_spec.scan_dimension_x -= self.layout.spacing_x
+        result = self.replan(new_spec, offset_xy=(-self.layout.spacing_x / 2, 0.0))
+        self.assertEqual(result.patch.removed_old_index.shape[0], self.layout.n_y)
+        self.assertTrue(np.all(self.old_plan.x_m[result.patch.removed_old_index] == self.old_plan.x_m.max()))
+        self.assertEqual(len(result.patch.added), 0)
+
+    def test_regenerated_plan(self) -> None:
+        # Same positions, new capture speed: every waypoint is updated in place.
+        new_spec = deepcopy(TEST_DATASET_SPEC)
+        new_spec.exposure_time_ms *= 2
+        result = self.replan(new_spec)
+        self.assertFalse(result.kept_lattice)
+        self.assertEqual(len(result.patch.updated), len(self.old_plan))
+        np.testing.assert_array_equal(result.patch.updated_index, result.patch.updated_old_index)
+        assert_plans_equal(self, result.patch.apply(self.old_plan), generate_photo_plan_on_grid(TEST_CAMERA, new_spec))
+
+        # New overlap: a different grid, matched by position.
+        new_spec = deepcopy(TEST_DATASET_SPEC)
+        new_spec.overlap = 0.8
+        result = self.replan(new_spec)
+        assert_plans_equal(self, result.patch.apply(self.old_plan), result.plan)
+        self.assertEqual(
+            len(result.patch.unchanged_index) + len(result.patch.added), len(result.plan)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
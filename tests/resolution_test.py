@@ -0,0 +1,63 @@
+import math
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.resolution as resolution
+from src.camera_utils import compute_ground_sampling_distance
+
+
+class ResolutionTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.spec = deepcopy(TEST_DATASET_SPEC)
+
+    def test_gsd_map(self) -> None:
+        # Case 1: nadir pinhole camera over flat ground has a uniform GSD
+        gsd_map = resolution.compute_gsd_map(TEST_CAMERA, self.spec)
+        expected = compute_ground_sampling_distance(TEST_CAMERA, self.spec.height)
+        np.testing.assert_allclose(gsd_map.gsd, expected, rtol=1e-6)
+        self.assertEqual(gsd_map.gsd.shape, (resolution.DEFAULT_SAMPLES_PER_AXIS,) * 2)
+
+        # Case 2: tilting makes the far edge coarser; the near edge stays close to nadir
+        self.spec.camera_angle = 30.0
+        gsd_map = resolution.compute_gsd_map(TEST_CAMERA, self.spec)
+        row_gsd = gsd_map.gsd.max(axis=1)
+        self.assertGreater(gsd_map.max_gsd, 1.5 * expected)
+        self.assertGreater(abs(row_gsd[0] - row_gsd[-1]), 0.5 * expected)
+
+        # Case 3: rays above the horizon never reach the ground
+        self.spec.camera_angle = 70.0
+        self.assertTrue(math.isinf(resolution.compute_gsd_map(TEST_CAMERA, self.spec).max_gsd))
+
+    def test_solve_for_height(self) -> None:
+        self.spec.camera_angle = 20.0
+        solution = resolution.solve_for_max_gsd(TEST_CAMERA, self.spec, 0.05)
+        self.assertAlmostEqual(solution.max_gsd_m, 0.05, places=9)
+        self.assertEqual(solution.dataset_spec.camera_angle, 20.0)
+        self.assertLess(solution.dataset_spec.height, 0.05 * TEST_CAMERA.fx)
+
+        # The spacing is that of the tilted grid plan, not of a nadir camera at the solved height
+        plan = resolution.generate_photo_plan_for_max_gsd(TEST_CAMERA, self.spec, 0.05)
+        np.testing.assert_allclose(
+            solution.distance_between_images_m, [np.diff(np.unique(plan.x_m)).min(), np.diff(np.unique(plan.y_m)).min()]
+        )
+
+    def test_solve_for_camera_angle(self) -> None:
+        nadir_gsd = compute_ground_sampling_distance(TEST_CAMERA, self.spec.height)
+        self.spec.camera_angle = -5.0
+        solution = resolution.solve_for_max_gsd(TEST_CAMERA, self.spec, 1.5 * nadir_gsd, solve_for="camera_angle")
+        self.assertLess(solution.dataset_spec.camera_angle, -5.0)
+        self.assertLessEqual(solution.max_gsd_m, 1.5 * nadir_gsd)
+        self.assertAlmostEqual(solution.max_gsd_m, 1.5 * nadir_gsd, places=5)
+
+        with self.assertRaises(ValueError):
+            resolution.solve_for_max_gsd(TEST_CAMERA, self.spec, 0.5 * nadir_gsd, solve_for="camera_angle")
+        with self.assertRaises(ValueError):
+            resolution.solve_for_max_gsd(TEST_CAMERA, self.spec, 0.05, solve_for="spacing")
+
+
+if __name__ == '__main__':
+    unittest.main()
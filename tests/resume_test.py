@@ -0,0 +1,95 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.resume as resume
+from src.coverage import plan_footprint_quads, rasterize_footprints
+from src.data_model import WaypointArray
+from src.plan_computation import generate_photo_plan_on_grid
+
+
+class ResumeTest(unittest.TestCase):
+
+    def assert_minimal_completion(self, plan: WaypointArray, flown: WaypointArray, completion) -> None:
+        """The completion gives every cell the multiplicity it asks for, and no waypoint of it can be dropped."""
+        grid = completion.grid
+        full = rasterize_footprints(plan_footprint_quads(TEST_CAMERA, plan), grid)
+        target = np.minimum(full, completion.min_multiplicity)
+        logged = rasterize_footprints(plan_footprint_quads(TEST_CAMERA, flown), grid)
+        quads = plan_footprint_quads(TEST_CAMERA, completion.plan)
+        done = logged + rasterize_footprints(quads, grid)
+        self.assertTrue(np.all(done >= target))
+        for k in range(len(quads)):
+            without = done - rasterize_footprints(quads[k:k + 1], grid)
+            self.assertTrue(np.any(without < target), f"waypoint {completion.plan_index[k]} is redundant")
+
+    def test_grid_index(self) -> None:
+        rng = np.random.default_rng(0)
+        points = rng.uniform(-100.0, 100.0, size=(2000, 2))
+        queries = rng.uniform(-110.0, 110.0, size=(500, 2))
+        nearest = resume.GridIndex(points, 5.0).nearest_within(queries, 5.0)
+
+        d = np.linalg.norm(queries[:, None, :] - points[None, :, :], axis=2)
+        expected = np.where(d.min(axis=1) <= 5.0, d.argmin(axis=1), -1)
+        np.testing.assert_array_equal(nearest, expected)
+
+        with self.assertRaises(ValueError):
+            resume.GridIndex(points, 5.0).nearest_within(queries, 6.0)
+
+    def test_completion_covers_the_rest(self) -> None:
+        for camera_angle in (0.0, 25.0):
+            spec = deepcopy(TEST_DATASET_SPEC)
+            spec.camera_angle = camera_angle
+            plan = generate_photo_plan_on_grid(TEST_CAMERA, spec)
+            flown = len(plan) * 2 // 5
+            # Logged positions are a little off the planned ones.
+            log = np.stack([plan.x_m[:flown], plan.y_m[:flown]], axis=1)
+            log += np.random.default_rng(1).normal(0.0, 0.3, size=log.shape)
+
+            completion = resume.plan_completion(TEST_CAMERA, spec, plan, log)
+            np.testing.assert_array_equal(completion.captured_index, np.arange(flown))
+            self.assertTrue(np.all(completion.plan_index >= flown))
+            # Everything the full plan images is imaged by the flown part plus the completion, and
+            # dropping any waypoint of the completion leaves ground unimaged.
+            self.assert_minimal_completion(plan, plan[:flown], completion)
+
+    def test_min_multiplicity(self) -> None:
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        # Every other waypoint images all of the ground at least twice, but not with the overlap of the plan.
+        log = plan[::2]
+        for min_multiplicity in (1, 2):
+            completion = resume.plan_completion(
+                TEST_CAMERA, TEST_DATASET_SPEC, plan, log, min_multiplicity=min_multiplicity
+            )
+            self.assertEqual(len(completion.plan), 0)
+        for min_multiplicity in (4, 16):
+            completion = resume.plan_completion(
+                TEST_CAMERA, TEST_DATASET_SPEC, plan, log, min_multiplicity=min_multiplicity
+            )
+            self.assertGreater(len(completion.plan), 0)
+            self.assertGreater(completion.uncovered_fraction, 0.0)
+            np.testing.assert_array_equal(np.arange(len(plan))[::2], completion.captured_index)
+            self.assert_minimal_completion(plan, log, completion)
+        # 16 is the most any cell of the plan is imaged: the overlap of the plan needs every waypoint.
+        np.testing.assert_array_equal(completion.plan_index, np.arange(len(plan))[1::2])
+
+        with self.assertRaises(ValueError):
+            resume.plan_completion(TEST_CAMERA, TEST_DATASET_SPEC, plan, log, min_multiplicity=0)
+
+    def test_nothing_flown_or_everything_flown(self) -> None:
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        completion = resume.plan_completion(TEST_CAMERA, TEST_DATASET_SPEC, plan, np.empty((0, 2)))
+        self.assertEqual(completion.uncovered_fraction, 1.0)
+        self.assert_minimal_completion(plan, plan[:0], completion)
+        # With 70% overlap, imaging the ground once takes far fewer waypoints than the plan.
+        self.assertLess(len(completion.plan), len(plan) // 2)
+
+        completion = resume.plan_completion(TEST_CAMERA, TEST_DATASET_SPEC, plan, plan)
+        self.assertEqual(completion.uncovered_fraction, 0.0)
+        self.assertEqual(len(completion.plan), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.survey_area as survey_area
+from src.coverage import RasterGrid, plan_footprint_quads, rasterize_footprints
+from src.plan_computation import generate_photo_plan_on_grid
+
+
+def _brute_force_even_odd(polygon: survey_area.SurveyPolygon, x: float, y: float) -> bool:
+    inside = False
+    for (x0, y0), (x1, y1) in polygon.edges():
+        if (y0 <= y) != (y1 <= y):
+            if x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+                inside = not inside
+    return inside
+
+
+def _segments_cross(p0, p1, q0, q1) -> bool:
+    def orient(a, b, c):
+        return np.sign((b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0]))
+
+    def on_segment(a, b, c):
+        return min(a[0], b[0]) <= c[0] <= max(a[0], b[0]) and min(a[1], b[1]) <= c[1] <= max(a[1], b[1])
+
+    d1, d2, d3, d4 = orient(q0, q1, p0), orient(q0, q1, p1), orient(p0, p1, q0), orient(p0, p1, q1)
+    if d1 * d2 < 0 and d3 * d4 < 0:
+        return True
+    return (
+        (d1 == 0 and on_segment(q0, q1, p0)) or (d2 == 0 and on_segment(q0, q1, p1))
+        or (d3 == 0 and on_segment(p0, p1, q0)) or (d4 == 0 and on_segment(p0, p1, q1))
+    )
+
+
+def _brute_force_box_intersects(polygon: survey_area.SurveyPolygon, box) -> bool:
+    x0, y0, x1, y1 = box
+    corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+    if any(_brute_force_even_odd(polygon, x, y) for x, y in corners):
+        return True
+    for p, q in polygon.edges():
+        if x0 <= p[0] <= x1 and y0 <= p[1] <= y1:
+            return True
+        if any(_segments_cross(p, q, corners[i], corners[(i + 1) % 4]) for i in range(4)):
+            return True
+    return False
+
+
+class SurveyAreaTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # L-shaped field with a rectangular hole in its lower arm
+        self.polygon = survey_area.SurveyPolygon(
+            exterior=[[0.0, 0.0], [400.0, 0.0], [400.0, 100.0], [100.0, 100.0], [100.0, 300.0], [0.0, 300.0]],
+            holes=[[[200.0, 30.0], [300.0, 30.0], [300.0, 70.0], [200.0, 70.0]]],
+        )
+
+    def test_points_in_polygon(self) -> None:
+        rng = np.random.default_rng(0)
+        x = rng.uniform(-20.0, 420.0, 2000)
+        y = np.round(rng.uniform(-20.0, 320.0, 2000), 0)  # shared scanlines, like grid rows
+
+        computed = survey_area.points_in_polygon(self.polygon, x, y)
+        expected = [_brute_force_even_odd(self.polygon, xi, yi) for xi, yi in zip(x, y)]
+        np.testing.assert_array_equal(computed, expected)
+
+    def test_boxes_intersect_polygon(self) -> None:
+        boxes = np.array([
+            [10.0, 10.0, 20.0, 20.0],      # inside
+            [210.0, 40.0, 290.0, 60.0],    # inside the hole
+            [250.0, 60.0, 350.0, 90.0],    # straddles the hole boundary
+            [150.0, 150.0, 300.0, 250.0],  # in the notch of the L
+            [-50.0, 50.0, 450.0, 60.0],    # spans the whole field
+        ])
+        computed = survey_area.boxes_intersect_polygon(self.polygon, boxes)
+        np.testing.assert_array_equal(computed, [True, False, True, False, True])
+
+        rng = np.random.default_rng(1)
+        lo = rng.uniform(-50.0, 420.0, (300, 2))
+        boxes = np.concatenate([lo, lo + rng.uniform(1.0, 80.0, (300, 2))], axis=1)
+        computed = survey_area.boxes_intersect_polygon(self.polygon, boxes)
+        expected = [_brute_force_box_intersects(self.polygon, box) for box in boxes]
+        np.testing.assert_array_equal(computed, expected)
+
+    def test_thin_corridor(self) -> None:
+        # A 0.2 m wide corridor crossing boxes between any sampled scanlines, and a thin hole
+        corridor = survey_area.SurveyPolygon(exterior=[[0.0, 4.9], [300.0, 4.9], [300.0, 5.1], [0.0, 5.1]])
+        boxes = np.array([[100.0, 0.0, 110.0, 10.0], [100.0, 5.2, 110.0, 15.0], [-10.0, 5.0, -5.0, 6.0]])
+        np.testing.assert_array_equal(survey_area.boxes_intersect_polygon(corridor, boxes), [True, False, False])
+
+        plan = survey_area.generate_photo_plan_on_polygon(TEST_CAMERA, TEST_DATASET_SPEC, corridor)
+        self.assertGreater(len(plan), 0)
+        grid = RasterGrid.covering(0.0, 4.9, 300.0, 5.1, 0.05)
+        multiplicity = rasterize_footprints(plan_footprint_quads(TEST_CAMERA, plan), grid)
+        self.assertTrue(np.all(multiplicity > 0))
+
+        slit = survey_area.SurveyPolygon(
+            exterior=[[0.0, 0.0], [100.0, 0.0], [100.0, 100.0], [0.0, 100.0]],
+            holes=[[[10.0, 49.95], [90.0, 49.95], [90.0, 50.05], [10.0, 50.05]]],
+        )
+        boxes = np.array([[40.0, 49.96, 60.0, 50.04], [40.0, 45.0, 60.0, 55.0]])
+        np.testing.assert_array_equal(survey_area.boxes_intersect_polygon(slit, boxes), [False, True])
+
+    def test_plan_on_polygon_covers_it_with_fewer_images(self) -> None:
+        plan = survey_area.generate_photo_plan_on_polygon(TEST_CAMERA, TEST_DATASET_SPEC, self.polygon)
+
+        x_min, y_min, x_max, y_max = self.polygon.bounds()
+        grid = RasterGrid.covering(x_min, y_min, x_max, y_max, 2.0)
+        multiplicity = rasterize_footprints(plan_footprint_quads(TEST_CAMERA, plan), grid)
+        xs, ys = grid.cell_centers()
+        gx, gy = np.meshgrid(xs, ys)
+        inside = survey_area.points_in_polygon(self.polygon, gx.ravel(), gy.ravel()).reshape(gx.shape)
+        self.assertTrue(np.all(multiplicity[inside] > 0))
+
+        bbox_spec = TEST_DATASET_SPEC.frozen().thaw()
+        bbox_spec.scan_dimension_x, bbox_spec.scan_dimension_y = x_max - x_min, y_max - y_min
+        self.assertLess(len(plan), len(generate_photo_plan_on_grid(TEST_CAMERA, bbox_spec)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+import src.terrain as terrain
+from src.plan_computation import generate_photo_plan_on_grid
+
+
+def _plane(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return 100.0 + 0.2 * x - 0.1 * y
+
+
+class TerrainTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # A sloped plane sampled on a 5 m grid covering [-500, 500) in both axes
+        self.resolution = 5.0
+        self.origin = -500.0
+        coords = self.origin + self.resolution * np.arange(200)
+        gx, gy = np.meshgrid(coords, coords)
+        self.elevations = _plane(gx, gy).astype(np.float32)
+
+    def test_dem_grid_bilinear_is_exact_on_planes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dem.npy")
+            np.save(path, self.elevations)
+            dem = terrain.DemGrid.from_file(path, self.origin, self.origin, self.resolution)
+
+            x = np.array([0.0, 12.3, -251.7])
+            y = np.array([0.0, -44.4, 333.3])
+            np.testing.assert_allclose(dem.sample(x, y), _plane(x, y), rtol=1e-5)
+
+    def test_tiled_dem_matches_grid_and_loads_only_touched_tiles(self) -> None:
+        tile_size = 50
+        tiles = {
+            (r, c): self.elevations[r * tile_size:(r + 1) * tile_size, c * tile_size:(c + 1) * tile_size]
+            for r in range(4) for c in range(4)
+        }
+        tiled = terrain.TiledDem(
+            lambda r, c: tiles.get((r, c)), tile_size, self.origin, self.origin, self.resolution, max_cached_tiles=2
+        )
+        grid = terrain.DemGrid(self.elevations, self.origin, self.origin, self.resolution)
+
+        # Points straddling the boundary between tiles (1, 1) and (1, 2)
+        x = np.linspace(-20.0, 20.0, 41)
+        y = np.full_like(x, -200.0)
+        np.testing.assert_allclose(tiled.sample(x, y), grid.sample(x, y))
+        self.assertEqual(tiled.tiles_loaded, 2)
+
+    def test_missing_elevations(self) -> None:
+        tile_size = 50
+
+        def load_tile(r: int, c: int) -> np.ndarray:
+            if not (0 <= r < 4 and 0 <= c < 4):
+                return None
+            return self.elevations[r * tile_size:(r + 1) * tile_size, c * tile_size:(c + 1) * tile_size]
+
+        tiled = terrain.TiledDem(load_tile, tile_size, self.origin, self.origin, self.resolution)
+        grid = terrain.DemGrid(self.elevations, self.origin, self.origin, self.resolution)
+
+        # The last row and column are inside; anything beyond has no elevation in either model.
+        last = self.origin + self.resolution * 199
+        x = np.array([last, 0.0, last + 1.0, -600.0])
+        y = np.array([last, last, 0.0, 0.0])
+        for dem in (grid, tiled):
+            elevations = dem.sample(x, y)
+            np.testing.assert_allclose(elevations[:2], _plane(x[:2], y[:2]), rtol=1e-5)
+            self.assertTrue(np.isnan(elevations[2:]).all())
+
+        # Waypoints off the DEM, and viewing rays leaving it, are rejected.
+        small = terrain.DemGrid(self.elevations[90:110, 90:110], -50.0, -50.0, self.resolution)
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        with self.assertRaisesRegex(ValueError, "no elevation under"):
+            terrain.apply_terrain_following(TEST_DATASET_SPEC, plan, small)
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.camera_angle = 60.0
+        spec_.scan_dimension_x = spec_.scan_dimension_y = 60.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+        with self.assertRaisesRegex(ValueError, "leave the DEM"):
+            terrain.apply_terrain_following(spec_, plan, small)
+
+    def test_terrain_following(self) -> None:
+        dem = terrain.DemGrid(self.elevations, self.origin, self.origin, self.resolution)
+
+        # Case 1: nadir, the camera stays `height` above the ground and looks straight down
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        followed = terrain.apply_terrain_following(TEST_DATASET_SPEC, plan, dem)
+        ground = _plane(plan.x_m, plan.y_m)
+        np.testing.assert_allclose(followed.z_m - ground, TEST_DATASET_SPEC.height, atol=1e-3)
+        np.testing.assert_allclose(followed.look_at_z_m, ground, atol=1e-3)
+        np.testing.assert_allclose(followed.speed_m_s, plan.speed_m_s)
+
+        # Case 2: tilted towards +y where the ground falls away, so look-at points are further away
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.camera_angle = 30.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+        followed = terrain.apply_terrain_following(spec_, plan, dem)
+        np.testing.assert_allclose(
+            followed.look_at_z_m, _plane(followed.look_at_x_m, followed.look_at_y_m), atol=1e-2
+        )
+        self.assertTrue(np.all(followed.speed_m_s > plan.speed_m_s))
+
+    def test_terrain_following_on_steep_slopes(self) -> None:
+        # Oblique view along +y over slopes rising into the view, steeper than the viewing ray
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.camera_angle = 50.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+        coords = -1000.0 + 10.0 * np.arange(201)
+        gx, gy = np.meshgrid(coords, coords)
+        for slope in (0.5, 1.0, 1.5):
+            dem = terrain.DemGrid(slope * gy, -1000.0, -1000.0, 10.0)
+            followed = terrain.apply_terrain_following(spec_, plan, dem)
+            np.testing.assert_allclose(
+                followed.look_at_z_m, dem.sample(followed.look_at_x_m, followed.look_at_y_m), atol=1e-3
+            )
+            # Looking uphill, the look-at point is closer than on flat ground
+            self.assertTrue(np.all(followed.speed_m_s < plan.speed_m_s))
+
+        # Ground falling away more steeply than the ray is never reached
+        dem = terrain.DemGrid(-1.5 * gy, -1000.0, -1000.0, 10.0)
+        with self.assertRaises(ValueError):
+            terrain.apply_terrain_following(spec_, plan, dem)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from copy import deepcopy
+
+import numpy as np
+
+from tests.common import TEST_CAMERA, TEST_DATASET_SPEC
+from src.plan_computation import _compute_grid_layout, generate_photo_plan_on_grid
+from src.visualization import decimate_plan, plot_photo_plan, turn_indices
+
+
+class VisualizationTest(unittest.TestCase):
+
+    def test_turn_indices_are_row_endpoints(self) -> None:
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, TEST_DATASET_SPEC)
+        layout = _compute_grid_layout(TEST_CAMERA, TEST_DATASET_SPEC)
+        row_starts = np.arange(layout.n_y) * layout.n_x
+        expected = np.union1d(row_starts, row_starts + layout.n_x - 1)
+        np.testing.assert_array_equal(turn_indices(plan), expected)
+
+    def test_decimate_plan(self) -> None:
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.scan_dimension_x = 5000.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+        self.assertGreater(len(plan), 500)
+
+        index = decimate_plan(plan, max_points=100)
+        self.assertLessEqual(len(index), 100)
+        self.assertTrue(np.all(np.diff(index) > 0))
+        self.assertTrue(np.isin(turn_indices(plan), index).all())
+        np.testing.assert_array_equal(decimate_plan(plan[:50], max_points=100), np.arange(50))
+
+    def test_plot_photo_plan(self) -> None:
+        spec_ = deepcopy(TEST_DATASET_SPEC)
+        spec_.camera_angle = 20.0
+        plan = generate_photo_plan_on_grid(TEST_CAMERA, spec_)
+
+        fig = plot_photo_plan(plan.to_list())
+        path = fig.data[0]
+        self.assertEqual(path.type, "scattergl")
+        np.testing.assert_array_equal(path.x, plan.x_m)
+
+        fig = plot_photo_plan(plan, TEST_CAMERA, show_footprints=True, show_coverage=True, max_footprints=10)
+        names = [trace.name for trace in fig.data]
+        self.assertEqual(fig.data[0].type, "heatmap")
+        self.assertTrue(names[1].startswith("footprints"))
+        self.assertIn("look-at points", names)
+        # Up to 10 quads, drawn as closed outlines separated by NaN.
+        self.assertLessEqual(len(fig.data[1].x), 10 * 6)
+
+        with self.assertRaises(ValueError):
+            plot_photo_plan(plan, show_coverage=True)
+
+
+if __name__ == '__main__':
+    unittest.main()